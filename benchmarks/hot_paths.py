@@ -0,0 +1,365 @@
+# hot_paths.py
+"""
+데이터 준비 / 학습 입력 / 추론 핫패스 처리량 측정
+- 합성 YOLO 데이터셋(원본 이미지 + 라벨)을 임시 폴더에 만들어 사용 → 실제 데이터셋 없이 어디서나 같은 조건으로 재현
+- 단계마다 새 Python 프로세스에서 측정 (import / 메모리 사용량이 단계끼리 섞이지 않음)
+  decode      : 원본 이미지 cv2.imread
+  filter      : 헤더 크기 + 라벨 줄 단위 get_bbox_pixel_coords 필터링 (pipeline.filter_and_remap)
+  filter_array: 같은 필터링을 load_label_array + get_bbox_pixel_coords_array 로 한 번에
+  crop_*      : 전략별 crop 함수 (디코딩된 원본 이미지 기준)
+  gray        : crop JPEG 읽기 → 흑백 변환 → JPEG 저장 (한 장씩 순차 처리)
+  gray_bulk   : 같은 작업을 color_to_gray.convert_batch 로 묶어 프로세스 풀에서 병렬 처리
+  tf_data     : train.make_dataset 한 epoch (두 번째 epoch 부터 측정)
+  inference   : RunConfig.build_model() 모델의 배치 추론 (가중치는 초기값)
+- 단계별 images/s (crop 단계는 crop/s) 와 최대 메모리(peak RSS) 를 JSON 으로 저장 → 실행 간 비교용
+실행: python -m benchmarks.hot_paths [원본 이미지 수]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+from datetime import datetime
+
+from instrumentation import peak_rss_mb
+
+N_IMAGES = 200  # 합성 원본 이미지 수
+RAW_SIZE = (640, 480)  # 합성 원본 이미지 크기 (width, height)
+BOXES_PER_IMAGE = 4  # 이미지당 bbox 수 (일부는 FILTER_SIZE 보다 작게 만들어 필터링 대상)
+BOX_SIZE_RANGE = (60, 220)  # bbox 한 변 길이 범위 (픽셀)
+SYNTH_SEED = 0
+
+STAGES = [
+    "decode",
+    "filter",
+    "filter_array",
+    "crop_forced",
+    "crop_padded",
+    "crop_aware",
+    "gray",
+    "gray_bulk",
+    "tf_data",
+    "inference",
+]
+
+REPEATS = 3  # 단계마다 반복 측정 횟수 (최솟값 사용)
+INFERENCE_BATCH_SIZE = 64
+RESULTS_PATH = "results/hot_paths_benchmark.json"
+
+SAMPLES_FILE = "samples.json"  # crop 이미지 경로 / helmet 여부 목록
+
+
+# ===============================
+# 합성 데이터셋
+# ===============================
+def get_data_dirs(data_dir):
+    """(원본 images, 원본 labels, crop images) 폴더"""
+    return (
+        os.path.join(data_dir, "raw", "images"),
+        os.path.join(data_dir, "raw", "labels"),
+        os.path.join(data_dir, "crops", "images"),
+    )
+
+
+def make_synthetic_dataset(data_dir, n_images=N_IMAGES, seed=SYNTH_SEED):
+    """
+    원본 이미지(image_N.jpg) + YOLO 라벨(label_N.txt) 생성, 전략 3 crop 을 crops/ 에 저장
+    배경은 저해상도 노이즈를 확대해 실제 사진처럼 JPEG 압축이 되도록 함
+    반환: crop 수
+    """
+    import cv2
+    import numpy as np
+    from data_prep.pipeline import filter_and_remap, CROP_FUNCS
+    from data_prep.utils import get_bbox_pixel_coords, HELMET_CLASS_ID
+
+    raw_image_dir, raw_label_dir, crop_dir = get_data_dirs(data_dir)
+    for d in (raw_image_dir, raw_label_dir, crop_dir):
+        os.makedirs(d, exist_ok=True)
+
+    rng = np.random.default_rng(seed)
+    w, h = RAW_SIZE
+    samples = []
+    for number in range(1, n_images + 1):
+        small = rng.integers(0, 256, size=(h // 16, w // 16, 3), dtype=np.uint8)
+        img = cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+
+        lines = []
+        for _ in range(BOXES_PER_IMAGE):
+            bw, bh = rng.integers(*BOX_SIZE_RANGE, size=2)
+            x0, y0 = rng.integers(0, w - bw), rng.integers(0, h - bh)
+            cls = int(rng.integers(0, 3))  # 0 / 1 / 2 (2 는 파이프라인에서 0 으로 변환)
+            cv2.rectangle(img, (int(x0), int(y0)), (int(x0 + bw), int(y0 + bh)), tuple(int(c) for c in rng.integers(0, 256, 3)), -1)
+            lines.append(f"{cls} {(x0 + bw / 2) / w:.6f} {(y0 + bh / 2) / h:.6f} {bw / w:.6f} {bh / h:.6f}")
+
+        cv2.imwrite(os.path.join(raw_image_dir, f"image_{number}.jpg"), img)
+        with open(os.path.join(raw_label_dir, f"label_{number}.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+        for seq, line in enumerate(filter_and_remap(lines, w, h), start=1):
+            cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, w, h)
+            crop_path = os.path.join(crop_dir, f"image_{number}_{seq}.jpg")
+            cv2.imwrite(crop_path, CROP_FUNCS['aware'](img, x_min, y_min, x_max, y_max))
+            samples.append([crop_path, int(int(cls) == HELMET_CLASS_ID)])
+
+    with open(os.path.join(data_dir, SAMPLES_FILE), "w", encoding="utf-8") as f:
+        json.dump(samples, f)
+    return len(samples)
+
+
+def list_raw(data_dir):
+    """(원본 이미지 경로 리스트, 라벨 경로 리스트) (번호 순)"""
+    raw_image_dir, raw_label_dir, _ = get_data_dirs(data_dir)
+    numbers = sorted(int(f[len("image_"):-len(".jpg")]) for f in os.listdir(raw_image_dir))
+    return (
+        [os.path.join(raw_image_dir, f"image_{n}.jpg") for n in numbers],
+        [os.path.join(raw_label_dir, f"label_{n}.txt") for n in numbers],
+    )
+
+
+def load_samples(data_dir):
+    with open(os.path.join(data_dir, SAMPLES_FILE), "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    return [s[0] for s in samples], [s[1] for s in samples]
+
+
+# ===============================
+# 단계별 측정 함수: setup(data_dir) → run() (처리 수 반환)
+# ===============================
+def setup_decode(data_dir):
+    import cv2
+    img_paths, _ = list_raw(data_dir)
+
+    def run():
+        for path in img_paths:
+            cv2.imread(path)
+        return len(img_paths)
+    return run
+
+
+def setup_filter(data_dir):
+    from data_prep.pipeline import filter_and_remap
+    from data_prep.image_size import get_image_size
+    img_paths, label_paths = list_raw(data_dir)
+
+    def run():
+        for img_path, label_path in zip(img_paths, label_paths):
+            w, h = get_image_size(img_path)
+            with open(label_path, "r", encoding="utf-8") as f:
+                lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+            filter_and_remap(lines, w, h)
+        return len(img_paths)
+    return run
+
+
+def setup_filter_array(data_dir):
+    import numpy as np
+    from data_prep.utils import FILTER_SIZE, load_label_array, get_bbox_pixel_coords_array
+    from data_prep.image_size import get_image_size
+    img_paths, label_paths = list_raw(data_dir)
+    min_w, min_h = FILTER_SIZE
+
+    def run():
+        sizes = np.array([get_image_size(p) for p in img_paths])
+        labels = load_label_array(label_paths)
+        ids = labels['image_id']
+        boxes = get_bbox_pixel_coords_array(labels, sizes[ids, 0], sizes[ids, 1])
+        keep = (boxes[:, 2] - boxes[:, 0] >= min_w) & (boxes[:, 3] - boxes[:, 1] >= min_h)
+        labels['cls'][keep & (labels['cls'] == 2)] = 0
+        return len(img_paths)
+    return run
+
+
+def setup_crop(data_dir, key):
+    import cv2
+    from data_prep.pipeline import filter_and_remap, CROP_FUNCS
+    from data_prep.utils import get_bbox_pixel_coords
+    img_paths, label_paths = list_raw(data_dir)
+    crop_func = CROP_FUNCS[key]
+
+    # 디코딩 / bbox 계산은 측정에서 제외
+    jobs = []
+    for img_path, label_path in zip(img_paths, label_paths):
+        img = cv2.imread(img_path)
+        h, w = img.shape[:2]
+        with open(label_path, "r", encoding="utf-8") as f:
+            lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+        for line in filter_and_remap(lines, w, h):
+            jobs.append((img, get_bbox_pixel_coords(line, w, h)[1:]))
+
+    def run():
+        for img, box in jobs:
+            crop_func(img, *box)
+        return len(jobs)
+    return run
+
+
+def setup_gray(data_dir):
+    import cv2
+    paths, _ = load_samples(data_dir)
+    out_dir = os.path.join(data_dir, "gray")
+    os.makedirs(out_dir, exist_ok=True)
+
+    def run():
+        for path in paths:
+            img = cv2.imread(path)
+            cv2.imwrite(os.path.join(out_dir, os.path.basename(path)), cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+        return len(paths)
+    return run
+
+
+def setup_gray_bulk(data_dir):
+    from concurrent.futures import ProcessPoolExecutor
+    from data_prep.color_to_gray import convert_batch, make_batches, BATCH_SIZE
+    from data_prep.preprocessing import init_worker, NUM_WORKERS
+    paths, _ = load_samples(data_dir)
+    out_dir = os.path.join(data_dir, "gray_bulk")
+    os.makedirs(out_dir, exist_ok=True)
+    batches = make_batches([(p, os.path.join(out_dir, os.path.basename(p))) for p in paths], BATCH_SIZE)
+    executor = ProcessPoolExecutor(max_workers=NUM_WORKERS, initializer=init_worker)
+    for future in [executor.submit(init_worker) for _ in range(NUM_WORKERS)]:
+        future.result()  # 워커 프로세스 시작은 측정에서 제외
+
+    def run():
+        for _ in executor.map(convert_batch, batches):
+            pass
+        return len(paths)
+    return run, executor.shutdown
+
+
+def setup_tf_data(data_dir):
+    from run_config import RunConfig
+    from train.train import make_dataset
+    paths, labels = load_samples(data_dir)
+    ds = make_dataset(paths, labels, RunConfig(dataset_dir=data_dir))
+
+    for _ in ds:
+        pass  # 첫 epoch (그래프 생성) 은 측정에서 제외
+
+    def run():
+        for _ in ds:
+            pass
+        return len(paths)
+    return run
+
+
+def setup_inference(data_dir):
+    from run_config import RunConfig
+    from data_prep.model_input import load_batch
+    paths, _ = load_samples(data_dir)
+    config = RunConfig(dataset_dir=data_dir)
+    x, _ = load_batch(paths, config.color, target_size=config.img_size)
+    model = config.build_model()
+    model.predict_on_batch(x[:INFERENCE_BATCH_SIZE])  # 첫 호출 (그래프 생성) 제외
+
+    def run():
+        for start in range(0, len(x), INFERENCE_BATCH_SIZE):
+            model.predict_on_batch(x[start:start + INFERENCE_BATCH_SIZE])
+        return len(x)
+    return run
+
+
+STAGE_SETUPS = {
+    "decode": setup_decode,
+    "filter": setup_filter,
+    "filter_array": setup_filter_array,
+    "crop_forced": lambda data_dir: setup_crop(data_dir, 'forced'),
+    "crop_padded": lambda data_dir: setup_crop(data_dir, 'padded'),
+    "crop_aware": lambda data_dir: setup_crop(data_dir, 'aware'),
+    "gray": setup_gray,
+    "gray_bulk": setup_gray_bulk,
+    "tf_data": setup_tf_data,
+    "inference": setup_inference,
+}
+
+
+def measure_stage(stage, data_dir, repeats=REPEATS):
+    """
+    현재 프로세스에서 단계 하나 측정 (새 프로세스에서 호출)
+    setup 은 run 함수 또는 (run, cleanup) 을 반환 (cleanup: 프로세스 풀 종료 등, 측정 후 항상 호출)
+    """
+    setup = STAGE_SETUPS[stage](data_dir)
+    run, cleanup = setup if isinstance(setup, tuple) else (setup, None)
+    best, items = None, 0
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            items = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        if cleanup is not None:
+            cleanup()
+    return {
+        "stage": stage,
+        "items": items,
+        "seconds": best,
+        "images_per_s": items / best if best > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_stage_process(stage, data_dir):
+    """새 프로세스에서 measure_stage 실행 → 결과 dict (실패 시 error)"""
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.hot_paths", "--stage", stage, data_dir],
+        capture_output=True, text=True
+    )
+    if out.returncode != 0:
+        error = out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "측정 실패"
+        return {"stage": stage, "error": error}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(n_images=N_IMAGES, stages=STAGES, results_path=RESULTS_PATH, data_dir=None):
+    """
+    data_dir: 합성 데이터셋 폴더 (None 이면 임시 폴더를 만들고 끝나면 삭제)
+    """
+    keep = data_dir is not None
+    data_dir = data_dir or tempfile.mkdtemp(prefix="hot_paths_")
+    try:
+        n_crops = make_synthetic_dataset(data_dir, n_images)
+        print(f"합성 데이터셋 생성: 원본 {n_images}장, crop {n_crops}개 ({data_dir})")
+
+        rows = []
+        for stage in stages:
+            row = run_stage_process(stage, data_dir)
+            if "error" in row:
+                print(f"⚠️ {stage} 측정 실패: {row['error']}")
+            rows.append(row)
+    finally:
+        if not keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"\n{'stage':<14} {'items':>7} {'images/s':>10} {'peak RSS(MB)':>13}")
+    print("-" * 47)
+    for row in rows:
+        if "error" in row:
+            print(f"{row['stage']:<14} {'실패':>7}")
+            continue
+        print(f"{row['stage']:<14} {row['items']:>7} {row['images_per_s']:>10.1f} {row['peak_rss_mb']:>13.1f}")
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "n_images": n_images,
+            "n_crops": n_crops,
+            "raw_size": list(RAW_SIZE),
+            "repeats": REPEATS,
+            "results": rows,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 결과 저장: {results_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--stage":
+        # python -m benchmarks.hot_paths --stage <단계> <데이터 폴더> → 측정 결과 JSON 한 줄 출력
+        print(json.dumps(measure_stage(sys.argv[2], sys.argv[3])))
+    else:
+        run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else N_IMAGES)
@@ -0,0 +1,112 @@
+# startup.py
+"""
+진입점(entry point)별 import 시간 측정
+- 모듈마다 새 Python 프로세스에서 `import 모듈` 만 실행 (python -X importtime)
+- 벽시계 시간(반복 중 최솟값), 무거운 라이브러리(TensorFlow / OpenCV / scikit-learn / matplotlib) 로드 여부,
+  누적 import 시간이 가장 큰 최상위 패키지 목록을 기록
+- 결과는 표로 출력하고 JSON 으로 저장 (지연 import 가 깨졌는지 비교용)
+실행: python -m benchmarks.startup
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+from datetime import datetime
+
+ENTRY_POINTS = [
+    "main",
+    "train.train",
+    "test.test",
+    "data_prep.pipeline",
+    "data_prep.packing",
+    "data_prep.model_input",
+    "serve.server",
+    "model.runtime",
+    "model.numpy_engine",
+]
+
+HEAVY_MODULES = ["tensorflow", "cv2", "sklearn", "matplotlib", "h5py"]
+
+REPEATS = 3  # 모듈마다 반복 측정 횟수 (최솟값 사용)
+TOP_N = 5  # 기록할 누적 import 시간 상위 패키지 수
+RESULTS_PATH = "results/startup_benchmark.json"
+
+# import 후 로드된 무거운 라이브러리 목록 출력
+PROBE = "import {module}, sys, json; print(json.dumps([m for m in {heavy!r} if m in sys.modules]))"
+
+
+def parse_importtime(stderr):
+    """-X importtime 출력 → {최상위 패키지: 누적 시간(ms)} (같은 패키지는 가장 바깥 import 기준)"""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        if not cumulative.isdigit():
+            continue  # 헤더 줄
+        top = name.split(".")[0]
+        totals[top] = max(totals.get(top, 0.0), int(cumulative) / 1000)
+    return totals
+
+
+def measure_import(module, repeats=REPEATS):
+    """새 프로세스에서 module import → (최소 벽시계 시간 s, 로드된 무거운 라이브러리, 상위 패키지)"""
+    best, loaded, top = None, [], []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - start
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import 실패")
+
+        if best is None or elapsed < best:
+            best = elapsed
+            loaded = json.loads(out.stdout.strip().splitlines()[-1])
+            totals = parse_importtime(out.stderr)
+            top = sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:TOP_N]
+    return best, loaded, top
+
+
+def run_benchmark(entry_points=ENTRY_POINTS, results_path=RESULTS_PATH):
+    rows = []
+    for module in entry_points:
+        try:
+            seconds, loaded, top = measure_import(module)
+        except RuntimeError as e:
+            print(f"⚠️ {module} import 실패: {e}")
+            rows.append({"module": module, "error": str(e)})
+            continue
+        rows.append({
+            "module": module,
+            "import_s": seconds,
+            "heavy_loaded": loaded,
+            "top_packages_ms": dict(top),
+        })
+
+    print(f"{'entry point':<24} {'import(s)':>9}  무거운 라이브러리")
+    print("-" * 60)
+    for row in rows:
+        if "error" in row:
+            print(f"{row['module']:<24} {'실패':>9}")
+            continue
+        print(f"{row['module']:<24} {row['import_s']:>9.3f}  {', '.join(row['heavy_loaded']) or '-'}")
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "repeats": REPEATS,
+            "results": rows,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 결과 저장: {results_path}")
+    return rows
+
+
+if __name__ == "__main__":
+    run_benchmark()
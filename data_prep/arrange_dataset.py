@@ -1,10 +1,9 @@
 # train, test 분리 저장
 import os
-import shutil
-import random
-import time  # time.sleep 사용 중이므로 추가
+import sys
 
-from data_prep.utils import OUTPUT_COLOR_DIRS, OUTPUT_GRAY_DIRS
+from data_prep.split_manifest import LINK_MODES, materialize_split
+from data_prep.seperating import plan_split
 
 # -----------------------------
 # 설정
@@ -18,7 +17,11 @@ DATASET_TYPES = [
     "3. aspect_aware_crop"
 ]
 
-train_ratio = 0.8
+# train/test 비율 / seed 는 seperating.py 와 같은 분할 매니페스트(dataset/splits/uniform.json) 사용
+
+# 파일 배치 방식: 'hardlink' / 'symlink' / 'copy' (hardlink 가 불가능하면 복사로 대체)
+#               'manifest' 이면 분할 매니페스트만 저장 (train/test 폴더 없이 RunConfig(split_manifest=...) 로 읽음)
+LINK_MODE = 'hardlink'
 
 # -----------------------------
 # 유틸 함수
@@ -26,68 +29,32 @@ train_ratio = 0.8
 def ensure_dir(path):
     os.makedirs(path, exist_ok=True)
 
-def print_progress(prefix, current, total, filename):
-    percent = (current / total) * 100
-    print(f"{prefix} [{current}/{total}] {percent:6.2f}% - {filename}", end="\r")
-
-
-# ★★★ 추가된 부분: 이미지 파일명 → 라벨 파일명 변환 함수 ★★★
-def get_label_name(image_filename):
-    # image_1_crop1_forced.jpg → 1_crop1_forced 뽑기
-    core = image_filename[len("image_") : image_filename.rfind(".")]
-    return f"label_{core}.txt"
-
-
-def split_dataset(img_dir, lbl_dir, train_img, train_lbl, test_img, test_lbl):
-    # 이미지 목록 정렬
-    images = sorted([f for f in os.listdir(img_dir) if f.lower().endswith((".jpg", ".png", ".jpeg"))])
-
-    total_files = len(images)
-    train_count = int(total_files * train_ratio)
-
-    train_files = images[:train_count]
-    test_files = images[train_count:]
-
-    # -----------------------------
-    # Train 파일 복사
-    # -----------------------------
-    print(f"\n  → Train 세트 복사 시작 ({len(train_files)}개)")
-    for idx, fname in enumerate(train_files, 1):
-        shutil.copy(os.path.join(img_dir, fname), os.path.join(train_img, fname))
-
-        # ★ 변경: 라벨 이름 생성 방식
-        label = get_label_name(fname)
-        shutil.copy(os.path.join(lbl_dir, label), os.path.join(train_lbl, label))
-
-        print_progress("    진행중", idx, len(train_files), fname)
-        time.sleep(0.001)
-
-    print()
-
-    # -----------------------------
-    # Test 파일 복사
-    # -----------------------------
-    print(f"  → Test 세트 복사 시작 ({len(test_files)}개)")
-    for idx, fname in enumerate(test_files, 1):
-        shutil.copy(os.path.join(img_dir, fname), os.path.join(test_img, fname))
-
-        # ★ 변경: 라벨 이름 생성 방식
-        label = get_label_name(fname)
-        shutil.copy(os.path.join(lbl_dir, label), os.path.join(test_lbl, label))
-
-        print_progress("    진행중", idx, len(test_files), fname)
-        time.sleep(0.001)
-
-    print("\n")
-
-    return len(train_files), len(test_files)
+def split_dataset(img_dir, lbl_dir, train_img, train_lbl, test_img, test_lbl, splits, mode=LINK_MODE):
+    """
+    splits: 분할 매니페스트의 {'train': [id, ...], 'test': [id, ...]} (seperating.plan_split)
+    매니페스트에 없는 기존 파일(이전 분할)은 train/test 폴더에서 삭제
+    반환: (train 수, test 수)
+    """
+    print(f"  → Train / Test 세트 배치 시작 ({mode})")
+    counts = materialize_split(
+        splits, img_dir, lbl_dir, {"train": (train_img, train_lbl), "test": (test_img, test_lbl)}, mode
+    )
+    return counts["train"], counts["test"]
 
 # -----------------------------
 # 메인
 # -----------------------------
-def main():
+def main(mode=LINK_MODE):
+    if mode not in LINK_MODES:
+        raise ValueError(f"⚠ 알 수 없는 분할 방식: {mode} (가능: {LINK_MODES})")
     print("데이터 분할 작업 시작...\n")
 
+    # 원본 이미지 단위 + 헬멧 비율 층화 분할 (seperating.py 와 같은 매니페스트, 이전 배정 유지)
+    splits, manifest_path = plan_split(os.path.join(BASE_DIR, DATASET_TYPES[0]))
+    if mode == 'manifest':
+        print(f"\n분할 매니페스트만 저장 (train/test 폴더 생성 안 함): {manifest_path}")
+        return
+
     for ds in DATASET_TYPES:
         print(f"[{ds}] 처리 시작")
 
@@ -109,12 +76,14 @@ def main():
         train_n, test_n = split_dataset(
             img_dir, lbl_dir,
             train_img, train_lbl,
-            test_img, test_lbl
+            test_img, test_lbl,
+            splits, mode
         )
 
         print(f" → Train: {train_n}개, Test: {test_n}개 완료\n")
 
-    print("\n모든 데이터셋 train/test 분류 완료!")
+    print(f"\n모든 데이터셋 train/test 분류 완료! (분할 매니페스트: {manifest_path})")
 
 if __name__ == "__main__":
-    main()
+    # python -m data_prep.arrange_dataset [hardlink|symlink|copy|manifest]
+    main(sys.argv[1] if len(sys.argv) > 1 else LINK_MODE)
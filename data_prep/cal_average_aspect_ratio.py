@@ -1,7 +1,8 @@
 # 종횡비 + 너비/높이 평균 계산 스크립트 (픽셀 단위 버전)
 import os
-import cv2
-from data_prep.utils import FILTERED_LABELS_DIR, FILTERED_IMAGES_DIR, get_bbox_pixel_coords
+import numpy as np
+from data_prep.utils import FILTERED_LABELS_DIR, FILTERED_IMAGES_DIR, load_label_array, get_bbox_pixel_coords_array
+from data_prep.image_size import load_dimension_index, save_dimension_index, get_image_size
 
 def compute_bbox_statistics():
     label_files = [
@@ -11,10 +12,10 @@ def compute_bbox_statistics():
 
     print(f"📄 총 라벨 파일 개수: {len(label_files)}")
 
-    widths = []
-    heights = []
-    ratios = []
+    # 이미지는 디코딩하지 않고 헤더에서 크기만 읽음 (캐시 공유)
+    dim_index = load_dimension_index()
 
+    label_paths, img_widths, img_heights = [], [], []
     for label_file in label_files:
         label_path = os.path.join(FILTERED_LABELS_DIR, label_file)
 
@@ -26,38 +27,34 @@ def compute_bbox_statistics():
             print(f"⚠️ 이미지 없음: {img_path}")
             continue
 
-        img = cv2.imread(img_path)
-        if img is None:
+        size = get_image_size(img_path, dim_index)
+        if size is None:
             print(f"⚠️ 이미지 읽기 실패: {img_path}")
             continue
 
-        h, w = img.shape[:2]
+        label_paths.append(label_path)
+        img_widths.append(size[0])
+        img_heights.append(size[1])
 
-        # 라벨 파일 읽기
-        with open(label_path, 'r', encoding='utf-8') as f:
-            lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+    save_dimension_index(dim_index)
 
-        for line in lines:
-            cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, w, h)
+    # 모든 라벨을 한 번에 읽어 bbox 픽셀 좌표를 배열 연산으로 계산
+    labels = load_label_array(label_paths)
+    w = np.asarray(img_widths, dtype=np.int64)[labels['image_id']]
+    h = np.asarray(img_heights, dtype=np.int64)[labels['image_id']]
+    boxes = get_bbox_pixel_coords_array(labels, w, h)
 
-            if cls is None:
-                continue
-
-            bbox_w = x_max - x_min
-            bbox_h = y_max - y_min
-
-            if bbox_w <= 0 or bbox_h <= 0:
-                continue
-
-            widths.append(bbox_w)
-            heights.append(bbox_h)
-            ratios.append(bbox_w / bbox_h)
+    bbox_w = boxes[:, 2] - boxes[:, 0]
+    bbox_h = boxes[:, 3] - boxes[:, 1]
+    valid = (bbox_w > 0) & (bbox_h > 0)
+    widths = bbox_w[valid]
+    heights = bbox_h[valid]
 
     # ===== 출력 =====
-    if widths:
-        avg_w = sum(widths) / len(widths)
-        avg_h = sum(heights) / len(heights)
-        avg_ratio = sum(ratios) / len(ratios)
+    if len(widths):
+        avg_w = widths.mean()
+        avg_h = heights.mean()
+        avg_ratio = (widths / heights).mean()
 
         print("\n📊 ==== BBOX 픽셀 단위 통계 결과 ====")
         print(f"📌 총 bbox 개수         : {len(widths)}")
@@ -21,9 +21,11 @@ def remap_class_2_to_0():
                 parts[0] = '0'
             new_lines.append(" ".join(parts))
         
-        with open(label_path, 'w', encoding='utf-8') as f:
-            for line in new_lines:
-                f.write(line + "\n")
+        # 바뀐 내용이 없으면 다시 쓰지 않음 (수정 시각 유지 → 이후 단계 증분 처리에서 변경 없음으로 판단)
+        if [line.rstrip("\n") for line in lines] != new_lines:
+            with open(label_path, 'w', encoding='utf-8') as f:
+                for line in new_lines:
+                    f.write(line + "\n")
         
         if idx % 10 == 0 or idx == total_files:
             print(f"[{idx}/{total_files}] 라벨 변환 완료: {label_file}")
@@ -1,54 +1,202 @@
+# color_to_gray.py
+"""
+컬러 crop → 흑백 crop 일괄 변환
+- crop 을 BATCH_SIZE 개씩 묶어 프로세스 풀에서 병렬로 디코딩 / 흑백 변환 / 인코딩 (한 장씩 순차 처리하지 않음)
+- 출력 'jpeg': 기존처럼 gray 폴더에 JPEG 저장, 라벨은 복사 대신 컬러 라벨 하드링크 (같은 파일 공유)
+  출력 'pack': JPEG 를 거치지 않고 packing.py 와 같은 패킹 데이터셋(images.npy / labels.npy / index.json)으로 바로 저장
+              라벨은 컬러 데이터셋의 라벨 인덱스를 그대로 사용 (gray 라벨 폴더 불필요)
+- 원본 이미지부터 한 번에 만들 때는 pipeline.py 가 컬러 crop 을 메모리에서 바로 흑백으로 변환
+"""
+
 import os
-import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import cv2
-from data_prep.utils import OUTPUT_COLOR_DIRS, OUTPUT_GRAY_DIRS
 
-def convert_color_to_gray():
-    print("컬러 이미지 → 흑백 이미지 변환 시작...")
+from data_prep.utils import OUTPUT_COLOR_DIRS, OUTPUT_GRAY_DIRS, DATASET_TYPES, STRATEGY_KEYS
+from data_prep.manifest import (
+    load_manifest,
+    save_manifest,
+    plan_incremental,
+    discard_entry,
+    record_entry,
+    prune_orphans
+)
+from data_prep.preprocessing import init_worker, NUM_WORKERS
+from data_prep.split_manifest import place_file
+from data_prep.label_index import get_label_index
+from data_prep.model_input import from_bgr, resize_uint8_numpy
+from data_prep.packing import get_pack_dir, get_pack_source_dirs, write_pack, pack_name
+
+GRAY_OUTPUTS = ('jpeg', 'pack')
+BATCH_SIZE = 64  # 워커 하나에 한 번에 넘길 crop 수
+LABEL_LINK_MODE = 'hardlink'  # 흑백 라벨 = 컬러 라벨 (하드링크, 불가능하면 복사)
+
+
+def make_batches(items, batch_size):
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def map_batches(executor, func, batches):
+    """executor 가 None 이면 현재 프로세스에서 순차 처리, 결과는 batches 순서대로"""
+    return map(func, batches) if executor is None else executor.map(func, batches)
+
+
+def convert_batch(pairs):
+    """
+    [(컬러 crop 경로, 흑백 crop 경로), ...] → 흑백 JPEG 저장 (워커 프로세스)
+    반환: 저장한 흑백 경로 목록 (읽기 실패는 None)
+    """
+    outputs = []
+    for color_path, gray_path in pairs:
+        img = cv2.imread(color_path)
+        if img is None:
+            outputs.append(None)
+            continue
+        cv2.imwrite(gray_path, cv2.cvtColor(img, cv2.COLOR_BGR2GRAY))
+        outputs.append(gray_path)
+    return outputs
+
+
+def gray_pack_batch(color_paths):
+    """컬러 crop 경로 목록 → TARGET_SIZE (H, W, 1) uint8 흑백 배열 목록 (워커 프로세스, 읽기 실패는 None)"""
+    images = []
+    for path in color_paths:
+        img = cv2.imread(path)
+        images.append(None if img is None else resize_uint8_numpy(from_bgr(img, 'gray')))
+    return images
+
+
+def convert_color_to_gray(incremental=True, num_workers=NUM_WORKERS, batch_size=BATCH_SIZE):
+    """
+    incremental: True 이면 매니페스트 기준으로 바뀐 컬러 이미지/라벨만 다시 변환/연결
+    num_workers: 프로세스 수 (1 이면 현재 프로세스에서 순차 처리)
+    batch_size : 워커에 한 번에 넘길 crop 수
+    """
+    print(f"컬러 이미지 → 흑백 이미지 변환 시작... (프로세스 {num_workers}개)")
     total_images_processed = 0
-    total_labels_copied = 0
-    
+    total_labels_linked = 0
+
+    manifest = load_manifest("color_to_gray")
+    params = {}
+    sources = {}
+    listings = {}
+
     for key in OUTPUT_COLOR_DIRS:
         color_image_dir = os.path.join(OUTPUT_COLOR_DIRS[key], 'images')
-        gray_image_dir  = os.path.join(OUTPUT_GRAY_DIRS[key], 'images')
         color_label_dir = os.path.join(OUTPUT_COLOR_DIRS[key], 'labels')
-        gray_label_dir  = os.path.join(OUTPUT_GRAY_DIRS[key], 'labels')
-        
-        os.makedirs(gray_image_dir, exist_ok=True)
-        os.makedirs(gray_label_dir, exist_ok=True)
-        
-        # 이미지 변환
+        os.makedirs(os.path.join(OUTPUT_GRAY_DIRS[key], 'images'), exist_ok=True)
+        os.makedirs(os.path.join(OUTPUT_GRAY_DIRS[key], 'labels'), exist_ok=True)
+
+        # 변환 대상 수집
         files = sorted(f for f in os.listdir(color_image_dir) if f.lower().endswith(('.jpg', '.png', '.jpeg')))
-        print(f"\n[{key}] 총 {len(files)}장 이미지 처리 예정")
-        for idx, file_name in enumerate(files, start=1):
-            color_path = os.path.join(color_image_dir, file_name)
-            gray_path  = os.path.join(gray_image_dir, file_name)
-            
-            img = cv2.imread(color_path)
-            if img is None:
-                print(f"⚠️ 이미지 읽기 실패: {color_path}")
-                continue
-            
-            gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            cv2.imwrite(gray_path, gray_img)
-            total_images_processed += 1
-            if idx % 10 == 0 or idx == len(files):
-                print(f"  [{idx}/{len(files)}] 이미지 변환 완료: {file_name}")
-        
-        # 라벨 복사
         label_files = sorted(f for f in os.listdir(color_label_dir) if f.endswith('.txt'))
-        print(f"[{key}] 총 {len(label_files)}장 라벨 처리 예정")
-        for idx, label_file in enumerate(label_files, start=1):
-            src_label = os.path.join(color_label_dir, label_file)
-            dst_label = os.path.join(gray_label_dir, label_file)
-            shutil.copy2(src_label, dst_label)
-            total_labels_copied += 1
-            if idx % 10 == 0 or idx == len(label_files):
-                print(f"  [{idx}/{len(label_files)}] 라벨 복사 완료: {label_file}")
-    
-    print(f"\n모든 이미지 흑백 변환 및 라벨 복사 완료!")
+        listings[key] = (files, label_files)
+        for f in files:
+            sources[f"{key}/images/{f}"] = [os.path.join(color_image_dir, f)]
+        for f in label_files:
+            sources[f"{key}/labels/{f}"] = [os.path.join(color_label_dir, f)]
+
+    todo, unchanged, orphans = plan_incremental(manifest, sources, params, incremental)
+    prune_orphans(manifest, orphans)
+    print(f"변경 없음 {len(unchanged)}개 건너뜀")
+
+    # 라벨: 흑백 라벨은 컬러 라벨과 내용이 같으므로 복사하지 않고 하드링크
+    for key in OUTPUT_COLOR_DIRS:
+        for label_file in listings[key][1]:
+            entry_key = f"{key}/labels/{label_file}"
+            if entry_key not in todo:
+                continue
+            dst_label = os.path.join(OUTPUT_GRAY_DIRS[key], 'labels', label_file)
+            discard_entry(manifest, entry_key)
+            place_file(os.path.join(OUTPUT_COLOR_DIRS[key], 'labels', label_file), dst_label, LABEL_LINK_MODE)
+            record_entry(manifest, entry_key, *todo[entry_key], [dst_label])
+            total_labels_linked += 1
+
+    # 이미지 변환 (세 가지 전처리 폴더를 한 작업 목록으로 묶어 병렬 처리)
+    jobs = []
+    for key in OUTPUT_COLOR_DIRS:
+        for file_name in listings[key][0]:
+            entry_key = f"{key}/images/{file_name}"
+            if entry_key in todo:
+                discard_entry(manifest, entry_key)
+                jobs.append((entry_key, os.path.join(OUTPUT_COLOR_DIRS[key], 'images', file_name),
+                             os.path.join(OUTPUT_GRAY_DIRS[key], 'images', file_name)))
+    batches = make_batches(jobs, max(1, batch_size))
+    print(f"총 {len(jobs)}장 이미지 처리 예정 ({len(batches)}개 묶음)")
+
+    executor = None if num_workers <= 1 else ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker)
+    try:
+        pair_batches = [[(color_path, gray_path) for _, color_path, gray_path in batch] for batch in batches]
+        done = 0
+        for batch, outputs in zip(batches, map_batches(executor, convert_batch, pair_batches)):
+            for (entry_key, color_path, _), gray_path in zip(batch, outputs):
+                if gray_path is None:
+                    print(f"⚠️ 이미지 읽기 실패: {color_path}")
+                    record_entry(manifest, entry_key, *todo[entry_key], [])
+                    continue
+                record_entry(manifest, entry_key, *todo[entry_key], [gray_path])
+                total_images_processed += 1
+            done += len(batch)
+            print(f"  [{done}/{len(jobs)}] 이미지 변환 완료")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        manifest["params"] = params
+        save_manifest("color_to_gray", manifest)
+
+    print(f"\n모든 이미지 흑백 변환 및 라벨 연결 완료!")
     print(f"총 이미지 변환: {total_images_processed}장")
-    print(f"총 라벨 복사: {total_labels_copied}장")
+    print(f"총 라벨 연결: {total_labels_linked}장 ({LABEL_LINK_MODE})")
+
+
+def pack_gray(strategies=(1, 2, 3), splits=('train', 'test'), num_workers=NUM_WORKERS, batch_size=BATCH_SIZE,
+              split_manifest=None):
+    """
+    컬러 train/test crop → 흑백 패킹 데이터셋 (data_prep/packing.py 와 같은 형식, load_pack 으로 읽음)
+    흑백 JPEG 를 만들지 않으므로 JPEG 인코딩 / 재디코딩 손실 없음
+    라벨 / 이름은 컬러 데이터셋의 라벨 인덱스를 그대로 사용
+    split_manifest: 주어지면 train/test 폴더 대신 분할 전 컬러 폴더 + 매니페스트의 split id 로 패킹
+    """
+    executor = None if num_workers <= 1 else ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker)
+    try:
+        for strategy in strategies:
+            for split in splits:
+                image_dir, label_dir = get_pack_source_dirs('color', strategy, split, split_manifest)
+                if not os.path.isdir(image_dir) or not os.path.isdir(label_dir):
+                    print(f"⚠️ 폴더 없음 → 건너뜀: {image_dir}")
+                    continue
+
+                img_paths, helmet_labels = get_label_index('color', strategy, split, split_manifest=split_manifest)
+                path_batches = make_batches(img_paths, max(1, batch_size))
+                print(f"[gray / {DATASET_TYPES[STRATEGY_KEYS[strategy]]} / {split}] 총 {len(img_paths)}장 패킹 시작")
+
+                def gray_batches():
+                    start = 0
+                    for paths, images in zip(path_batches, map_batches(executor, gray_pack_batch, path_batches)):
+                        for path, img in zip(paths, images):
+                            if img is None:
+                                print(f"  ⚠️ 이미지 읽기 실패: {path}")
+                        yield images, helmet_labels[start:start + len(paths)], [pack_name(p) for p in paths]
+                        start += len(paths)
+                        print(f"  [{start}/{len(img_paths)}] 패킹 중")
+
+                pack_dir = get_pack_dir('gray', strategy, split)
+                n = write_pack(pack_dir, 'gray', strategy, split, len(img_paths), gray_batches(), split_manifest)
+                print(f"✅ 흑백 패킹 완료: {pack_dir} ({n}장)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print("\n모든 흑백 패킹 데이터셋 생성 완료!")
+
 
 if __name__ == "__main__":
-    convert_color_to_gray()
+    # python -m data_prep.color_to_gray [jpeg|pack] [분할 매니페스트 경로 (pack)]
+    output = sys.argv[1] if len(sys.argv) > 1 else 'jpeg'
+    if output not in GRAY_OUTPUTS:
+        raise ValueError(f"⚠ 알 수 없는 출력 방식: {output} (가능: {GRAY_OUTPUTS})")
+    if output == 'pack':
+        pack_gray(split_manifest=sys.argv[2] if len(sys.argv) > 2 else None)
+    else:
+        convert_color_to_gray()
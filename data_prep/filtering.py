@@ -9,7 +9,6 @@
 
 import os
 import shutil
-import cv2
 
 # utils.py 에서 필요한 것들 import
 from data_prep.utils import (
@@ -20,6 +19,15 @@ from data_prep.utils import (
     FILTERED_LABELS_DIR,
     get_bbox_pixel_coords
 )
+from data_prep.manifest import (
+    load_manifest,
+    save_manifest,
+    plan_incremental,
+    discard_entry,
+    record_entry,
+    prune_orphans
+)
+from data_prep.image_size import load_dimension_index, save_dimension_index, get_image_size
 
 # bbox 최소 크기 기준 (픽셀 기준)
 MIN_BBOX_WIDTH, MIN_BBOX_HEIGHT = FILTER_SIZE
@@ -35,81 +43,125 @@ def get_number_from_filename(name: str) -> str:
     return ''.join(ch for ch in name if ch.isdigit())
 
 
-def filter_dataset():
-    ensure_dirs()
+def get_label_path(img_name):
+    """원본 이미지에 대응하는 원본 라벨 경로 (image_12.jpg → label_12.txt)"""
+    num = get_number_from_filename(img_name)
+    return os.path.join(RAW_LABELS_DIR, f"label_{num}.txt")
 
-    img_files = sorted(
-        f for f in os.listdir(RAW_IMAGES_DIR)
-        if f.lower().endswith(('.jpg', '.jpeg', '.png'))
-    )
 
-    total_images = len(img_files)
-    kept_images = 0
-    kept_labels = 0
+def filter_image(img_name, dim_index=None):
+    """
+    원본 이미지 1장 필터링 (이미지는 디코딩하지 않고 헤더에서 크기만 읽음)
+    dim_index: 이미지 크기 캐시 (image_size.load_dimension_index)
+    반환: 생성한 출력 파일 경로 목록 (제외된 이미지는 빈 목록)
+    """
+    raw_img_path = os.path.join(RAW_IMAGES_DIR, img_name)
 
-    print(f"원본 이미지 개수: {total_images}")
+    # 이미지 크기 읽기
+    size = get_image_size(raw_img_path, dim_index)
+    if size is None:
+        print(f"  ⚠️ 이미지 읽기 실패: {raw_img_path}")
+        return []
 
-    for img_name in img_files:
-        raw_img_path = os.path.join(RAW_IMAGES_DIR, img_name)
+    w, h = size
 
-        # 이미지 읽기
-        img = cv2.imread(raw_img_path)
-        if img is None:
-            print(f"  ⚠️ 이미지 읽기 실패: {raw_img_path}")
-            continue
+    # ----- 라벨 매칭 -----
+    raw_label_path = get_label_path(img_name)
+    label_name = os.path.basename(raw_label_path)
 
-        h, w = img.shape[:2]
+    if not os.path.isfile(raw_label_path):
+        print(f"  ⚠️ 라벨 없음 → 제외: {label_name}")
+        return []
 
-        # ----- 라벨 매칭 -----
-        num = get_number_from_filename(img_name)
-        label_name = f"label_{num}.txt"
-        raw_label_path = os.path.join(RAW_LABELS_DIR, label_name)
+    # 라벨 읽기
+    with open(raw_label_path, "r", encoding="utf-8") as f:
+        lines = [ln.strip() for ln in f.readlines() if ln.strip()]
 
-        if not os.path.isfile(raw_label_path):
-            print(f"  ⚠️ 라벨 없음 → 제외: {label_name}")
+    kept_lines = []
+    for line in lines:
+        # YOLO → 픽셀 변환
+        cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, w, h)
+
+        if cls is None:
+            print(f"    ⚠️ 라벨 포맷 오류: {line}")
             continue
 
-        # 라벨 읽기
-        with open(raw_label_path, "r", encoding="utf-8") as f:
-            lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+        bbox_w = x_max - x_min
+        bbox_h = y_max - y_min
+
+        # bbox 크기 필터
+        if bbox_w < MIN_BBOX_WIDTH or bbox_h < MIN_BBOX_HEIGHT:
+            print(f"    ✂️ 작은 bbox 제외: {line}")
+            continue
 
-        kept_lines = []
-        for line in lines:
-            # YOLO → 픽셀 변환
-            cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, w, h)
+        kept_lines.append(line)
 
-            if cls is None:
-                print(f"    ⚠️ 라벨 포맷 오류: {line}")
-                continue
+    # 조건을 만족하는 bbox가 하나도 없으면 이미지/라벨 제외
+    if not kept_lines:
+        print(f"  ✂️ 이미지 제외 (유효 bbox 없음): {img_name}")
+        return []
 
-            bbox_w = x_max - x_min
-            bbox_h = y_max - y_min
+    # 이미지 복사
+    dst_img_path = os.path.join(FILTERED_IMAGES_DIR, img_name)
+    shutil.copy2(raw_img_path, dst_img_path)
+    print(f"  ✅ 이미지 복사: {dst_img_path}")
 
-            # bbox 크기 필터
-            if bbox_w < MIN_BBOX_WIDTH or bbox_h < MIN_BBOX_HEIGHT:
-                print(f"    ✂️ 작은 bbox 제외: {line}")
-                continue
+    # 라벨 생성
+    dst_label_path = os.path.join(FILTERED_LABELS_DIR, label_name)
+    with open(dst_label_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(kept_lines) + "\n")
 
-            kept_lines.append(line)
+    print(f"    ✅ 라벨 저장: {dst_label_path} (lines: {len(kept_lines)})")
+    return [dst_img_path, dst_label_path]
 
-        # 조건을 만족하는 bbox가 하나도 없으면 이미지/라벨 제외
-        if not kept_lines:
-            print(f"  ✂️ 이미지 제외 (유효 bbox 없음): {img_name}")
-            continue
 
-        # 이미지 복사
-        dst_img_path = os.path.join(FILTERED_IMAGES_DIR, img_name)
-        shutil.copy2(raw_img_path, dst_img_path)
-        kept_images += 1
-        print(f"  ✅ 이미지 복사: {dst_img_path}")
+def filter_dataset(incremental=True):
+    """
+    incremental: True 이면 매니페스트 기준으로 원본 이미지/라벨 또는 FILTER_SIZE 가 바뀐 항목만 다시 처리
+    """
+    ensure_dirs()
+
+    img_files = sorted(
+        f for f in os.listdir(RAW_IMAGES_DIR)
+        if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+
+    total_images = len(img_files)
+    kept_images = 0
+    kept_labels = 0
+
+    print(f"원본 이미지 개수: {total_images}")
 
-        # 라벨 생성
-        dst_label_path = os.path.join(FILTERED_LABELS_DIR, label_name)
-        with open(dst_label_path, "w", encoding="utf-8") as f:
-            f.write("\n".join(kept_lines) + "\n")
+    manifest = load_manifest("filter")
+    params = {"FILTER_SIZE": list(FILTER_SIZE)}
+    sources = {
+        img_name: [os.path.join(RAW_IMAGES_DIR, img_name), get_label_path(img_name)]
+        for img_name in img_files
+    }
+    todo, unchanged, orphans = plan_incremental(manifest, sources, params, incremental)
+    prune_orphans(manifest, orphans)
+    print(f"처리 대상: {len(todo)}장 (변경 없음 {len(unchanged)}장 건너뜀)")
+
+    dim_index = load_dimension_index()
+
+    for img_name in img_files:
+        if img_name not in todo:
+            if manifest["entries"][img_name]["outputs"]:
+                kept_images += 1
+                kept_labels += 1
+            continue
 
-        kept_labels += 1
-        print(f"    ✅ 라벨 저장: {dst_label_path} (lines: {len(kept_lines)})")
+        # 이전 출력 삭제 후 다시 생성
+        discard_entry(manifest, img_name)
+        outputs = filter_image(img_name, dim_index)
+        record_entry(manifest, img_name, *todo[img_name], outputs)
+        if outputs:
+            kept_images += 1
+            kept_labels += 1
+
+    manifest["params"] = params
+    save_manifest("filter", manifest)
+    save_dimension_index(dim_index)
 
     # 요약 출력
     print("\n🎉 필터링 완료")
@@ -0,0 +1,135 @@
+# grouped_split.py
+"""
+원본 이미지 단위(그룹) + 헬멧 클래스 비율(층화)을 지키는 재현 가능한 분할
+- 같은 원본 이미지에서 나온 crop(image_12_1, image_12_2 ...)은 항상 같은 split → train / val / test 사이 누수 없음
+- 그룹 층(stratum): 헬멧만 / 헬멧 없음만 / 섞임 → 층마다 crop 수 기준으로 목표 비율에 맞춰 배정
+- 새 그룹은 seed 해시 순서로 배정, 이전 배정(previous)은 그대로 유지
+  → 이미지를 추가해도 기존 샘플의 split 이 바뀌지 않아 패킹 데이터셋 / 캐시가 계속 유효
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+STRATA = ('helmet', 'no_helmet', 'mixed')
+
+
+def source_group(sample_id):
+    """crop id → 원본 이미지 번호 ('12_3' → '12', 'image_12_3.jpg' 도 가능)"""
+    name = os.path.splitext(os.path.basename(sample_id))[0]
+    if name.startswith("image_"):
+        name = name[len("image_"):]
+    return name.split("_")[0]
+
+
+def group_hash(group, seed):
+    """그룹 이름의 seed 해시 → [0, 1) (처리 순서 / 프로세스 수와 무관)"""
+    digest = hashlib.md5(f"{seed}:{group}".encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+def group_stratum(labels):
+    """그룹 crop 들의 helmet 여부 목록 → 층 이름"""
+    has_helmet = any(labels)
+    if has_helmet and not all(labels):
+        return 'mixed'
+    return 'helmet' if has_helmet else 'no_helmet'
+
+
+def collect_groups(sample_ids, labels):
+    """(crop id 목록, helmet 여부 목록) → {그룹: (crop 수, 층)}"""
+    members = {}
+    for sid, label in zip(sample_ids, labels):
+        members.setdefault(source_group(sid), []).append(int(label))
+    return {group: (len(ls), group_stratum(ls)) for group, ls in members.items()}
+
+
+def assign_groups(groups, ratio, seed, previous=None, names=("train", "test")):
+    """
+    groups  : {그룹: (crop 수, 층)}
+    ratio   : names[0] 에 배정할 crop 비율 (층마다 적용)
+    previous: 이전 배정 {그룹: split} (모두 유지, 이번에 없는 그룹도 남겨 두어 다시 추가되면 같은 split)
+    반환: {그룹: split} (groups 의 모든 그룹 + 이전 배정)
+    새 그룹은 층마다 해시 순서로, 배정 후 names[0] 비율이 ratio 에 가장 가깝도록 배정
+    """
+    previous = previous or {}
+    first, second = names
+    assignment = {g: s for g, s in previous.items() if s in names}
+
+    # 층별 누적 crop 수 (이번에 있는 그룹의 이전 배정 포함)
+    totals = {stratum: [0, 0] for stratum in STRATA}  # [names[0] crop 수, 전체 crop 수]
+    for group, split in assignment.items():
+        if group not in groups:
+            continue
+        weight, stratum = groups[group]
+        totals[stratum][1] += weight
+        if split == first:
+            totals[stratum][0] += weight
+
+    new_groups = sorted((g for g in groups if g not in assignment), key=lambda g: (group_hash(g, seed), g))
+    for group in new_groups:
+        weight, stratum = groups[group]
+        n_first, n_total = totals[stratum]
+        # names[0] 에 넣었을 때 목표 대비 초과분이 crop 절반 이하이면 names[0]
+        to_first = n_first + weight / 2 <= ratio * (n_total + weight)
+        assignment[group] = first if to_first else second
+        totals[stratum][0] += weight if to_first else 0
+        totals[stratum][1] += weight
+    return assignment
+
+
+def split_samples(sample_ids, labels, ratio, seed, previous=None, names=("train", "test")):
+    """
+    반환: (샘플별 split 리스트, 그룹 배정 {그룹: split} (이전 배정의 사라진 그룹 포함))
+    """
+    groups = collect_groups(sample_ids, labels)
+    assignment = assign_groups(groups, ratio, seed, previous, names)
+    return [assignment[source_group(sid)] for sid in sample_ids], assignment
+
+
+# ===============================
+# 배정 저장 / 로드 (이미지를 추가해도 이전 배정 유지)
+# ===============================
+def load_assignment(path, params):
+    """저장된 그룹 배정 (파일이 없거나 params(seed / 비율 등)가 다르면 None)"""
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        saved = json.load(f)
+    if saved.get("params") != params:
+        print(f"⚠️ 분할 설정이 바뀌어 이전 배정을 사용하지 않음: {path}")
+        return None
+    return saved["groups"]
+
+
+def save_assignment(path, assignment, params):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"params": params, "groups": assignment}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def stable_split(sample_ids, labels, ratio, seed, state_path, names=("train", "test")):
+    """
+    split_samples + 배정 파일(state_path) 로 이전 배정 유지
+    (사라진 그룹의 배정도 파일에 남김 → 원본 이미지를 뺐다가 다시 추가해도 같은 split)
+    반환: 샘플별 split 리스트
+    """
+    params = {"ratio": ratio, "seed": seed, "names": list(names)}
+    previous = load_assignment(state_path, params)
+    splits, assignment = split_samples(sample_ids, labels, ratio, seed, previous, names)
+    if assignment != previous:
+        save_assignment(state_path, assignment, params)
+    return splits
+
+
+def report_split(splits, labels, names=("train", "test")):
+    """split 별 crop 수 / 헬멧 비율 출력"""
+    parts = []
+    for name in names:
+        ys = [y for s, y in zip(splits, labels) if s == name]
+        ratio = sum(ys) / len(ys) if ys else 0.0
+        parts.append(f"{name} {len(ys)}개 (헬멧 {ratio:.1%})")
+    print("🔀 그룹 분할: " + ", ".join(parts))
@@ -0,0 +1,162 @@
+# image_size.py
+"""
+이미지 크기(너비, 높이)를 픽셀 디코딩 없이 JPEG/PNG 헤더만 읽어 구하는 모듈
+- JPEG: SOF 마커의 크기 + EXIF 회전 정보(cv2.imread 와 같은 방향 기준)
+- PNG : IHDR 청크
+- 한 번 구한 크기는 (경로, 파일 크기, 수정 시각) 기준으로 캐시 → 재실행 시 파일을 다시 열지 않음
+- 헤더를 해석할 수 없는 파일은 cv2.imread 로 대체
+"""
+
+import os
+import json
+import struct
+import threading
+
+from data_prep.utils import DIMENSION_INDEX_PATH
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 크기 정보가 들어 있는 JPEG SOF 마커 (DHT=C4, JPG=C8, DAC=CC 제외)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+
+def read_exif_orientation(data):
+    """APP1 세그먼트 데이터에서 EXIF 회전 값(1~8) 추출, 없으면 1"""
+    if not data.startswith(b"Exif\x00\x00"):
+        return 1
+    tiff = data[6:]
+    if len(tiff) < 8:
+        return 1
+    endian = "<" if tiff[:2] == b"II" else ">"
+    ifd_offset = struct.unpack(endian + "I", tiff[4:8])[0]
+    if ifd_offset + 2 > len(tiff):
+        return 1
+
+    n_entries = struct.unpack(endian + "H", tiff[ifd_offset:ifd_offset + 2])[0]
+    for i in range(n_entries):
+        entry = tiff[ifd_offset + 2 + i * 12: ifd_offset + 14 + i * 12]
+        if len(entry) < 12:
+            break
+        tag = struct.unpack(endian + "H", entry[:2])[0]
+        if tag == EXIF_ORIENTATION_TAG:
+            return struct.unpack(endian + "H", entry[8:10])[0]
+    return 1
+
+
+def probe_jpeg_size(f):
+    """JPEG 마커를 따라가며 SOF 에서 (w, h) 반환 (EXIF 회전 5~8 이면 가로/세로 교환)"""
+    orientation = 1
+    while True:
+        b = f.read(1)
+        while b and b != b"\xff":
+            b = f.read(1)
+        while b == b"\xff":
+            b = f.read(1)
+        if not b:
+            return None
+
+        marker = b[0]
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            continue  # 길이 없는 마커
+        if marker in (0xD9, 0xDA):
+            return None  # SOF 없이 이미지 데이터 시작
+
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        seg_len = struct.unpack(">H", length_bytes)[0]
+
+        if marker in SOF_MARKERS:
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            h, w = struct.unpack(">HH", data[1:5])
+            if orientation in (5, 6, 7, 8):
+                w, h = h, w
+            return w, h
+        if marker == 0xE1:
+            orientation = read_exif_orientation(f.read(seg_len - 2))
+        else:
+            f.seek(seg_len - 2, os.SEEK_CUR)
+
+
+def probe_image_size(path):
+    """헤더만 읽어 (w, h) 반환, 해석할 수 없으면 None"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(8)
+            if head[:2] == b"\xff\xd8":
+                f.seek(2)
+                return probe_jpeg_size(f)
+            if head == PNG_SIGNATURE:
+                ihdr = f.read(16)
+                if len(ihdr) == 16 and ihdr[4:8] == b"IHDR":
+                    return struct.unpack(">II", ihdr[8:16])
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+def load_dimension_index(path=DIMENSION_INDEX_PATH):
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_dimension_index(index, path=DIMENSION_INDEX_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+
+def get_image_size(path, index=None):
+    """
+    이미지 (w, h) 반환 (읽을 수 없으면 None)
+    index: load_dimension_index() 결과, 주어지면 캐시 조회/갱신 (저장은 호출한 쪽에서)
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+
+    key = os.path.abspath(path)
+    if index is not None:
+        cached = index.get(key)
+        if cached is not None and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2], cached[3]
+
+    size = probe_image_size(path)
+    if size is None:
+        # 헤더 해석 실패 → 디코딩으로 대체
+        import cv2  # 헤더를 해석할 수 없는 경우에만 사용
+        img = cv2.imread(path)
+        if img is None:
+            return None
+        size = (img.shape[1], img.shape[0])
+
+    if index is not None:
+        index[key] = [st.st_size, st.st_mtime_ns, int(size[0]), int(size[1])]
+    return int(size[0]), int(size[1])
+
+
+def needs_resize_flags(paths, target_size, index_path=DIMENSION_INDEX_PATH):
+    """
+    이미지마다 target_size (w, h) 와 크기가 다른지 여부 (헤더 기준, 크기 캐시 사용)
+    크기를 알 수 없는 이미지는 resize 필요로 간주
+    index_path: 크기 캐시 파일 (다른 데이터셋 폴더를 사용할 때 RunConfig.dimension_index_path)
+    """
+    index = load_dimension_index(index_path)
+    target_size = tuple(target_size)
+    flags = [get_image_size(p, index) != target_size for p in paths]
+    save_dimension_index(index, index_path)
+    return flags
+
+
+def report_resize_flags(flags, name=""):
+    n_resize = sum(flags)
+    print(f"📐 {name} resize 생략 {len(flags) - n_resize}장 / resize {n_resize}장")
@@ -0,0 +1,177 @@
+# label_index.py
+"""
+전처리 데이터셋의 (이미지 경로, helmet 여부) 목록 캐시
+- color/전략/split 마다 한 번만 os.scandir 로 만들고 JSON 으로 저장
+- 이미지/라벨 폴더의 수정 시각 또는 데이터 준비 매니페스트가 바뀌면 다시 생성
+  (라벨을 덮어쓰는 단계는 매니페스트를 갱신: pipeline.py 는 pipeline.json, 'copy' 분할은 파일을 지우고 다시 만들어 폴더 수정 시각 변경)
+  매니페스트 없이 라벨을 직접 고친 경우는 verify=True 로 파일 단위 (크기, 수정 시각) 까지 확인 (파일 수만큼 stat)
+- 학습(train_model), 테스트(test_model), 패킹(packing.py)이 같은 목록을 사용
+- 분할 매니페스트(split_manifest.py)를 주면 train/test 폴더 대신 분할 전 폴더에서 매니페스트의 id 만 사용
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+from data_prep.utils import (
+    PREPROCESSED_DIR,
+    MANIFEST_DIR,
+    DIMENSION_INDEX_PATH,
+    LABEL_INDEX_DIR,
+    HELMET_CLASS_ID,
+    DATASET_TYPES,
+    STRATEGY_KEYS
+)
+from data_prep.split_manifest import get_source_dirs, load_split_ids, sample_id
+
+IMAGE_EXTS = [".jpg", ".png", ".jpeg"]  # 같은 이름이 여러 개면 앞쪽 확장자 우선
+
+
+def get_split_dirs(color, strategy, split, preprocessed_dir=PREPROCESSED_DIR):
+    """전처리 이미지/라벨 폴더 경로 반환: (images, labels)"""
+    base = os.path.join(preprocessed_dir, color, split, DATASET_TYPES[STRATEGY_KEYS[strategy]])
+    return os.path.join(base, "images"), os.path.join(base, "labels")
+
+
+def read_helmet_label(label_path):
+    """라벨 파일에 헬멧 클래스가 한 줄이라도 있으면 1"""
+    with open(label_path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if parts and int(parts[0]) == HELMET_CLASS_ID:
+                return 1
+    return 0
+
+
+def build_label_index(image_dir, label_dir):
+    """
+    폴더를 한 번씩만 훑어 라벨 파일(이름순)과 이미지 파일을 짝지음
+    반환: (이미지 경로 리스트, helmet 여부 리스트)
+    """
+    images = {}
+    with os.scandir(image_dir) as it:
+        for entry in it:
+            stem, ext = os.path.splitext(entry.name)
+            if ext in IMAGE_EXTS and stem.startswith("image_"):
+                prev = images.get(stem)
+                if prev is None or IMAGE_EXTS.index(ext) < IMAGE_EXTS.index(os.path.splitext(prev)[1]):
+                    images[stem] = entry.name
+
+    with os.scandir(label_dir) as it:
+        label_files = sorted(e.name for e in it if e.name.startswith("label_") and e.name.endswith(".txt"))
+
+    img_paths, labels = [], []
+    for label_file in label_files:
+        img_name = images.get("image_" + label_file[len("label_"):-len(".txt")])
+        if img_name is None:
+            continue
+        img_paths.append(os.path.join(image_dir, img_name))
+        labels.append(read_helmet_label(os.path.join(label_dir, label_file)))
+    return img_paths, labels
+
+
+def manifest_stamp(manifest_dir=MANIFEST_DIR, dimension_index_path=DIMENSION_INDEX_PATH):
+    """
+    데이터 준비 매니페스트 파일들의 (이름, 크기, 수정 시각) 해시 (없으면 None)
+    이미지 크기 캐시(dimension_index_path)는 라벨과 무관하므로 제외
+    """
+    if not os.path.isdir(manifest_dir):
+        return None
+    h = hashlib.sha1()
+    for name in sorted(os.listdir(manifest_dir)):
+        path = os.path.join(manifest_dir, name)
+        if not name.endswith(".json") or os.path.abspath(path) == os.path.abspath(dimension_index_path):
+            continue
+        st = os.stat(path)
+        h.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def label_files_stamp(label_dir):
+    """라벨 파일들의 (이름, 크기, 수정 시각) 해시 (파일 내용은 읽지 않음, 심볼릭 링크는 원본 기준)"""
+    with os.scandir(label_dir) as it:
+        entries = sorted(
+            (e.name, e.stat()) for e in it if e.name.startswith("label_") and e.name.endswith(".txt")
+        )
+    h = hashlib.sha1()
+    for name, st in entries:
+        h.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+    return h.hexdigest()
+
+
+def get_index_source_dirs(color, strategy, preprocessed_dir, split, split_manifest=None):
+    """라벨 인덱스를 만드는 (images, labels) 폴더 (split_manifest 가 있으면 분할 전 폴더)"""
+    if split_manifest is None:
+        return get_split_dirs(color, strategy, split, preprocessed_dir)
+    return get_source_dirs(color, strategy, preprocessed_dir)
+
+
+def label_index_key(image_dir, label_dir, split_manifest=None,
+                    manifest_dir=MANIFEST_DIR, dimension_index_path=DIMENSION_INDEX_PATH):
+    """라벨 인덱스 캐시 키 (폴더 수정 시각 + 데이터 준비 매니페스트 + 분할 매니페스트, 파일 단위 stat 없음)"""
+    key = {
+        "image_dir": image_dir,
+        "label_dir": label_dir,
+        "image_dir_mtime": os.stat(image_dir).st_mtime_ns,
+        "label_dir_mtime": os.stat(label_dir).st_mtime_ns,
+        "manifest_dir": os.path.abspath(manifest_dir),
+        "manifest": manifest_stamp(manifest_dir, dimension_index_path),
+    }
+    if split_manifest is not None:
+        st = os.stat(split_manifest)
+        key["split_manifest"] = [os.path.abspath(split_manifest), st.st_size, st.st_mtime_ns]
+    return key
+
+
+def label_index_stamp(color, strategy, split, preprocessed_dir=PREPROCESSED_DIR, split_manifest=None,
+                      manifest_dir=MANIFEST_DIR, dimension_index_path=DIMENSION_INDEX_PATH):
+    """
+    label_index_key 의 해시 (12자리): 데이터 준비 단계가 이미지/라벨을 다시 만들면 바뀜
+    라벨 인덱스에서 파생된 캐시(학습 디스크 캐시 등)의 이름에 사용
+    """
+    image_dir, label_dir = get_index_source_dirs(color, strategy, preprocessed_dir, split, split_manifest)
+    key = label_index_key(image_dir, label_dir, split_manifest, manifest_dir, dimension_index_path)
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def get_label_index(color, strategy, split, force=False,
+                    preprocessed_dir=PREPROCESSED_DIR, index_dir=LABEL_INDEX_DIR, split_manifest=None,
+                    manifest_dir=MANIFEST_DIR, dimension_index_path=DIMENSION_INDEX_PATH, verify=False):
+    """
+    캐시된 (이미지 경로 리스트, helmet 여부 리스트) 반환
+    force: True 이면 캐시를 무시하고 다시 생성
+    preprocessed_dir / index_dir / manifest_dir / dimension_index_path:
+        다른 데이터셋 폴더를 사용할 때 (RunConfig.dataset_dir 기준 경로, 캐시 키도 그 데이터셋의 매니페스트 기준)
+    verify: True 이면 라벨 파일마다 (크기, 수정 시각) 도 비교 (기본은 폴더 수정 시각 + 매니페스트만 확인)
+    split_manifest: 분할 매니페스트 경로 (주어지면 분할 전 폴더에서 매니페스트의 split id 만 사용)
+    """
+    image_dir, label_dir = get_index_source_dirs(color, strategy, preprocessed_dir, split, split_manifest)
+    if split_manifest is None:
+        cache_path = os.path.join(index_dir, f"{color}_{split}_{strategy}.json")
+    else:
+        manifest_name = os.path.splitext(os.path.basename(split_manifest))[0]
+        cache_path = os.path.join(index_dir, f"{color}_{split}_{strategy}_{manifest_name}.json")
+    key = label_index_key(image_dir, label_dir, split_manifest, manifest_dir, dimension_index_path)
+
+    if not force and os.path.isfile(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["key"] == key and (not verify or cached.get("label_files") == label_files_stamp(label_dir)):
+            return cached["image_paths"], cached["labels"]
+
+    img_paths, labels = build_label_index(image_dir, label_dir)
+    if split_manifest is not None:
+        ids = load_split_ids(split_manifest, split)
+        keep = [i for i, p in enumerate(img_paths) if sample_id(os.path.basename(p)) in ids]
+        img_paths, labels = [img_paths[i] for i in keep], [labels[i] for i in keep]
+
+    os.makedirs(index_dir, exist_ok=True)
+    # 여러 스레드 / 프로세스가 동시에 만들어도 서로의 임시 파일을 덮어쓰지 않도록
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "label_files": label_files_stamp(label_dir),
+                   "image_paths": img_paths, "labels": labels}, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    print(f"✅ 라벨 인덱스 생성: {cache_path} ({len(labels)}개)")
+    return img_paths, labels
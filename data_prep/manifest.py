@@ -0,0 +1,121 @@
+# manifest.py
+"""
+데이터 준비 단계별 증분 처리용 매니페스트
+- 입력 파일(원본 이미지 + 라벨 등)의 내용 해시와 사용한 파라미터를 기록
+- 입력 또는 파라미터가 바뀌었거나 출력 파일이 없어진 항목만 다시 처리하고, 입력이 사라진 항목의 출력은 삭제
+- 파일 크기/수정 시각이 기록과 같으면 해시를 다시 계산하지 않음
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+from data_prep.utils import MANIFEST_DIR
+
+
+def get_manifest_path(step):
+    return os.path.join(MANIFEST_DIR, f"{step}.json")
+
+
+def load_manifest(step):
+    """매니페스트 로드 (없으면 빈 매니페스트)"""
+    path = get_manifest_path(step)
+    if not os.path.isfile(path):
+        return {"params": None, "entries": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(step, manifest):
+    """임시 파일에 쓴 뒤 교체 (중간에 중단돼도 기존 매니페스트 유지)"""
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    path = get_manifest_path(step)
+    # 같은 단계를 동시에 실행해도 서로의 임시 파일을 덮어쓰지 않도록
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def file_stats(paths):
+    """[크기, 수정 시각(ns)] 목록 (파일이 없으면 None)"""
+    stats = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            stats.append([st.st_size, st.st_mtime_ns])
+        except FileNotFoundError:
+            stats.append(None)
+    return stats
+
+
+def fingerprint(paths, prev_entry=None):
+    """
+    입력 파일들의 내용 해시 계산
+    prev_entry 의 크기/수정 시각이 현재와 같으면 기록된 해시를 재사용
+    반환: (해시 문자열, stats)
+    """
+    stats = file_stats(paths)
+    if prev_entry is not None and prev_entry.get("stats") == stats:
+        return prev_entry["hash"], stats
+
+    h = hashlib.sha1()
+    for p, st in zip(paths, stats):
+        h.update(os.path.basename(p).encode("utf-8"))
+        if st is None:
+            h.update(b"<missing>")
+            continue
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest(), stats
+
+
+def plan_incremental(manifest, sources, params, incremental=True):
+    """
+    sources: {항목 키: [입력 파일 경로, ...]}
+    params : 이 단계에서 사용하는 파라미터 (바뀌면 전체 재처리)
+    반환: (todo {키: (해시, stats)}, 변경 없는 키 목록, 입력이 사라진 키 목록)
+    """
+    entries = manifest["entries"]
+    params_changed = manifest.get("params") != params
+
+    todo, unchanged = {}, []
+    for key, paths in sources.items():
+        prev = entries.get(key)
+        digest, stats = fingerprint(paths, prev)
+        if (incremental and not params_changed and prev is not None and prev["hash"] == digest
+                and all(os.path.exists(o) for o in prev["outputs"])):
+            unchanged.append(key)
+        else:
+            todo[key] = (digest, stats)
+
+    orphans = [key for key in entries if key not in sources]
+    return todo, unchanged, orphans
+
+
+def remove_outputs(paths):
+    for p in paths:
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def discard_entry(manifest, key):
+    """이전 실행에서 만든 출력 파일 삭제 + 항목 제거"""
+    entry = manifest["entries"].pop(key, None)
+    if entry is not None:
+        remove_outputs(entry.get("outputs", []))
+
+
+def record_entry(manifest, key, digest, stats, outputs):
+    manifest["entries"][key] = {"hash": digest, "stats": stats, "outputs": list(outputs)}
+
+
+def prune_orphans(manifest, orphans):
+    """입력이 사라진 항목의 출력 삭제, 삭제한 항목 수 반환"""
+    for key in orphans:
+        discard_entry(manifest, key)
+    if orphans:
+        print(f"🧹 입력이 사라진 항목 {len(orphans)}개의 출력 삭제")
+    return len(orphans)
@@ -0,0 +1,267 @@
+# model_input.py
+"""
+모델 입력 전처리 (학습 / 테스트 / 패킹 / 서빙 공통)
+- 채널: 컬러는 RGB (H, W, 3), 흑백은 (H, W, 1)
+- 크기: TARGET_SIZE (w, h), bilinear, 이미 같은 크기면 resize 생략
+- 값  : float32, 0~1 (uint8 저장용은 반올림한 0~255)
+- backend 'tf'   : tf.io / tf.image 그래프 연산 (tf.data 파이프라인용)
+  backend 'numpy': OpenCV + NumPy (테스트 / 서빙용, TensorFlow 불필요)
+  (OpenCV / TensorFlow 는 해당 backend 를 사용할 때 불러옴)
+  두 backend 는 같은 텐서를 내도록 맞춤 → check_parity 로 확인
+  (python -m data_prep.model_input: 합성 crop 으로 데이터셋 없이 확인)
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+
+from data_prep.utils import TARGET_SIZE
+
+BACKENDS = ('tf', 'numpy')
+
+# 두 backend 결과 허용 오차 (JPEG 디코더 차이로 1 단계 이내 차이 허용)
+PARITY_ATOL = 1.0 / 255
+
+
+def get_channels(color):
+    return 1 if color == 'gray' else 3
+
+
+# ===============================
+# NumPy / OpenCV backend
+# ===============================
+def decode_numpy(path, color):
+    """이미지 파일 → (H, W, C) uint8 (컬러 RGB), 읽기 실패 시 None"""
+    import cv2
+    if color == 'gray':
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        return None if img is None else img[..., np.newaxis]
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    return None if img is None else cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def from_bgr(img, color):
+    """cv2 로 읽은 BGR 이미지(비디오 프레임, crop 등) → (H, W, C) uint8 (컬러 RGB)"""
+    import cv2
+    if color == 'gray':
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)[..., np.newaxis]
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def resize_numpy(img, target_size=TARGET_SIZE):
+    """(H, W, C) → (h, w, C) float32 (tf.image.resize 와 같은 half-pixel bilinear, 반올림 없음)"""
+    import cv2
+    w, h = target_size
+    resized = cv2.resize(img.astype(np.float32), (w, h), interpolation=cv2.INTER_LINEAR)
+    if resized.ndim == 2:
+        resized = resized[..., np.newaxis]
+    return resized
+
+
+def resize_uint8_numpy(img, target_size=TARGET_SIZE):
+    """(H, W, C) uint8 → (h, w, C) uint8, 크기가 같으면 그대로 반환 (load_image_uint8_tf 와 같은 반올림)"""
+    w, h = target_size
+    if img.shape[:2] == (h, w):
+        return img
+    return np.clip(np.round(resize_numpy(img, target_size)), 0, 255).astype(np.uint8)
+
+
+def preprocess_batch_numpy(images, target_size=TARGET_SIZE):
+    """
+    images: (H, W, C) uint8 이미지 리스트 또는 (N, H, W, C) uint8 배열 (컬러 RGB)
+    반환  : (N, h, w, C) float32, 0~1
+    크기가 모두 target_size 인 배열은 resize 없이 한 번에 변환
+    """
+    w, h = target_size
+    if isinstance(images, np.ndarray) and images.ndim == 4 and images.shape[1:3] == (h, w):
+        return np.divide(images, np.float32(255), dtype=np.float32)
+
+    out = np.empty((len(images), h, w, images[0].shape[-1]), dtype=np.float32)
+    for i, img in enumerate(images):
+        if img.shape[:2] != (h, w):
+            img = resize_numpy(img, target_size)
+        np.divide(img, np.float32(255), out=out[i], dtype=np.float32)
+    return out
+
+
+# ===============================
+# TensorFlow backend (tf.data 용, TensorFlow 는 사용할 때 불러옴)
+# ===============================
+def decode_tf(path, color):
+    """이미지 파일 경로 텐서 → (H, W, C) uint8 텐서 (컬러 RGB)"""
+    import tensorflow as tf
+    img = tf.io.read_file(path)
+    return tf.image.decode_image(img, channels=get_channels(color), expand_animations=False)
+
+
+def resize_tf(img, channels, target_size=TARGET_SIZE):
+    import tensorflow as tf
+    w, h = target_size
+    img = tf.image.resize(img, (h, w))
+    img.set_shape((h, w, channels))
+    return img
+
+
+def load_image_tf(path, color, needs_resize=True, target_size=TARGET_SIZE):
+    """
+    이미지 1장 → (h, w, C) float32, 0~1
+    needs_resize: 크기가 target_size 와 다르면 True (False 이면 resize 와 float 중간 결과 생략)
+    """
+    import tensorflow as tf
+    w, h = target_size
+    channels = get_channels(color)
+    img = decode_tf(path, color)
+    img = tf.cond(
+        needs_resize,
+        lambda: resize_tf(img, channels, target_size),
+        lambda: tf.ensure_shape(tf.cast(img, tf.float32), (h, w, channels))
+    )
+    return img / 255.0
+
+
+def load_image_uint8_tf(path, color, needs_resize=True, target_size=TARGET_SIZE):
+    """load_image_tf 와 같되 0~255 uint8 로 반환 (target_size 이미지는 resize 가 없으므로 손실 없음)"""
+    import tensorflow as tf
+    w, h = target_size
+    channels = get_channels(color)
+    img = decode_tf(path, color)
+    return tf.cond(
+        needs_resize,
+        lambda: tf.saturate_cast(tf.round(resize_tf(img, channels, target_size)), tf.uint8),
+        lambda: tf.ensure_shape(img, (h, w, channels))
+    )
+
+
+def preprocess_batch_tf(images, target_size=TARGET_SIZE):
+    """
+    images: (N, H, W, C) uint8 텐서/배열 (컬러 RGB)
+    반환  : (N, h, w, C) float32 텐서, 0~1
+    """
+    import tensorflow as tf
+    w, h = target_size
+    images = tf.convert_to_tensor(images)
+    if tuple(images.shape[1:3]) != (h, w):
+        images = tf.image.resize(images, (h, w))
+    return tf.cast(images, tf.float32) / 255.0
+
+
+# ===============================
+# 공통 진입점
+# ===============================
+def load_batch(paths, color, backend='numpy', target_size=TARGET_SIZE):
+    """
+    이미지 파일 경로 리스트 → (N, h, w, C) float32 ndarray
+    두 backend 모두 읽을 수 없는 이미지는 건너뜀 → (배열, 사용한 경로 리스트) 반환 (모두 실패하면 (0, h, w, C))
+    'tf' 는 tf.data 로 한 번에 디코딩 / resize (학습 파이프라인과 같은 그래프 연산)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"⚠ 알 수 없는 전처리 backend: {backend}")
+
+    w, h = target_size
+    empty = np.empty((0, h, w, get_channels(color)), dtype=np.float32)
+    paths = list(paths)
+    if not paths:
+        return empty, []
+
+    if backend == 'tf':
+        import tensorflow as tf
+        ds = tf.data.Dataset.from_tensor_slices((paths, np.arange(len(paths))))
+        ds = ds.map(lambda p, i: (load_image_tf(p, color, True, target_size), i), num_parallel_calls=tf.data.AUTOTUNE)
+        # 읽기 / 디코딩 실패한 파일은 numpy backend 처럼 건너뜀
+        ds = ds.apply(tf.data.experimental.ignore_errors()).batch(len(paths))
+        for x, idx in ds:
+            return x.numpy(), [paths[i] for i in idx.numpy().tolist()]
+        return empty, []
+
+    images, used = [], []
+    for p in paths:
+        img = decode_numpy(p, color)
+        if img is not None:
+            images.append(img)
+            used.append(p)
+    if not images:
+        return empty, used
+    return preprocess_batch_numpy(images, target_size), used
+
+
+def check_parity(paths, color, target_size=TARGET_SIZE, atol=PARITY_ATOL):
+    """
+    같은 파일에 대해 두 backend 결과가 atol 이내인지 확인 (건너뛴 파일도 같아야 함)
+    반환: (최대 오차, atol 을 넘은 픽셀 수) / 모양이 다르거나 오차가 크면 AssertionError
+    """
+    x_np, used = load_batch(paths, color, 'numpy', target_size)
+    x_tf, used_tf = load_batch(paths, color, 'tf', target_size)
+    assert used == used_tf, f"[{color}] 건너뛴 파일 불일치: numpy {len(used)}장, tf {len(used_tf)}장"
+    if not used:
+        print(f"[{color}] 비교할 이미지 없음")
+        return 0.0, 0
+
+    assert x_np.shape == x_tf.shape, f"모양 불일치: numpy {x_np.shape}, tf {x_tf.shape}"
+    diff = np.abs(x_np - x_tf)
+    max_diff = float(diff.max()) if diff.size else 0.0
+    n_over = int((diff > atol).sum())
+    print(f"[{color}] {len(used)}장, 최대 오차 {max_diff:.6f} ({max_diff * 255:.2f}/255), 허용 오차 초과 {n_over}픽셀")
+    assert n_over == 0, f"[{color}] 전처리 backend 결과 불일치 (최대 오차 {max_diff:.6f})"
+    return max_diff, n_over
+
+
+def write_synthetic_crops(out_dir, color, target_size=TARGET_SIZE):
+    """
+    check_parity 용 합성 crop (JPEG / PNG, target_size 와 다른 크기 포함) + 읽을 수 없는 파일 1개
+    흑백은 실제 gray 데이터셋처럼 1채널로 저장
+    반환: 경로 리스트
+    """
+    import cv2
+    w, h = target_size
+    sizes = [(w, h), (w // 2 + 3, h + 17), (w * 2 - 5, h // 3 + 1), (31, 47)]
+    rng = np.random.default_rng(0)
+    paths = []
+    for i, (sw, sh) in enumerate(sizes):
+        # 부드러운 그라디언트 + 잡음 (resize 보간 차이가 드러나도록)
+        yy, xx = np.mgrid[0:sh, 0:sw]
+        base = (xx * 255 / max(sw - 1, 1) + yy * 128 / max(sh - 1, 1)) % 256
+        img = np.stack([base, 255 - base, (base * 3) % 256], axis=-1) + rng.normal(0, 20, (sh, sw, 3))
+        img = np.clip(img, 0, 255).astype(np.uint8)
+        if color == 'gray':
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        for ext in (".jpg", ".png"):
+            path = os.path.join(out_dir, f"{color}_{i}{ext}")
+            cv2.imwrite(path, img)
+            paths.append(path)
+    broken = os.path.join(out_dir, f"{color}_broken.jpg")
+    with open(broken, "wb") as f:
+        f.write(b"not an image")
+    paths.insert(1, broken)
+    return paths
+
+
+def check_parity_synthetic(target_size=TARGET_SIZE, atol=PARITY_ATOL):
+    """데이터셋 없이 합성 crop 으로 두 backend 비교 (color / gray, 크기가 같은 / 다른 이미지, 읽기 실패 파일)"""
+    tmp_dir = tempfile.mkdtemp(prefix="model_input_parity_")
+    try:
+        for color in ('color', 'gray'):
+            paths = write_synthetic_crops(tmp_dir, color, target_size)
+            check_parity(paths, color, target_size, atol)
+            x, used = load_batch(paths[1:2], color, 'tf', target_size)
+            assert x.shape[0] == 0 and not used, "읽을 수 없는 파일만 있을 때 빈 배열이어야 함"
+            x, used = load_batch([], color, 'numpy', target_size)
+            assert x.shape == (0, target_size[1], target_size[0], get_channels(color)) and not used
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    # python -m data_prep.model_input            : 합성 crop 으로 확인 (데이터셋 불필요)
+    # python -m data_prep.model_input --dataset  : 전처리 데이터셋의 테스트 이미지 일부로 확인
+    if "--dataset" in sys.argv[1:]:
+        from data_prep.label_index import get_label_index
+
+        for color in ('color', 'gray'):
+            for strategy in (1, 2, 3):
+                img_paths, _ = get_label_index(color, strategy, "test")
+                check_parity(img_paths[:200], color)
+    else:
+        check_parity_synthetic()
+    print("✅ 전처리 backend 결과 일치")
@@ -0,0 +1,176 @@
+# packing.py
+"""
+전처리 이미지 패킹 스크립트
+- color/gray × 전략 × train/test 마다 이미지를 하나의 연속 uint8 배열 파일(N×H×W×C)로 저장
+- 라벨 배열(helmet 여부)과 인덱스(JSON, 파일명 목록)를 함께 저장
+- 학습/테스트에서는 np.load(mmap_mode='r') 로 복사 없이 바로 읽음
+- 'manifest' 방식 분할(train/test 폴더 없음)이면 분할 매니페스트를 주어 분할 전 폴더에서 패킹
+- 컬러 이미지는 학습(tf.image.decode_image)과 같은 RGB 순서로 저장
+"""
+
+import os
+import sys
+import json
+import numpy as np
+
+from data_prep.utils import (
+    PACKED_DIR,
+    TARGET_SIZE,
+    DATASET_TYPES,
+    STRATEGY_KEYS
+)
+from data_prep.label_index import get_split_dirs, get_label_index
+from data_prep.split_manifest import get_source_dirs
+from data_prep.model_input import decode_numpy, resize_uint8_numpy, preprocess_batch_numpy
+
+IMAGES_FILE = "images.npy"
+LABELS_FILE = "labels.npy"
+INDEX_FILE = "index.json"
+
+
+def get_pack_dir(color, strategy, split, packed_dir=PACKED_DIR):
+    """패킹 파일 저장 폴더 경로 반환"""
+    return os.path.join(packed_dir, color, split, DATASET_TYPES[STRATEGY_KEYS[strategy]])
+
+
+def decode_for_pack(img_path, color):
+    """이미지 디코딩 → TARGET_SIZE, (H, W, C) uint8 (컬러는 RGB, 학습의 uint8 캐시와 같은 resize/반올림)"""
+    img = decode_numpy(img_path, color)
+    if img is None:
+        return None
+    return resize_uint8_numpy(img, TARGET_SIZE)
+
+
+def write_pack(pack_dir, color, strategy, split, n_samples, batches, split_manifest=None):
+    """
+    images.npy + labels.npy + index.json 저장
+    n_samples: 최대 샘플 수 (memmap 크기)
+    batches  : (이미지 목록, 라벨 목록, 이름 목록) 을 차례로 내는 iterable
+               이미지는 TARGET_SIZE (H, W, C) uint8, 읽기 실패는 None (건너뜀)
+    split_manifest: 분할 매니페스트로 만든 패킹이면 그 경로 (index.json 에 기록)
+    반환: 저장한 샘플 수
+    """
+    os.makedirs(pack_dir, exist_ok=True)
+    w, h = TARGET_SIZE
+    c = 1 if color == 'gray' else 3
+
+    # 완성 전까지는 임시 파일에 기록 → 중간에 실패해도 기존 패킹 유지
+    # (np.save 가 확장자를 붙이지 않도록 임시 이름도 .npy 로 끝나게 함)
+    tmp_images_path = os.path.join(pack_dir, "tmp_" + IMAGES_FILE)
+    images = np.lib.format.open_memmap(tmp_images_path, mode="w+", dtype=np.uint8, shape=(n_samples, h, w, c))
+    labels = np.zeros(n_samples, dtype=np.uint8)
+    names = []
+
+    n = 0
+    for batch_images, batch_labels, batch_names in batches:
+        for img, has_helmet, name in zip(batch_images, batch_labels, batch_names):
+            if img is None:
+                continue
+            images[n] = img
+            labels[n] = has_helmet
+            names.append(name)
+            n += 1
+
+    images.flush()
+    del images
+
+    # 읽기 실패한 이미지가 있으면 뒤쪽 빈 공간을 잘라낸 배열로 다시 저장
+    if n != n_samples:
+        full = np.load(tmp_images_path, mmap_mode="r")
+        trimmed_path = os.path.join(pack_dir, "trim_" + IMAGES_FILE)
+        trimmed = np.lib.format.open_memmap(trimmed_path, mode="w+", dtype=np.uint8, shape=(n, h, w, c))
+        trimmed[:] = full[:n]
+        trimmed.flush()
+        del trimmed, full
+        os.replace(trimmed_path, tmp_images_path)
+
+    os.replace(tmp_images_path, os.path.join(pack_dir, IMAGES_FILE))
+    np.save(os.path.join(pack_dir, LABELS_FILE), labels[:n])
+    with open(os.path.join(pack_dir, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump({
+            "color": color,
+            "strategy": strategy,
+            "split": split,
+            "shape": [n, h, w, c],
+            "dtype": "uint8",
+            "channel_order": "gray" if color == 'gray' else "rgb",
+            "split_manifest": split_manifest,
+            "names": names,
+        }, f, ensure_ascii=False)
+    return n
+
+
+def pack_name(img_path):
+    """image_12_3.jpg → '12_3' (index.json 의 names)"""
+    return os.path.splitext(os.path.basename(img_path))[0][len("image_"):]
+
+
+def pack_split(color, strategy, split, split_manifest=None):
+    """
+    color/전략/split 하나를 images.npy + labels.npy + index.json 으로 패킹
+    split_manifest: 주어지면 train/test 폴더 대신 분할 전 폴더 + 매니페스트의 split id 로 패킹
+    """
+    pack_dir = get_pack_dir(color, strategy, split)
+    img_paths, helmet_labels = get_label_index(color, strategy, split, split_manifest=split_manifest)
+    samples = list(zip(img_paths, helmet_labels))
+
+    print(f"[{color} / {DATASET_TYPES[STRATEGY_KEYS[strategy]]} / {split}] 총 {len(samples)}장 패킹 시작")
+
+    def decode_samples():
+        for idx, (img_path, has_helmet) in enumerate(samples, start=1):
+            img = decode_for_pack(img_path, color)
+            if img is None:
+                print(f"  ⚠️ 이미지 읽기 실패: {img_path}")
+            if idx % 1000 == 0 or idx == len(samples):
+                print(f"  [{idx}/{len(samples)}] 패킹 중")
+            yield [img], [has_helmet], [pack_name(img_path)]
+
+    n = write_pack(pack_dir, color, strategy, split, len(samples), decode_samples(), split_manifest)
+    print(f"✅ 패킹 완료: {pack_dir} ({n}장)")
+    return n
+
+
+def load_pack(color, strategy, split, packed_dir=PACKED_DIR):
+    """
+    패킹 데이터셋 로드 (이미지는 메모리 맵, 복사 없음)
+    반환: (images (N, H, W, C) uint8 memmap, labels (N,) uint8, names 리스트)
+    """
+    pack_dir = get_pack_dir(color, strategy, split, packed_dir)
+    images = np.load(os.path.join(pack_dir, IMAGES_FILE), mmap_mode="r")
+    labels = np.load(os.path.join(pack_dir, LABELS_FILE))
+    with open(os.path.join(pack_dir, INDEX_FILE), "r", encoding="utf-8") as f:
+        names = json.load(f)["names"]
+    return images, labels, names
+
+
+def iter_pack_batches(images, labels, batch_size):
+    """패킹 배열을 앞에서부터 순차적으로 읽어 (float32 / 255 배치, 라벨 리스트) 반환"""
+    for start in range(0, len(labels), batch_size):
+        x = preprocess_batch_numpy(images[start:start + batch_size], TARGET_SIZE)
+        yield x, labels[start:start + batch_size].astype(int).tolist()
+
+
+def get_pack_source_dirs(color, strategy, split, split_manifest=None):
+    """패킹할 이미지/라벨 폴더 (split_manifest 가 있으면 분할 전 폴더)"""
+    if split_manifest is not None:
+        return get_source_dirs(color, strategy)
+    return get_split_dirs(color, strategy, split)
+
+
+def pack_dataset(colors=('color', 'gray'), strategies=(1, 2, 3), splits=('train', 'test'), split_manifest=None):
+    """split_manifest: 'manifest' 방식으로 분할해 train/test 폴더가 없을 때 분할 매니페스트 경로"""
+    for color in colors:
+        for strategy in strategies:
+            for split in splits:
+                image_dir, label_dir = get_pack_source_dirs(color, strategy, split, split_manifest)
+                if not os.path.isdir(image_dir) or not os.path.isdir(label_dir):
+                    print(f"⚠️ 폴더 없음 → 건너뜀: {image_dir}")
+                    continue
+                pack_split(color, strategy, split, split_manifest)
+
+    print("\n모든 데이터셋 패킹 완료!")
+
+
+if __name__ == "__main__":
+    # python -m data_prep.packing [분할 매니페스트 경로]
+    pack_dataset(split_manifest=sys.argv[1] if len(sys.argv) > 1 else None)
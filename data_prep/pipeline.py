@@ -0,0 +1,292 @@
+# pipeline.py
+"""
+원본 이미지 → 학습/테스트 데이터 통합 파이프라인
+filtering.py → clear_class.py → preprocessing.py → color_to_gray.py → seperating.py 를 한 번에 수행
+- 원본 이미지는 한 번만 디코딩
+- bbox 크기 필터링, 클래스 2 → 0 변환은 메모리에서 처리 (filtered 폴더 생성 안 함)
+- 컬러 crop 에서 바로 흑백 crop 생성 (JPEG 재디코딩 없음)
+- 6가지 결과(color/gray × 3가지 전처리)를 train/test 폴더에 바로 저장 (복사 없음)
+- train/test 분할은 원본 이미지 단위(grouped_split): 같은 원본의 crop 은 같은 split, 헬멧 비율 층화
+  라벨 + 이미지 헤더만 먼저 읽어 분할을 정하고, 그룹 배정은 저장해 두었다가 다음 실행에서 유지
+  → 처리 순서/프로세스 수와 무관하게 재현 가능, 원본 이미지를 추가해도 기존 crop 의 split 유지
+- 매니페스트(dataset/manifest/pipeline.json)에 원본 이미지별 crop 을 기록 → 바뀐 원본만 다시 처리,
+  bbox 가 줄거나 원본이 삭제되면 이전 crop 삭제
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+
+from data_prep.utils import (
+    FILTER_SIZE,
+    TARGET_SIZE,
+    TARGET_ASPECT_RATIO,
+    RAW_IMAGES_DIR,
+    RAW_LABELS_DIR,
+    PREPROCESSED_COLOR_DIR,
+    PREPROCESSED_GRAY_DIR,
+    DATASET_TYPES,
+    SPLIT_MANIFEST_DIR,
+    HELMET_CLASS_ID,
+    get_bbox_pixel_coords
+)
+from data_prep.manifest import (
+    load_manifest,
+    save_manifest,
+    plan_incremental,
+    discard_entry,
+    record_entry,
+    prune_orphans
+)
+from data_prep.image_size import load_dimension_index, save_dimension_index, get_image_size
+from data_prep.grouped_split import group_hash, source_group, stable_split
+from data_prep.preprocessing import (
+    forced_scale,
+    padded_scale,
+    aspect_aware_crop,
+    save_image_and_label,
+    init_worker,
+    NUM_WORKERS,
+    CHUNK_SIZE,
+    PROGRESS_EVERY
+)
+
+MIN_BBOX_WIDTH, MIN_BBOX_HEIGHT = FILTER_SIZE
+
+TRAIN_RATIO = 0.8
+SPLIT_SEED = 42
+GROUP_ASSIGNMENT_PATH = SPLIT_MANIFEST_DIR + "/pipeline_groups.json"  # 원본 이미지 번호 → split 배정
+
+CROP_FUNCS = {
+    'forced': forced_scale,
+    'padded': padded_scale,
+    'aware': aspect_aware_crop,
+}
+
+
+def assign_split(crop_name, seed=SPLIT_SEED, train_ratio=TRAIN_RATIO):
+    """
+    crop 이름(예: '12_3')의 원본 이미지 번호 해시로 'train' / 'test' 결정 (층화 없음)
+    plan_splits 결과가 없는 이미지에만 사용 (같은 원본의 crop 은 항상 같은 split)
+    """
+    return "train" if group_hash(source_group(crop_name), seed) < train_ratio else "test"
+
+
+def source_number(img_name):
+    """원본 이미지 번호 (image_123.jpg → '123', 없으면 None) / 라벨 파일 이름과 split 배정의 키"""
+    number_match = re.search(r'_(\d+)\.', img_name)
+    return number_match.group(1) if number_match else None
+
+
+def read_kept_lines(img_name, dim_index=None):
+    """
+    원본 이미지 1장의 필터링된 라벨 줄 (이미지는 헤더에서 크기만 읽음)
+    반환: (원본 이미지 번호, 라벨 줄 리스트) / 처리할 수 없으면 None
+    """
+    number = source_number(img_name)
+    if number is None:
+        return None
+    label_path = os.path.join(RAW_LABELS_DIR, f"label_{number}.txt")
+    size = get_image_size(os.path.join(RAW_IMAGES_DIR, img_name), dim_index)
+    if not os.path.isfile(label_path) or size is None:
+        return None
+    with open(label_path, "r", encoding="utf-8") as f:
+        lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+    return number, filter_and_remap(lines, *size)
+
+
+def plan_splits(img_files, seed=SPLIT_SEED, train_ratio=TRAIN_RATIO, state_path=GROUP_ASSIGNMENT_PATH):
+    """
+    디코딩 전에 라벨 + 헤더만 읽어 원본 이미지 번호별 split 결정 (grouped_split)
+    state_path 의 이전 배정은 유지하고 새 원본 이미지만 배정
+    반환: {원본 이미지 번호 (source_number): 'train' / 'test'}
+    """
+    dim_index = load_dimension_index()
+    sample_ids, labels = [], []
+    for img_name in img_files:
+        kept = read_kept_lines(img_name, dim_index)
+        if kept is None:
+            continue
+        number, lines = kept
+        for seq, line in enumerate(lines, start=1):
+            sample_ids.append(f"{number}_{seq}")
+            labels.append(int(int(line.split()[0]) == HELMET_CLASS_ID))
+    save_dimension_index(dim_index)
+
+    # 이전 배정 유지 방식은 seperating / train 과 같은 stable_split (sample id '12_3' 의 그룹 = 원본 번호 '12')
+    splits = stable_split(sample_ids, labels, train_ratio, seed, state_path)
+    return {source_group(sid): split for sid, split in zip(sample_ids, splits)}
+
+
+def get_output_dirs(root, split, key):
+    """(images 폴더, labels 폴더) 반환"""
+    base = os.path.join(root, split, DATASET_TYPES[key])
+    return os.path.join(base, "images"), os.path.join(base, "labels")
+
+
+def ensure_output_dirs():
+    for root in (PREPROCESSED_COLOR_DIR, PREPROCESSED_GRAY_DIR):
+        for split in ("train", "test"):
+            for key in DATASET_TYPES:
+                for d in get_output_dirs(root, split, key):
+                    os.makedirs(d, exist_ok=True)
+
+
+def clear_output_dirs():
+    """6가지 train/test 결과 폴더의 crop 이미지/라벨 삭제 (매니페스트에 없는 이전 결과가 남지 않도록), 삭제 수 반환"""
+    removed = 0
+    for root in (PREPROCESSED_COLOR_DIR, PREPROCESSED_GRAY_DIR):
+        for split in ("train", "test"):
+            for key in DATASET_TYPES:
+                for d in get_output_dirs(root, split, key):
+                    with os.scandir(d) as it:
+                        names = [e.name for e in it if e.name.startswith(("image_", "label_")) and e.is_file()]
+                    for name in names:
+                        os.remove(os.path.join(d, name))
+                    removed += len(names)
+    return removed
+
+
+def filter_and_remap(lines, w, h):
+    """bbox 크기 필터링(filtering.py) + 클래스 2 → 0 변환(clear_class.py)"""
+    kept = []
+    for line in lines:
+        cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, w, h)
+        if cls is None:
+            continue
+        if x_max - x_min < MIN_BBOX_WIDTH or y_max - y_min < MIN_BBOX_HEIGHT:
+            continue
+
+        parts = line.split()
+        if parts[0] == '2':
+            parts[0] = '0'
+        kept.append(" ".join(parts))
+    return kept
+
+
+def process_raw_image(img_name, split=None):
+    """
+    원본 이미지 1장 → 6가지 crop 이미지/라벨을 train/test 폴더에 저장
+    split: plan_splits 가 정한 split (None 이면 assign_split)
+    반환: (이미지 이름, {'train': crop 수, 'test': crop 수}, 경고 메시지 또는 None, 저장한 파일 경로 리스트)
+    """
+    counts = {"train": 0, "test": 0}
+    outputs = []
+
+    # 이미지 번호 추출: image_123.jpg → 123
+    number = source_number(img_name)
+    if number is None:
+        return img_name, counts, f"⚠️ 번호 추출 실패: {img_name}", outputs
+
+    label_path = os.path.join(RAW_LABELS_DIR, f"label_{number}.txt")
+    if not os.path.isfile(label_path):
+        return img_name, counts, f"⚠️ 라벨 없음 → 제외: label_{number}.txt", outputs
+
+    with open(label_path, "r", encoding="utf-8") as f:
+        lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+
+    img = cv2.imread(os.path.join(RAW_IMAGES_DIR, img_name))
+    if img is None:
+        return img_name, counts, f"⚠️ 이미지 읽기 실패: {img_name}", outputs
+    h, w = img.shape[:2]
+
+    kept_lines = filter_and_remap(lines, w, h)
+    split = split or assign_split(number)
+
+    for seq, line in enumerate(kept_lines, start=1):
+        cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, w, h)
+
+        for key, crop_func in CROP_FUNCS.items():
+            color_crop = crop_func(img, x_min, y_min, x_max, y_max)
+            gray_crop = cv2.cvtColor(color_crop, cv2.COLOR_BGR2GRAY)
+
+            outputs.extend(save_image_and_label(
+                color_crop, cls, number, seq, *get_output_dirs(PREPROCESSED_COLOR_DIR, split, key)))
+            outputs.extend(save_image_and_label(
+                gray_crop, cls, number, seq, *get_output_dirs(PREPROCESSED_GRAY_DIR, split, key)))
+
+        counts[split] += 1
+
+    return img_name, counts, None, outputs
+
+
+def build_dataset(num_workers=NUM_WORKERS, chunk_size=CHUNK_SIZE, incremental=True):
+    """
+    num_workers: 프로세스 수 (1 이면 현재 프로세스에서 순차 처리)
+    chunk_size : 워커에 한 번에 넘길 이미지 수
+    incremental: True 이면 매니페스트 기준으로 원본 이미지/라벨이 바뀐 것만 다시 처리
+                 원본 이미지마다 저장한 crop 을 기록해 두고, 다시 처리하거나 원본이 사라지면 이전 crop 삭제
+                 (bbox 가 줄어든 라벨 / 삭제된 원본의 crop 이 train/test 폴더에 남지 않음)
+    """
+    ensure_output_dirs()
+    img_files = sorted(
+        f for f in os.listdir(RAW_IMAGES_DIR)
+        if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+
+    manifest = load_manifest("pipeline")
+    params = {
+        "TARGET_SIZE": list(TARGET_SIZE), "TARGET_ASPECT_RATIO": TARGET_ASPECT_RATIO, "FILTER_SIZE": list(FILTER_SIZE),
+        "HELMET_CLASS_ID": HELMET_CLASS_ID, "TRAIN_RATIO": TRAIN_RATIO, "SPLIT_SEED": SPLIT_SEED,
+    }
+    sources = {}
+    for img_name in img_files:
+        number = source_number(img_name)
+        label_name = f"label_{number}.txt" if number is not None else "label_.txt"
+        sources[img_name] = [os.path.join(RAW_IMAGES_DIR, img_name), os.path.join(RAW_LABELS_DIR, label_name)]
+    todo, unchanged, orphans = plan_incremental(manifest, sources, params, incremental)
+
+    if not manifest["entries"] or len(todo) == len(sources):
+        # 전체 재생성: 매니페스트에 기록되지 않은 이전 결과(단계별 스크립트 결과 등)까지 삭제
+        manifest["entries"] = {}
+        print(f"🧹 전체 재생성 → 이전 crop 파일 {clear_output_dirs()}개 삭제")
+    else:
+        prune_orphans(manifest, orphans)
+
+    # 원본 이미지 단위 train/test 분할 (디코딩 전, 라벨 + 헤더만 읽음, 이전 배정 유지)
+    assignment = plan_splits(img_files)
+
+    # 다시 처리할 이미지의 이전 crop 삭제 (bbox 수가 줄었을 수 있음)
+    img_files = [f for f in img_files if f in todo]
+    for img_name in img_files:
+        discard_entry(manifest, img_name)
+    # plan_splits 와 같은 키(source_number)로 조회
+    splits = [assignment.get(source_number(img_name)) for img_name in img_files]
+    total_images = len(img_files)
+    print(f"원본 이미지 {total_images}장 통합 처리 시작... (변경 없음 {len(unchanged)}장 건너뜀, 프로세스 {num_workers}개)")
+
+    totals = {"train": 0, "test": 0}
+    skipped = 0
+
+    if num_workers <= 1:
+        results = map(process_raw_image, img_files, splits)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker)
+        results = executor.map(process_raw_image, img_files, splits, chunksize=max(1, chunk_size))
+
+    try:
+        for img_idx, (img_name, counts, warning, outputs) in enumerate(results, start=1):
+            record_entry(manifest, img_name, *todo[img_name], outputs)
+            for split in totals:
+                totals[split] += counts[split]
+            if warning:
+                print(warning)
+            if sum(counts.values()) == 0:
+                skipped += 1
+            if img_idx % PROGRESS_EVERY == 0 or img_idx == total_images:
+                print(f"[{img_idx}/{total_images}] 처리 완료 (train {totals['train']}, test {totals['test']}, 제외 {skipped}장)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        manifest["params"] = params
+        save_manifest("pipeline", manifest)
+
+    print("\n🎉 통합 파이프라인 완료")
+    print(f"  - bbox crop: train {totals['train']}개, test {totals['test']}개 (각 6가지 버전)")
+    print(f"  - 제외된 이미지: {skipped} / {total_images}")
+
+
+if __name__ == "__main__":
+    build_dataset()
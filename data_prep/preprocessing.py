@@ -2,6 +2,7 @@ import os
 import cv2
 import numpy as np
 import re
+from concurrent.futures import ProcessPoolExecutor
 
 from data_prep.utils import (
     FILTERED_IMAGES_DIR, FILTERED_LABELS_DIR,
@@ -10,6 +11,18 @@ from data_prep.utils import (
     TARGET_ASPECT_RATIO,
     get_bbox_pixel_coords
 )
+from data_prep.manifest import (
+    load_manifest,
+    save_manifest,
+    plan_incremental,
+    discard_entry,
+    record_entry,
+    prune_orphans
+)
+
+NUM_WORKERS = os.cpu_count() or 1  # 전처리 프로세스 수
+CHUNK_SIZE = 16  # 워커 하나에 한 번에 넘길 이미지 수
+PROGRESS_EVERY = 100  # 진행 상황 출력 간격 (이미지 수)
 
 
 def ensure_dirs(dir_dict):
@@ -18,7 +31,7 @@ def ensure_dirs(dir_dict):
         os.makedirs(os.path.join(dir_dict[key], 'labels'), exist_ok=True)
 
 def save_image_and_label(img_crop, cls, number, seq, out_img_dir, out_label_dir):
-    """이미지 저장 + 클래스 값만 있는 라벨 저장"""
+    """이미지 저장 + 클래스 값만 있는 라벨 저장, 저장한 (이미지 경로, 라벨 경로) 반환"""
     img_name = f"image_{number}_{seq}.jpg"
     label_name = f"label_{number}_{seq}.txt"
 
@@ -29,6 +42,8 @@ def save_image_and_label(img_crop, cls, number, seq, out_img_dir, out_label_dir)
     with open(label_path, "w", encoding="utf-8") as f:
         f.write(str(cls) + "\n")
 
+    return img_path, label_path
+
 def forced_scale(img, x_min, y_min, x_max, y_max):
     crop = img[y_min:y_max, x_min:x_max]
     return cv2.resize(crop, TARGET_SIZE)
@@ -75,48 +90,110 @@ def aspect_aware_crop(img, x_min, y_min, x_max, y_max):
     crop = img[y_min:y_max, x_min:x_max]
     return cv2.resize(crop, TARGET_SIZE)
 
-def preprocess_dataset():
-    ensure_dirs(OUTPUT_COLOR_DIRS)
-    img_files = sorted(f for f in os.listdir(FILTERED_IMAGES_DIR) if f.lower().endswith(('.jpg','.png','.jpeg')))
-    total_images = len(img_files)
-    print(f"총 {total_images}장의 이미지 처리 시작...")
-
-    for img_idx, img_name in enumerate(img_files, start=1):
-        img_path = os.path.join(FILTERED_IMAGES_DIR, img_name)
-        img = cv2.imread(img_path)
-        if img is None:
-            print(f"⚠️ 이미지 읽기 실패: {img_name}")
+def process_image(img_name):
+    """
+    필터링된 이미지 1장 → 3가지 전처리 방식의 crop 이미지/라벨 저장
+    출력 파일 이름은 이미지 번호와 라벨 줄 순서로만 결정되므로 처리 순서와 무관
+    반환: (이미지 이름, 저장한 bbox 수, 경고 메시지 또는 None, 저장한 파일 경로 목록)
+    """
+    img_path = os.path.join(FILTERED_IMAGES_DIR, img_name)
+
+    # 이미지 번호 추출: image_123.jpg → 123
+    number_match = re.search(r'_(\d+)\.', img_name)
+    if not number_match:
+        return img_name, 0, f"⚠️ 번호 추출 실패: {img_name}", []
+    number = number_match.group(1)
+    label_name = f"label_{number}.txt"
+    label_path = os.path.join(FILTERED_LABELS_DIR, label_name)
+
+    if not os.path.isfile(label_path):
+        return img_name, 0, f"⚠️ 라벨 파일 없음: {label_name}", []
+
+    with open(label_path, 'r', encoding='utf-8') as f:
+        lines = [ln.strip() for ln in f.readlines() if ln.strip()]
+
+    # 사용할 수 있는 라벨 줄이 없으면 디코딩 생략 (라벨을 먼저 확인)
+    if all(len(line.split()) < 5 for line in lines):
+        return img_name, 0, None, []
+
+    img = cv2.imread(img_path)
+    if img is None:
+        return img_name, 0, f"⚠️ 이미지 읽기 실패: {img_name}", []
+
+    n_saved = 0
+    outputs = []
+    for seq, line in enumerate(lines, start=1):
+        cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, img.shape[1], img.shape[0])
+        if cls is None:
             continue
 
-        # 이미지 번호 추출: image_123.jpg → 123
+        # 각 전처리 방식 별로 이미지와 라벨 저장
+        outputs += save_image_and_label(forced_scale(img, x_min, y_min, x_max, y_max), cls, number, seq, os.path.join(OUTPUT_COLOR_DIRS['forced'], 'images'), os.path.join(OUTPUT_COLOR_DIRS['forced'], 'labels'))
+        outputs += save_image_and_label(padded_scale(img, x_min, y_min, x_max, y_max), cls, number, seq, os.path.join(OUTPUT_COLOR_DIRS['padded'], 'images'), os.path.join(OUTPUT_COLOR_DIRS['padded'], 'labels'))
+        outputs += save_image_and_label(aspect_aware_crop(img, x_min, y_min, x_max, y_max), cls, number, seq, os.path.join(OUTPUT_COLOR_DIRS['aware'], 'images'), os.path.join(OUTPUT_COLOR_DIRS['aware'], 'labels'))
+        n_saved += 1
+
+    return img_name, n_saved, None, outputs
+
+def init_worker():
+    # 프로세스 단위로 병렬화하므로 OpenCV 내부 스레드는 1개로 제한 (과다 구독 방지)
+    cv2.setNumThreads(1)
+
+def preprocess_dataset(num_workers=NUM_WORKERS, chunk_size=CHUNK_SIZE, incremental=True):
+    """
+    num_workers: 프로세스 수 (1 이면 현재 프로세스에서 순차 처리)
+    chunk_size : 워커에 한 번에 넘길 이미지 수
+    incremental: True 이면 매니페스트 기준으로 필터링 이미지/라벨 또는
+                 TARGET_SIZE, TARGET_ASPECT_RATIO 가 바뀐 이미지만 다시 처리
+    """
+    ensure_dirs(OUTPUT_COLOR_DIRS)
+    all_files = sorted(f for f in os.listdir(FILTERED_IMAGES_DIR) if f.lower().endswith(('.jpg','.png','.jpeg')))
+
+    manifest = load_manifest("preprocess")
+    params = {"TARGET_SIZE": list(TARGET_SIZE), "TARGET_ASPECT_RATIO": TARGET_ASPECT_RATIO}
+    sources = {}
+    for img_name in all_files:
         number_match = re.search(r'_(\d+)\.', img_name)
-        if not number_match:
-            print(f"⚠️ 번호 추출 실패: {img_name}")
-            continue
-        number = number_match.group(1)
-        label_name = f"label_{number}.txt"
-        label_path = os.path.join(FILTERED_LABELS_DIR, label_name)
-        
-        if not os.path.isfile(label_path):
-            print(f"⚠️ 라벨 파일 없음: {label_name}")
-            continue
+        label_name = f"label_{number_match.group(1)}.txt" if number_match else "label_.txt"
+        sources[img_name] = [os.path.join(FILTERED_IMAGES_DIR, img_name), os.path.join(FILTERED_LABELS_DIR, label_name)]
+    todo, unchanged, orphans = plan_incremental(manifest, sources, params, incremental)
+    prune_orphans(manifest, orphans)
 
-        with open(label_path, 'r', encoding='utf-8') as f:
-            lines = [ln.strip() for ln in f.readlines() if ln.strip()]
-        
-        print(f"[{img_idx}/{total_images}] 처리 중: {img_name} ({len(lines)}개의 라벨)")
+    # 다시 처리할 이미지의 이전 crop 삭제 (bbox 수가 줄었을 수 있음)
+    img_files = [f for f in all_files if f in todo]
+    for img_name in img_files:
+        discard_entry(manifest, img_name)
 
-        for seq, line in enumerate(lines, start=1):
-            cls, x_min, y_min, x_max, y_max = get_bbox_pixel_coords(line, img.shape[1], img.shape[0])
-            if cls is None:
-                continue
+    total_images = len(img_files)
+    print(f"총 {total_images}장의 이미지 처리 시작... (변경 없음 {len(unchanged)}장 건너뜀, 프로세스 {num_workers}개)")
 
-            # 각 전처리 방식 별로 이미지와 라벨 저장
-            save_image_and_label(forced_scale(img, x_min, y_min, x_max, y_max), cls, number, seq, os.path.join(OUTPUT_COLOR_DIRS['forced'], 'images'), os.path.join(OUTPUT_COLOR_DIRS['forced'], 'labels'))
-            save_image_and_label(padded_scale(img, x_min, y_min, x_max, y_max), cls, number, seq, os.path.join(OUTPUT_COLOR_DIRS['padded'], 'images'), os.path.join(OUTPUT_COLOR_DIRS['padded'], 'labels'))
-            save_image_and_label(aspect_aware_crop(img, x_min, y_min, x_max, y_max), cls, number, seq, os.path.join(OUTPUT_COLOR_DIRS['aware'], 'images'), os.path.join(OUTPUT_COLOR_DIRS['aware'], 'labels'))
+    total_crops = 0
+    failed = 0
 
-    print("모든 이미지 처리 완료!")
+    if num_workers <= 1:
+        results = map(process_image, img_files)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=num_workers, initializer=init_worker)
+        results = executor.map(process_image, img_files, chunksize=max(1, chunk_size))
+
+    try:
+        # 워커 결과를 모아 한 곳에서만 진행 상황 출력
+        for img_idx, (img_name, n_saved, warning, outputs) in enumerate(results, start=1):
+            record_entry(manifest, img_name, *todo[img_name], outputs)
+            total_crops += n_saved
+            if warning:
+                failed += 1
+                print(warning)
+            if img_idx % PROGRESS_EVERY == 0 or img_idx == total_images:
+                print(f"[{img_idx}/{total_images}] 처리 완료 (누적 bbox {total_crops}개, 실패 {failed}장)")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        manifest["params"] = params
+        save_manifest("preprocess", manifest)
+
+    print(f"모든 이미지 처리 완료! (bbox {total_crops}개 × 3가지 방식 저장)")
 
 
 if __name__ == "__main__":
@@ -1,64 +1,102 @@
 import os
-import shutil
-import random
+import sys
 
 from data_prep.utils import OUTPUT_COLOR_DIRS, OUTPUT_GRAY_DIRS, DATASET_TYPES
+from data_prep.split_manifest import (
+    LINK_MODES,
+    DEFAULT_LINK_MODE,
+    get_split_manifest_path,
+    list_sample_ids,
+    load_split_manifest,
+    save_split_manifest,
+    materialize_split
+)
+from data_prep.grouped_split import source_group, split_samples, report_split
+from data_prep.label_index import read_helmet_label
 
 # train/test 비율
 TRAIN_RATIO = 0.8
+SPLIT_SEED = 42
+SPLIT_NAME = "uniform"  # 매니페스트 이름 (dataset/splits/uniform.json)
 
-def split_train_test_uniform(color_dirs, gray_dirs, output_root_color, output_root_gray):
+def plan_split(base_dir, seed=SPLIT_SEED, name=SPLIT_NAME):
     """
-    모든 데이터셋(color/gray 각 3종류)에 동일한 train/test 분할 적용
+    base_dir 의 crop 목록 / 헬멧 여부로 train/test 분할을 정하고 분할 매니페스트(dataset/splits/<name>.json) 저장
+    분할은 grouped_split: 같은 원본 이미지의 crop 은 같은 split, 헬멧 비율 층화,
+    이전 매니페스트의 배정은 유지 (이미지를 추가해도 기존 샘플은 그대로)
+    반환: ({'train': [id, ...], 'test': [id, ...]}, 매니페스트 경로)
     """
-    # 1) 기준이 될 이미지 목록 생성 (color forced_scale 기준)
+    sample_ids = list_sample_ids(os.path.join(base_dir, "images"))
+    labels = []
+    for sid in sample_ids:
+        label_path = os.path.join(base_dir, "labels", f"label_{sid}.txt")
+        labels.append(read_helmet_label(label_path) if os.path.isfile(label_path) else 0)
+
+    # 이전 매니페스트가 같은 설정이면 그룹 배정 유지
+    manifest_path = get_split_manifest_path(name)
+    params = {"method": "grouped_stratified", "seed": seed, "train_ratio": TRAIN_RATIO}
+    previous = None
+    if os.path.isfile(manifest_path):
+        prev_manifest = load_split_manifest(manifest_path)
+        if prev_manifest.get("params") == params:
+            previous = prev_manifest.get("groups")
+
+    sample_splits, groups = split_samples(sample_ids, labels, TRAIN_RATIO, seed, previous)
+    splits = {split: [sid for sid, s in zip(sample_ids, sample_splits) if s == split] for split in ("train", "test")}
+
+    n_sources = len({source_group(sid) for sid in sample_ids})
+    print(f"총 {len(sample_ids)}개 이미지 ({n_sources}개 원본) → train: {len(splits['train'])}, test: {len(splits['test'])}")
+    report_split(sample_splits, labels)
+
+    save_split_manifest(manifest_path, splits, params, groups)
+    return splits, manifest_path
+
+def split_train_test_uniform(color_dirs, gray_dirs, output_root_color, output_root_gray,
+                             mode=DEFAULT_LINK_MODE, seed=SPLIT_SEED):
+    """
+    모든 데이터셋(color/gray 각 3종류)에 동일한 train/test 분할 적용 (plan_split)
+    mode: 'hardlink' / 'symlink' - 매니페스트 + train/test 폴더에 링크 생성 (디스크 사용량 증가 없음)
+          'copy' - 매니페스트 + 기존처럼 파일 복사
+          'manifest' - 분할 매니페스트(샘플 id 목록)만 저장, 학습/테스트는 RunConfig(split_manifest=...) 로 읽음
+    반환: 매니페스트 경로
+    """
+    if mode not in LINK_MODES:
+        raise ValueError(f"⚠ 알 수 없는 분할 방식: {mode} (가능: {LINK_MODES})")
+
+    # 1) 기준이 될 이미지 목록 / 헬멧 여부 (color forced_scale 기준)
     base_dir = list(color_dirs.values())[0]  # 첫 번째 컬러 폴더 사용
-    img_dir = os.path.join(base_dir, "images")
-    img_files = sorted(f for f in os.listdir(img_dir) if f.lower().endswith(('.jpg','.png','.jpeg')))
-    
-    random.shuffle(img_files)
-    n_train = int(len(img_files) * TRAIN_RATIO)
-    train_files = img_files[:n_train]
-    test_files = img_files[n_train:]
-    
-    print(f"총 {len(img_files)}개 이미지 → train: {len(train_files)}, test: {len(test_files)}")
+    splits, manifest_path = plan_split(base_dir, seed)
+    if mode == 'manifest':
+        return manifest_path
 
     # 2) 모든 컬러/그레이 데이터셋에 동일하게 적용
     for dataset_type, dirs_dict in [("color", color_dirs), ("gray", gray_dirs)]:
         output_root = output_root_color if dataset_type=="color" else output_root_gray
         for subset_type, dir_path in dirs_dict.items():
-            img_dir = os.path.join(dir_path, "images")
-            label_dir = os.path.join(dir_path, "labels")
-
-            for split_name, files in zip(["train", "test"], [train_files, test_files]):
-                out_img_dir = os.path.join(output_root, split_name, DATASET_TYPES[subset_type], "images")
-                out_label_dir = os.path.join(output_root, split_name, DATASET_TYPES[subset_type], "labels")
-                os.makedirs(out_img_dir, exist_ok=True)
-                os.makedirs(out_label_dir, exist_ok=True)
+            out_dirs = {
+                split_name: (
+                    os.path.join(output_root, split_name, DATASET_TYPES[subset_type], "images"),
+                    os.path.join(output_root, split_name, DATASET_TYPES[subset_type], "labels"),
+                )
+                for split_name in splits
+            }
+            counts = materialize_split(
+                splits, os.path.join(dir_path, "images"), os.path.join(dir_path, "labels"), out_dirs, mode
+            )
+            for split_name, n in counts.items():
+                print(f"✅ {dataset_type} {subset_type} → {split_name}: {n}개 ({mode})")
 
-                for img_file in files:
-                    src_img_path = os.path.join(img_dir, img_file)
-                    dst_img_path = os.path.join(out_img_dir, img_file)
-                    if os.path.exists(src_img_path):
-                        shutil.copy2(src_img_path, dst_img_path)
-
-                    label_file = img_file.replace("image", "label").replace(".jpg", ".txt")
-                    src_label_path = os.path.join(label_dir, label_file)
-                    dst_label_path = os.path.join(out_label_dir, label_file)
-                    if os.path.exists(src_label_path):
-                        shutil.copy2(src_label_path, dst_label_path)
-
-                print(f"✅ {dataset_type} {subset_type} → {split_name}: {len(files)}개 파일 복사 완료")
+    return manifest_path
 
 if __name__ == "__main__":
-    random.seed(42)  # 재현성
-
+    # python -m data_prep.seperating [manifest|hardlink|symlink|copy]
     print("=== Color/Gray 데이터셋 동일 train/test 분리 ===")
     split_train_test_uniform(
         OUTPUT_COLOR_DIRS,
         OUTPUT_GRAY_DIRS,
         output_root_color="dataset/preprocessed/color",
-        output_root_gray="dataset/preprocessed/gray"
+        output_root_gray="dataset/preprocessed/gray",
+        mode=sys.argv[1] if len(sys.argv) > 1 else DEFAULT_LINK_MODE
     )
 
     print("\n모든 데이터셋 train/test 분리 완료!")
@@ -0,0 +1,154 @@
+# split_manifest.py
+"""
+train/test 분할 매니페스트
+- 분할 결과를 샘플 id 목록(JSON)으로만 저장: id = crop 파일 이름의 'image_' 뒤 부분 (image_12_3.jpg → '12_3')
+- color/gray × 3가지 전처리 6개 데이터셋이 같은 id 목록을 공유 → 다시 분할해도 JSON 하나만 새로 씀 (파일 복사 없음)
+- 기본은 train/test 폴더를 하드링크로 만듦 (디스크 사용량 증가 없음, 기존 폴더 기준 코드가 그대로 동작)
+- 'manifest' 방식이면 폴더 없이 RunConfig(split_manifest=...) 로 분할 전 폴더(preprocessed/color/1. forced_scale 등)에서 바로 읽음
+"""
+
+import os
+import json
+import errno
+import shutil
+import threading
+
+from data_prep.utils import (
+    PREPROCESSED_DIR,
+    SPLIT_MANIFEST_DIR,
+    DATASET_TYPES,
+    STRATEGY_KEYS
+)
+
+# 분할 결과를 train/test 폴더에 만드는 방식
+# 'manifest': 매니페스트만 저장 / 'hardlink' / 'symlink' / 'copy' (기존 방식)
+# 기본은 'hardlink': train/test 폴더를 읽는 main.py / packing.py 가 그대로 새 분할을 사용
+LINK_MODES = ('manifest', 'hardlink', 'symlink', 'copy')
+DEFAULT_LINK_MODE = 'hardlink'
+
+IMAGE_SUFFIXES = ('.jpg', '.png', '.jpeg')
+
+
+def get_split_manifest_path(name):
+    return os.path.join(SPLIT_MANIFEST_DIR, f"{name}.json")
+
+
+def get_source_dirs(color, strategy, preprocessed_dir=PREPROCESSED_DIR):
+    """분할 전 전처리 이미지/라벨 폴더: (images, labels)"""
+    base = os.path.join(preprocessed_dir, color, DATASET_TYPES[STRATEGY_KEYS[strategy]])
+    return os.path.join(base, "images"), os.path.join(base, "labels")
+
+
+def sample_id(image_name):
+    """image_12_3.jpg → '12_3'"""
+    return os.path.splitext(image_name)[0][len("image_"):]
+
+
+def list_sample_ids(image_dir):
+    """폴더의 crop 이미지 id 목록 (이름순)"""
+    with os.scandir(image_dir) as it:
+        return sorted(
+            sample_id(e.name) for e in it
+            if e.name.startswith("image_") and e.name.lower().endswith(IMAGE_SUFFIXES)
+        )
+
+
+# ===============================
+# 매니페스트 저장 / 로드
+# ===============================
+def save_split_manifest(path, splits, params=None, groups=None):
+    """
+    splits: {'train': [id, ...], 'test': [id, ...]}
+    params: 분할에 사용한 설정 (seed, 비율 등) 기록용
+    groups: 원본 이미지 그룹 배정 {그룹: split} (grouped_split, 다음 분할에서 이전 배정 유지용)
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "params": params or {},
+            "counts": {split: len(ids) for split, ids in splits.items()},
+            "splits": {split: sorted(ids) for split, ids in splits.items()},
+            "groups": groups or {},
+        }, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"✅ 분할 매니페스트 저장: {path} ({', '.join(f'{s} {len(i)}' for s, i in splits.items())})")
+    return path
+
+
+def load_split_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_split_ids(path, split):
+    """매니페스트의 split id 집합"""
+    return set(load_split_manifest(path)["splits"][split])
+
+
+# ===============================
+# train/test 폴더 만들기 (선택)
+# ===============================
+def place_file(src, dst, mode):
+    """
+    src 를 dst 에 mode 방식으로 배치 (이미 같은 파일이면 건너뜀)
+    hardlink 가 불가능한 경우(다른 파일 시스템 등)에는 복사로 대체
+    """
+    if os.path.lexists(dst):
+        if mode != 'copy' and os.path.exists(dst) and os.path.samefile(src, dst):
+            return
+        os.remove(dst)
+
+    if mode == 'hardlink':
+        try:
+            os.link(src, dst)
+            return
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+        shutil.copy2(src, dst)
+    elif mode == 'symlink':
+        os.symlink(os.path.relpath(src, os.path.dirname(dst)), dst)
+    elif mode == 'copy':
+        shutil.copy2(src, dst)
+    else:
+        raise ValueError(f"⚠ 알 수 없는 배치 방식: {mode}")
+
+
+def materialize_split(splits, src_image_dir, src_label_dir, out_dirs, mode):
+    """
+    분할 결과를 split 별 (images, labels) 폴더에 mode 방식으로 배치
+    out_dirs: {split: (images 폴더, labels 폴더)}
+    매니페스트에 없는 기존 파일은 삭제 → 다시 분할해도 이전 분할의 파일이 남지 않음
+    반환: {split: 배치한 샘플 수}
+    """
+    with os.scandir(src_image_dir) as it:
+        image_names = {
+            sample_id(e.name): e.name for e in it
+            if e.name.startswith("image_") and e.name.lower().endswith(IMAGE_SUFFIXES)
+        }
+
+    counts = {}
+    for split, ids in splits.items():
+        out_image_dir, out_label_dir = out_dirs[split]
+        os.makedirs(out_image_dir, exist_ok=True)
+        os.makedirs(out_label_dir, exist_ok=True)
+
+        keep_images, keep_labels = set(), set()
+        for sid in ids:
+            image_name = image_names.get(sid)
+            label_name = f"label_{sid}.txt"
+            label_path = os.path.join(src_label_dir, label_name)
+            if image_name is None or not os.path.isfile(label_path):
+                continue
+            place_file(os.path.join(src_image_dir, image_name), os.path.join(out_image_dir, image_name), mode)
+            place_file(label_path, os.path.join(out_label_dir, label_name), mode)
+            keep_images.add(image_name)
+            keep_labels.add(label_name)
+
+        for out_dir, keep in ((out_image_dir, keep_images), (out_label_dir, keep_labels)):
+            for name in os.listdir(out_dir):
+                if name not in keep:
+                    os.remove(os.path.join(out_dir, name))
+        counts[split] = len(keep_images)
+    return counts
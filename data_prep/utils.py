@@ -1,7 +1,4 @@
-import os
-import shutil
 import numpy as np
-import cv2
 
 DATASET_DIR = "./dataset"
 
@@ -26,12 +23,27 @@ PREPROCESSED_DIR = DATASET_DIR + "/preprocessed"
 PREPROCESSED_COLOR_DIR = PREPROCESSED_DIR + "/color"
 PREPROCESSED_GRAY_DIR = PREPROCESSED_DIR + "/gray"
 
+PACKED_DIR = DATASET_DIR + "/packed"  # 전처리 이미지를 하나의 배열 파일로 묶은 데이터셋
+MANIFEST_DIR = DATASET_DIR + "/manifest"  # 단계별 입력 해시/출력 목록 (증분 처리용)
+DIMENSION_INDEX_PATH = MANIFEST_DIR + "/dimensions.json"  # 이미지 크기 캐시 (경로, 파일 크기, 수정 시각 기준)
+LABEL_INDEX_DIR = DATASET_DIR + "/index"  # (이미지 경로, helmet 여부) 목록 캐시
+SPLIT_MANIFEST_DIR = DATASET_DIR + "/splits"  # train/test 분할 매니페스트 (샘플 id 목록)
+
+HELMET_CLASS_ID = 1  # 헬멧 착용 클래스 값
+
 DATASET_TYPES = {
     'forced': "1. forced_scale",
     'padded': "2. padded_scale",
     'aware': "3. aspect_aware_crop"
 }
 
+# 전략 번호(train/test 의 SELECTED_STRATEGY) → DATASET_TYPES 키
+STRATEGY_KEYS = {
+    1: 'forced',
+    2: 'padded',
+    3: 'aware',
+}
+
 OUTPUT_COLOR_DIRS = {
     'forced': PREPROCESSED_COLOR_DIR + '/1. forced_scale',
     'padded': PREPROCESSED_COLOR_DIR + '/2. padded_scale',
@@ -44,8 +56,118 @@ OUTPUT_GRAY_DIRS = {
 }
 
 
+# YOLO 라벨 한 줄 = (이미지 id, 클래스, x_center, y_center, width, height)
+LABEL_DTYPE = np.dtype([
+    ('image_id', np.int64),
+    ('cls', np.int64),
+    ('cx', np.float64),
+    ('cy', np.float64),
+    ('w', np.float64),
+    ('h', np.float64),
+])
+
+
+def load_label_array(label_paths):
+    """
+    YOLO 라벨 파일 여러 개를 하나의 구조화 배열(LABEL_DTYPE)로 로드합니다.
+    image_id 는 label_paths 에서의 인덱스, 값이 5개 미만인 줄은 건너뜁니다.
+    """
+    image_ids, fields = [], []
+    for image_id, path in enumerate(label_paths):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                nums = line.split()
+                if len(nums) < 5:
+                    continue
+                fields.extend(nums[:5])
+                image_ids.append(image_id)
+
+    # 문자열 → 실수 변환을 한 번에 수행
+    values = np.array(fields, dtype=np.float64).reshape(-1, 5)
+    labels = np.empty(len(image_ids), dtype=LABEL_DTYPE)
+    labels['image_id'] = image_ids
+    labels['cls'] = values[:, 0].astype(np.int64)
+    labels['cx'] = values[:, 1]
+    labels['cy'] = values[:, 2]
+    labels['w'] = values[:, 3]
+    labels['h'] = values[:, 4]
+    return labels
+
+
+def yolo_to_pixel(cx, cy, bw, bh, w, h):
+    """정규화 좌표 → 픽셀 좌표 (x_min, y_min, x_max, y_max) (스칼라 / 배열 공통 계산식)"""
+    return (cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h
+
+
+def aspect_expansion(x_min, y_min, x_max, y_max, target_aspect):
+    """
+    목표 종횡비로 확장할 때 필요한 값 (스칼라 / 배열 공통 계산식)
+    반환: (현재 종횡비, center_x, center_y, 목표 너비, 목표 높이) / 높이가 0 이면 종횡비는 inf 또는 nan
+    """
+    current_w = x_max - x_min
+    current_h = y_max - y_min
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aspect = np.divide(current_w, current_h)
+    return aspect, (x_min + x_max) / 2, (y_min + y_max) / 2, current_h * target_aspect, current_w / target_aspect
+
+
+def yolo_to_pixel_boxes(cx, cy, bw, bh, w, h):
+    """정규화 좌표 배열 → 픽셀 좌표 (N, 4) [x_min, y_min, x_max, y_max] (w, h 는 스칼라 또는 배열)"""
+    return np.stack(yolo_to_pixel(cx, cy, bw, bh, w, h), axis=-1)
+
+
+def adjust_boxes_to_aspect(boxes, target_aspect):
+    """픽셀 좌표 배열의 BBox 를 목표 종횡비에 맞게 확장합니다 (Strategy 3)."""
+    x_min, y_min, x_max, y_max = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    aspect, center_x, center_y, target_w_pixels, target_h_pixels = aspect_expansion(
+        x_min, y_min, x_max, y_max, target_aspect)
+
+    # 가로로 더 넓으면 세로를, 세로로 더 길면 가로를 늘림
+    wider = aspect > target_aspect
+    taller = aspect < target_aspect
+    return np.stack([
+        np.where(taller, center_x - target_w_pixels / 2, x_min),
+        np.where(wider, center_y - target_h_pixels / 2, y_min),
+        np.where(taller, center_x + target_w_pixels / 2, x_max),
+        np.where(wider, center_y + target_h_pixels / 2, y_max),
+    ], axis=-1)
+
+
+def clamp_boxes(boxes, w, h):
+    """
+    픽셀 좌표 배열을 정수로 자른 뒤(int() 와 동일) 이미지 경계 내로 클램핑합니다.
+    NaN / inf 좌표가 있으면 ValueError (clamp_coordinates 의 int() 와 같이 거부)
+    """
+    finite = np.isfinite(boxes).all(axis=-1)
+    if not finite.all():
+        raise ValueError(f"⚠ 유한하지 않은 BBox 좌표 {int((~finite).sum())}개 (행 {np.flatnonzero(~finite)[:5].tolist()})")
+    boxes = np.trunc(boxes).astype(np.int64)
+    w = np.asarray(w, dtype=np.int64)
+    h = np.asarray(h, dtype=np.int64)
+    return np.stack([
+        np.maximum(0, boxes[:, 0]),
+        np.maximum(0, boxes[:, 1]),
+        np.minimum(w, boxes[:, 2]),
+        np.minimum(h, boxes[:, 3]),
+    ], axis=-1)
+
+
+def get_bbox_pixel_coords_array(labels, w, h, target_aspect=None):
+    """
+    load_label_array 결과 → 클램핑된 픽셀 좌표 (N, 4) int64 [x_min, y_min, x_max, y_max]
+    w, h: 스칼라 또는 라벨마다의 이미지 크기 배열 (예: widths[labels['image_id']])
+    target_aspect 가 주어지면 해당 종횡비에 맞게 BBox 를 조정합니다 (Strategy 3).
+    """
+    boxes = yolo_to_pixel_boxes(labels['cx'], labels['cy'], labels['w'], labels['h'], w, h)
+    if target_aspect is not None and target_aspect > 0:
+        boxes = adjust_boxes_to_aspect(boxes, target_aspect)
+    return clamp_boxes(boxes, w, h)
+
+
 def clamp_coordinates(x_min, y_min, x_max, y_max, w, h):
-    """좌표를 이미지 경계 내로 클램핑합니다."""
+    """좌표를 이미지 경계 내로 클램핑합니다. (NaN / inf 좌표는 ValueError)"""
+    if not all(map(np.isfinite, (x_min, y_min, x_max, y_max))):
+        raise ValueError(f"⚠ 유한하지 않은 BBox 좌표: {(x_min, y_min, x_max, y_max)}")
     x_min = max(0, int(x_min))
     y_min = max(0, int(y_min))
     x_max = min(w, int(x_max))
@@ -57,6 +179,7 @@ def get_bbox_pixel_coords(line, w, h, target_aspect=None):
     """
     YOLO 라벨 라인에서 픽셀 좌표를 계산합니다. 
     target_aspect가 주어지면, 해당 종횡비에 맞게 Bounding Box를 조정합니다 (Strategy 3).
+    줄 단위 호출용 스칼라 계산 (계산식은 get_bbox_pixel_coords_array 와 공통)
     """
     nums = line.strip().split()
     if len(nums) < 5:
@@ -64,75 +187,27 @@ def get_bbox_pixel_coords(line, w, h, target_aspect=None):
 
     cls = nums[0]
     x_center, y_center, width, height = map(float, nums[1:5])
-
-    # Normalized BBox -> Pixel BBox
-    x_min = (x_center - width / 2) * w
-    y_min = (y_center - height / 2) * h
-    x_max = (x_center + width / 2) * w
-    y_max = (y_center + height / 2) * h
+    x_min, y_min, x_max, y_max = yolo_to_pixel(x_center, y_center, width, height, w, h)
 
     # --- Aspect-Ratio Adjustment (Strategy 3 only) ---
     if target_aspect is not None and target_aspect > 0:
-        current_w = x_max - x_min
-        current_h = y_max - y_min
-        
-        center_x = (x_min + x_max) / 2
-        center_y = (y_min + y_max) / 2
-
-        # 현재 종횡비와 목표 종횡비를 비교하여 더 넓거나 더 긴 쪽을 기준으로 BBox 확장
-        if current_w / current_h > target_aspect:
+        aspect, center_x, center_y, target_w_pixels, target_h_pixels = aspect_expansion(
+            x_min, y_min, x_max, y_max, target_aspect)
+        if aspect > target_aspect:
             # 현재 BBox가 목표보다 가로로 더 넓음 -> 세로를 늘려야 함
-            target_h_pixels = current_w / target_aspect
-            dy = (target_h_pixels - current_h) / 2
             y_min = center_y - target_h_pixels / 2
             y_max = center_y + target_h_pixels / 2
-        elif current_w / current_h < target_aspect:
+        elif aspect < target_aspect:
             # 현재 BBox가 목표보다 세로로 더 길음 -> 가로를 늘려야 함
-            target_w_pixels = current_h * target_aspect
-            dx = (target_w_pixels - current_w) / 2
             x_min = center_x - target_w_pixels / 2
             x_max = center_x + target_w_pixels / 2
-            
+
     # 이미지 경계 내로 클램핑
     x_min, y_min, x_max, y_max = clamp_coordinates(x_min, y_min, x_max, y_max, w, h)
-    
     return cls, x_min, y_min, x_max, y_max
 
 def convert_color_to_gray():
-    print("컬러 이미지 → 흑백 이미지 변환 시작...")
-    
-    for key in OUTPUT_COLOR_DIRS:
-        color_image_dir = os.path.join(OUTPUT_COLOR_DIRS[key], 'images')
-        gray_image_dir  = os.path.join(OUTPUT_GRAY_DIRS[key], 'images')
-        color_label_dir = os.path.join(OUTPUT_COLOR_DIRS[key], 'labels')
-        gray_label_dir  = os.path.join(OUTPUT_GRAY_DIRS[key], 'labels')
-        
-        # 디렉터리 없으면 생성
-        os.makedirs(gray_image_dir, exist_ok=True)
-        os.makedirs(gray_label_dir, exist_ok=True)
-        
-        # --- 이미지 변환 ---
-        files = sorted(f for f in os.listdir(color_image_dir) if f.lower().endswith(('.jpg', '.png', '.jpeg')))
-        for file_name in files:
-            color_path = os.path.join(color_image_dir, file_name)
-            gray_path  = os.path.join(gray_image_dir, file_name)  # 파일명 그대로
-            
-            img = cv2.imread(color_path)
-            if img is None:
-                print(f"  ⚠️ 이미지 읽기 실패: {color_path}")
-                continue
-            
-            gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            cv2.imwrite(gray_path, gray_img)
-            print(f"  ✅ 저장 완료: {gray_path}")
-        
-        # --- 라벨 복사 ---
-        label_files = sorted(f for f in os.listdir(color_label_dir) if f.endswith('.txt'))
-        for label_file in label_files:
-            src_label = os.path.join(color_label_dir, label_file)
-            dst_label = os.path.join(gray_label_dir, label_file)
-            shutil.copy2(src_label, dst_label)  # 메타데이터까지 포함해서 복사
-            print(f"  ✅ 라벨 복사 완료: {dst_label}")
-    
-    print("모든 이미지 흑백 변환 및 라벨 복사 완료!")
+    """data_prep/color_to_gray.py 의 병렬 일괄 변환으로 전체 다시 변환 (라벨은 하드링크)"""
+    from data_prep.color_to_gray import convert_color_to_gray as convert_bulk
+    convert_bulk(incremental=False)
 
@@ -0,0 +1,227 @@
+# instrumentation.py
+"""
+학습 / 평가 단계별 시간 측정과 카운터
+- Instrumentation: 이름 붙인 타이머(누적 시간, 호출 수) + 카운터(이미지 수, 읽은 바이트 수 등) + 계산 값
+  스레드에서 동시에 기록해도 안전 (디코딩 워커 스레드에서 카운터 증가)
+- Keras 콜백: epoch 시간 / 처리한 이미지 수 / 읽은 바이트 수, 체크포인트 저장 시간, 선택한 epoch 구간의 tf.profiler 트레이스
+- 결과는 JSON 요약 파일로 저장 (history.csv / results_N.txt 옆)
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def current_rss_mb():
+    """현재 프로세스 메모리 사용량(RSS, MB) (Linux 는 /proc, 그 외는 최대 RSS)"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """현재 프로세스의 최대 메모리 사용량(peak RSS, MB)"""
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == "darwin" else rss / 2 ** 10
+
+
+def file_bytes(paths):
+    """파일 크기 합계 (없는 파일은 0)"""
+    total = 0
+    for path in paths:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+
+class Instrumentation:
+    """
+    name: 요약 파일에 기록할 이름 (예: 'train color_3')
+    사용 예:
+        inst = Instrumentation("test")
+        with inst.timer("predict"):
+            ...
+        inst.count("images", len(batch))
+        inst.save(path)
+    """
+
+    def __init__(self, name=""):
+        self.name = name
+        self.timers = {}  # 이름 → [누적 시간(s), 호출 수]
+        self.counters = {}
+        self.values = {}  # 처리량 / 비율 등 계산 값
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self.lock:
+            entry = self.timers.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def set_value(self, name, value):
+        with self.lock:
+            self.values[name] = value
+
+    def seconds(self, name):
+        return self.timers.get(name, [0.0, 0])[0]
+
+    def rate(self, counter, timer):
+        """counter / timer 누적 시간 (초당 처리량), 시간이 0 이면 None"""
+        seconds = self.seconds(timer)
+        return self.counters.get(counter, 0) / seconds if seconds > 0 else None
+
+    def timed_iter(self, iterable, name):
+        """iterable 의 next() 대기 시간을 name 타이머에 기록하며 그대로 반환 (입력 파이프라인 대기 측정)"""
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            finally:
+                self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def summary(self):
+        with self.lock:
+            return {
+                "name": self.name,
+                "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "wall_s": time.perf_counter() - self.start,
+                "peak_rss_mb": peak_rss_mb(),
+                "timers": {k: {"seconds": v[0], "calls": v[1]} for k, v in self.timers.items()},
+                "counters": dict(self.counters),
+                "values": dict(self.values),
+            }
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        print(f"✅ 단계별 측정 결과 저장: {path}")
+        return path
+
+
+def load_summary(path):
+    """save 로 저장한 요약 JSON (없으면 None)"""
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def measure_input_rate(ds, n_batches):
+    """
+    tf.data Dataset 에서 배치 n_batches 개를 모델 없이 읽는 데 걸리는 배치당 시간(s)
+    첫 배치(파이프라인 준비)는 제외, 배치가 부족하면 None
+    """
+    it = iter(ds.take(n_batches + 1))
+    if next(it, None) is None:
+        return None
+    start = time.perf_counter()
+    n = sum(1 for _ in it)
+    return (time.perf_counter() - start) / n if n else None
+
+
+def measure_compute_rate(model, ds, n_batches):
+    """
+    ds 의 첫 배치 하나를 메모리에 둔 채 model.train_on_batch 를 n_batches 번 반복한 배치당 시간(s)
+    (입력 대기 없는 학습 연산 시간, 첫 호출(그래프 생성)은 제외) / 배치가 없으면 None
+    주의: 모델 가중치가 바뀌므로 학습 / 체크포인트 저장이 끝난 뒤에 호출
+    """
+    batch = next(iter(ds.take(1)), None)
+    if batch is None or n_batches < 1:
+        return None
+    x, y = batch
+    model.train_on_batch(x, y)
+    start = time.perf_counter()
+    for _ in range(n_batches):
+        model.train_on_batch(x, y)
+    return (time.perf_counter() - start) / n_batches
+
+
+# ===============================
+# Keras 콜백 (TensorFlow 는 콜백을 만들 때만 불러옴)
+# ===============================
+def make_epoch_callback(inst, images_per_epoch, bytes_per_epoch, profile_epochs=None, profile_dir=None):
+    """
+    epoch 시간(timer 'epoch', 검증 / 체크포인트 포함) / 검증 시간(timer 'validation') / 학습 이미지 수 / 읽은 바이트 수 기록
+    profile_epochs: (시작, 끝) epoch 번호 (1부터, 끝 포함), 주어지면 그 구간을 tf.profiler 로 profile_dir 에 트레이스
+    """
+    import tensorflow as tf
+
+    class EpochInstrumentationCallback(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.epoch_start = None
+            self.test_start = None
+            self.profiling = False
+
+        def on_epoch_begin(self, epoch, logs=None):
+            if profile_epochs and epoch + 1 == profile_epochs[0]:
+                tf.profiler.experimental.start(profile_dir)
+                self.profiling = True
+                print(f"▶ tf.profiler 트레이스 시작 (epoch {profile_epochs[0]}~{profile_epochs[1]}): {profile_dir}")
+            self.epoch_start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            inst.add_time("epoch", time.perf_counter() - self.epoch_start)
+            inst.count("images", images_per_epoch)
+            inst.count("bytes_read", bytes_per_epoch)
+            if self.profiling and epoch + 1 == profile_epochs[1]:
+                self.stop_profiler()
+
+        def on_test_begin(self, logs=None):
+            self.test_start = time.perf_counter()
+
+        def on_test_end(self, logs=None):
+            inst.add_time("validation", time.perf_counter() - self.test_start)
+
+        def on_train_end(self, logs=None):
+            if self.profiling:
+                self.stop_profiler()
+
+        def stop_profiler(self):
+            tf.profiler.experimental.stop()
+            self.profiling = False
+            print(f"✅ tf.profiler 트레이스 저장: {profile_dir}")
+
+    return EpochInstrumentationCallback()
+
+
+def make_timed_checkpoint(inst, **kwargs):
+    """ModelCheckpoint 와 같되 저장 시간(timer 'checkpoint_write') / 저장한 바이트 수 기록"""
+    import tensorflow as tf
+
+    class TimedModelCheckpoint(tf.keras.callbacks.ModelCheckpoint):
+        def on_epoch_end(self, epoch, logs=None):
+            with inst.timer("checkpoint_write"):
+                super().on_epoch_end(epoch, logs)
+            path = self.filepath.format(epoch=epoch + 1, **(logs or {}))
+            if os.path.isfile(path):
+                inst.count("checkpoint_bytes", os.path.getsize(path))
+
+    return TimedModelCheckpoint(**kwargs)
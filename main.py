@@ -1,74 +1,166 @@
 import os
-import importlib
+import json
+import time
+import multiprocessing as mp
 from datetime import datetime
 
-from train.utils import get_train_model_save_dir
+from run_config import RunConfig
 
 COLORS = ['gray', 'color']
 STRATEGIES = [1, 2, 3]
 RESULTS_DIR = "results"
-os.makedirs(RESULTS_DIR, exist_ok=True)
-
-# 결과 파일 이름 생성 (모델 폴더 마지막 이름 기준)
-today_str = datetime.now().strftime("%Y%m%d")
-# 초기 시퀀스 번호 1부터 시작, 동일 이름 파일이 있으면 증가
-seq = 1
-while True:
-    result_filename = f"{today_str}_{seq}.txt"
-    RESULTS_PATH = os.path.join(RESULTS_DIR, result_filename)
-    if not os.path.exists(RESULTS_PATH):
-        break
-    seq += 1
-
-# 결과 파일 초기화
-with open(RESULTS_PATH, "w", encoding="utf-8") as f:
-    f.write(f"테스트 결과 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
-    f.write("=" * 50 + "\n\n")
-
-for color in COLORS:
-    for strategy in STRATEGIES:
-        print(f"\n\n=== {color.upper()} - 전략 {strategy} ===")
-
-        # 학습 폴더 생성
-        TRAIN_MODEL_SAVE_DIR = get_train_model_save_dir(color, strategy)
-
-        # =====================
-        # 학습 수행
-        # =====================
-        train_mod = importlib.import_module("train.train")
-        importlib.reload(train_mod)
-        best_epoch = train_mod.train_model(color, strategy, TRAIN_MODEL_SAVE_DIR)
-        print(f"▶ 학습 완료 (최고 검증 정확도 epoch: {best_epoch})")
-
-        # =====================
-        # 테스트 수행
-        # =====================
-        test_mod = importlib.import_module("test.test")
-        importlib.reload(test_mod)
-
-        model_path = os.path.join(TRAIN_MODEL_SAVE_DIR, f"epoch_{best_epoch:02d}.h5")
-        results_txt_path = os.path.join(TRAIN_MODEL_SAVE_DIR, f"results_{best_epoch}.txt")
-        confusion_matrix_path = os.path.join(TRAIN_MODEL_SAVE_DIR, f"confusion_matrix_{best_epoch}.png")
-
-        # 테스트 수행
-        test_mod.test_model(
-            selected_color=color,
-            selected_strategy=strategy,
-            model_path=model_path,
-            epoch=best_epoch,
-            results_txt_dir=TRAIN_MODEL_SAVE_DIR,
-            confusion_matrix_dir=TRAIN_MODEL_SAVE_DIR
-        )
-
-        # =====================
-        # 결과 기록 (results.txt에 누적)
-        # =====================
-        with open(RESULTS_PATH, "a", encoding="utf-8") as f:
-            f.write(f"{color.upper()} - 전략 {strategy} (최고 검증 정확도 epoch: {best_epoch})\n")
-            f.write("-" * 40 + "\n")
-            if os.path.exists(results_txt_path):
-                with open(results_txt_path, "r", encoding="utf-8") as r:
-                    f.write(r.read())
-            f.write("\n\n")
-
-print(f"\n모든 테스트 완료. 결과 저장: {RESULTS_PATH}")
+EVALUATE_ALL_EPOCHS = False  # True 이면 최고 epoch 외에 모든 epoch 체크포인트도 한 번에 평가
+
+# ===============================
+# 병렬 실행 설정
+# ===============================
+MAX_CONCURRENT_JOBS = 1  # 동시에 실행할 (color, 전략) 작업 수 (작업마다 별도 프로세스)
+INTRA_OP_THREADS = 0     # 작업당 TensorFlow intra-op 스레드 수 (0 이면 코어 수 / 동시 작업 수)
+INTER_OP_THREADS = 2     # 작업당 TensorFlow inter-op 스레드 수
+
+
+def get_results_path():
+    """결과 파일 경로 생성 (results/YYYYMMDD_N.txt, 동일 이름 파일이 있으면 N 증가)"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    today_str = datetime.now().strftime("%Y%m%d")
+    # 초기 시퀀스 번호 1부터 시작, 동일 이름 파일이 있으면 증가
+    seq = 1
+    while True:
+        result_filename = f"{today_str}_{seq}.txt"
+        results_path = os.path.join(RESULTS_DIR, result_filename)
+        if not os.path.exists(results_path):
+            return results_path
+        seq += 1
+
+
+def run_job(config, model_save_dir, intra_threads, inter_threads):
+    """
+    RunConfig (color, 전략) 하나의 학습 + 테스트 (워커 프로세스에서 실행)
+    반환: (최고 검증 정확도 epoch, epoch 별 테스트 결과 표 문자열, 단계별 측정 결과 dict)
+    """
+    job_start = time.perf_counter()
+    # TensorFlow 를 불러오기 전에 스레드 수 제한
+    os.environ["OMP_NUM_THREADS"] = str(intra_threads)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(intra_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_threads)
+
+    from instrumentation import load_summary
+    from data_prep.split_manifest import get_split_manifest_path
+    from data_prep.seperating import SPLIT_NAME
+    from train.train import train_model, TRAIN_INSTRUMENTATION_FILE
+    from test.test import (
+        test_model, evaluate_checkpoints, format_metrics_table,
+        TEST_INSTRUMENTATION_FILE, EVALUATE_INSTRUMENTATION_FILE
+    )
+
+    # 작업마다 설정 객체 하나를 학습 / 테스트에 그대로 전달
+    color, strategy = config.color, config.strategy
+    # 'manifest' 방식으로 분할해 train/test 폴더가 없으면 분할 매니페스트로 분할 전 폴더에서 읽기
+    split_manifest = get_split_manifest_path(SPLIT_NAME)
+    if not os.path.isdir(config.split_dirs("train")[0]) and os.path.isfile(split_manifest):
+        config = config.replace(split_manifest=split_manifest)
+
+    print(f"\n\n=== {color.upper()} - 전략 {strategy} === (pid {os.getpid()}, intra {intra_threads}, inter {inter_threads})")
+
+    # =====================
+    # 학습 수행
+    # =====================
+    best_epoch = train_model(config, model_save_dir)
+    print(f"▶ 학습 완료 (최고 검증 정확도 epoch: {best_epoch})")
+
+    # =====================
+    # 테스트 수행
+    # =====================
+    model_path = os.path.join(model_save_dir, f"epoch_{best_epoch:02d}.h5")
+    test_model(
+        config,
+        model_path=model_path,
+        epoch=best_epoch,
+        results_txt_dir=model_save_dir,
+        confusion_matrix_dir=model_save_dir
+    )
+
+    # 모든 epoch 체크포인트 평가 (테스트 세트는 한 번만 디코딩)
+    epoch_table = ""
+    if EVALUATE_ALL_EPOCHS:
+        epoch_rows = evaluate_checkpoints(config, model_save_dir)
+        epoch_table = format_metrics_table(epoch_rows)
+
+    # 각 단계가 학습 폴더에 저장한 측정 결과를 모아 부모 프로세스로 전달
+    timings = {
+        "job_s": time.perf_counter() - job_start,
+        "train": load_summary(os.path.join(model_save_dir, TRAIN_INSTRUMENTATION_FILE)),
+        "test": load_summary(os.path.join(model_save_dir, TEST_INSTRUMENTATION_FILE.format(epoch=best_epoch))),
+        "evaluate": load_summary(os.path.join(model_save_dir, EVALUATE_INSTRUMENTATION_FILE)) if EVALUATE_ALL_EPOCHS else None,
+    }
+    return best_epoch, epoch_table, timings
+
+
+def write_job_result(results_path, color, strategy, model_save_dir, best_epoch, epoch_table):
+    """작업 결과를 results.txt 에 누적"""
+    results_txt_path = os.path.join(model_save_dir, f"results_{best_epoch}.txt")
+    with open(results_path, "a", encoding="utf-8") as f:
+        f.write(f"{color.upper()} - 전략 {strategy} (최고 검증 정확도 epoch: {best_epoch})\n")
+        f.write("-" * 40 + "\n")
+        if os.path.exists(results_txt_path):
+            with open(results_txt_path, "r", encoding="utf-8") as r:
+                f.write(r.read())
+        if epoch_table:
+            f.write("\n[epoch 별 테스트 결과]\n")
+            f.write(epoch_table)
+        f.write("\n\n")
+
+
+def main(max_concurrent_jobs=MAX_CONCURRENT_JOBS):
+    results_path = get_results_path()
+
+    # 결과 파일 초기화
+    with open(results_path, "w", encoding="utf-8") as f:
+        f.write(f"테스트 결과 ({datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n")
+        f.write("=" * 50 + "\n\n")
+
+    # 학습 폴더는 부모 프로세스에서 미리 생성 (동시 작업 간 폴더 이름 충돌 방지)
+    jobs = []
+    for color in COLORS:
+        for strategy in STRATEGIES:
+            config = RunConfig(color=color, strategy=strategy)
+            jobs.append((config, config.new_model_save_dir()))
+
+    n_workers = max(1, min(max_concurrent_jobs, len(jobs)))
+    intra_threads = INTRA_OP_THREADS or max(1, (os.cpu_count() or 1) // n_workers)
+    print(f"총 {len(jobs)}개 작업, 동시 실행 {n_workers}개 (작업당 intra {intra_threads}, inter {INTER_OP_THREADS})")
+
+    all_timings = {}
+
+    # 작업마다 새 프로세스에서 실행 (모듈 전역 상태/TF 그래프 공유 없음)
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes=n_workers, maxtasksperchild=1) as pool:
+        pending = [
+            pool.apply_async(run_job, (config, model_save_dir, intra_threads, INTER_OP_THREADS))
+            for config, model_save_dir in jobs
+        ]
+
+        # 완료 순서와 상관없이 COLORS × STRATEGIES 순서대로 결과 기록
+        for (config, model_save_dir), result in zip(jobs, pending):
+            color, strategy = config.color, config.strategy
+            try:
+                best_epoch, epoch_table, timings = result.get()
+            except Exception as e:
+                print(f"⚠️ {color.upper()} - 전략 {strategy} 실패: {e}")
+                with open(results_path, "a", encoding="utf-8") as f:
+                    f.write(f"{color.upper()} - 전략 {strategy} 실패: {e}\n\n")
+                continue
+            write_job_result(results_path, color, strategy, model_save_dir, best_epoch, epoch_table)
+            all_timings[f"{color}_{strategy}"] = timings
+
+    # 작업별 단계 시간 / 처리량을 결과 파일 옆에 JSON 으로 저장
+    timings_path = os.path.splitext(results_path)[0] + "_instrumentation.json"
+    with open(timings_path, "w", encoding="utf-8") as f:
+        json.dump(all_timings, f, ensure_ascii=False, indent=2)
+
+    print(f"\n모든 테스트 완료. 결과 저장: {results_path} (단계별 측정: {timings_path})")
+
+
+if __name__ == "__main__":
+    main()
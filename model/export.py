@@ -0,0 +1,140 @@
+# export.py
+"""
+학습된 체크포인트(epoch_XX.h5) → 추론 전용 형식으로 내보내기
+- saved_model/ : 고정 입력 시그니처 concrete function 하나만 담은 SavedModel (Keras / 옵티마이저 상태 없음)
+- model.tflite : TFLite flatbuffer
+- weights.npz  : 레이어 구성(JSON) + 가중치 (runtime.NumpyRuntime 용)
+출력 폴더: 체크포인트 폴더/export/epoch_XX/
+내보낸 뒤 .h5 와 각 형식의 시작 시간 / 배치별 추론 지연시간을 새 프로세스에서 측정
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+import numpy as np
+
+from model.runtime import SAVED_MODEL_DIR, TFLITE_FILE, WEIGHTS_FILE, RUNTIMES
+from model.numpy_engine import layer_spec
+
+
+def get_export_dir(model_path):
+    """model/.../20251204_08/epoch_09.h5 → model/.../20251204_08/export/epoch_09"""
+    model_dir, file_name = os.path.split(model_path)
+    return os.path.join(model_dir, "export", os.path.splitext(file_name)[0])
+
+
+def export_saved_model(model, out_dir):
+    """입력 (None, H, W, C) float32 → {'probability': (None, 1)} concrete function 만 저장"""
+    import tensorflow as tf
+
+    module = tf.Module()
+    module.model = model
+    module.serve = tf.function(
+        lambda x: {"probability": model(x, training=False)},
+        input_signature=[tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="x")]
+    )
+    saved_model_dir = os.path.join(out_dir, SAVED_MODEL_DIR)
+    tf.saved_model.save(module, saved_model_dir, signatures={"serving_default": module.serve.get_concrete_function()})
+    return saved_model_dir
+
+
+def export_tflite(saved_model_dir, out_dir):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    tflite_path = os.path.join(out_dir, TFLITE_FILE)
+    with open(tflite_path, "wb") as f:
+        f.write(converter.convert())
+    return tflite_path
+
+
+def export_numpy_weights(model, out_dir):
+    """레이어 구성(JSON 문자열) + 레이어별 kernel / bias 를 하나의 npz 로 저장"""
+    layers, arrays = [], {}
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == "InputLayer":
+            continue
+
+        spec = layer_spec(kind, layer.get_config())
+        if not layers:
+            spec["input_shape"] = list(model.input_shape[1:])
+
+        i = len(layers)
+        weights = layer.get_weights()
+        if weights:
+            arrays[f"{i}/kernel"] = weights[0].astype(np.float32)
+            if len(weights) > 1:
+                arrays[f"{i}/bias"] = weights[1].astype(np.float32)
+        layers.append(spec)
+
+    weights_path = os.path.join(out_dir, WEIGHTS_FILE)
+    np.savez(weights_path, layers=np.array(json.dumps(layers)), **arrays)
+    return weights_path
+
+
+def export_checkpoint(model_path, out_dir=None):
+    """
+    model_path: 학습된 모델 경로 (epoch_XX.h5)
+    out_dir   : 출력 폴더 (None 이면 get_export_dir)
+    반환: 출력 폴더 경로
+    """
+    import tensorflow as tf
+
+    out_dir = out_dir or get_export_dir(model_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    saved_model_dir = export_saved_model(model, out_dir)
+    print(f"✅ SavedModel 저장: {saved_model_dir}")
+    print(f"✅ TFLite 저장: {export_tflite(saved_model_dir, out_dir)}")
+    print(f"✅ NumPy 가중치 저장: {export_numpy_weights(model, out_dir)}")
+    return out_dir
+
+
+def benchmark_exports(model_path, export_dir, runtimes=RUNTIMES):
+    """
+    .h5 와 내보낸 형식별로 새 프로세스에서 시작 시간 / 추론 지연시간 측정
+    process_s: 프로세스 시작부터 측정 종료까지 (Python / 모듈 import 포함)
+    """
+    rows = []
+    for kind in runtimes:
+        path = model_path if kind == 'keras' else export_dir
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-m", "model.runtime", path, kind],
+            capture_output=True, text=True
+        )
+        if out.returncode != 0:
+            print(f"⚠️ {kind} 측정 실패:\n{out.stderr.strip()[-500:]}")
+            continue
+        row = json.loads(out.stdout.strip().splitlines()[-1])
+        row["process_s"] = time.perf_counter() - start
+        rows.append(row)
+    return rows
+
+
+def format_benchmark_table(rows):
+    batch_sizes = list(rows[0]["latency_ms"]) if rows else []
+    header = f"{'runtime':<12} {'process(s)':>10} {'startup(s)':>10}" + "".join(f" {'bs=' + b + '(ms)':>12}" for b in batch_sizes)
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['runtime']:<12} {row['process_s']:>10.2f} {row['startup_s']:>10.2f}"
+            + "".join(f" {row['latency_ms'][b]:>12.3f}" for b in batch_sizes)
+        )
+    return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+    # python -m model.export <epoch_XX.h5>
+    model_path = sys.argv[1]
+    export_dir = export_checkpoint(model_path)
+
+    rows = benchmark_exports(model_path, export_dir)
+    table = format_benchmark_table(rows)
+    print(table)
+    with open(os.path.join(export_dir, "benchmark.txt"), "w", encoding="utf-8") as f:
+        f.write(table)
@@ -0,0 +1,326 @@
+# numpy_engine.py
+"""
+model/model_*.py CNN 을 TensorFlow 없이 NumPy 로 실행하는 추론 엔진
+- 학습된 .h5 (h5py 로 model_config + model_weights 직접 읽기) 또는 export.py 의 weights.npz 로드
+- 지원 레이어: Conv2D, MaxPooling2D, AveragePooling2D, Dropout(추론 시 통과), Flatten, GlobalAveragePooling2D, Dense
+- Conv2D 는 im2col(복사 없는 슬라이딩 윈도우 뷰) + 배치 행렬곱, padding 은 Keras 'same' / 'valid' 규칙과 동일
+- channels_last, float32 계산
+- check_parity 로 Keras 결과와 비교 (이때만 TensorFlow 를 불러옴)
+  python -m model.numpy_engine: 체크포인트 없이 모든 model_*.py 구조를 무작위 가중치로 확인 (check_parity_random)
+"""
+
+import os
+import re
+import sys
+import json
+import shutil
+import tempfile
+import numpy as np
+
+# 레이어별로 엔진이 사용하는 설정 값
+LAYER_CONFIG_KEYS = {
+    "Conv2D": ("strides", "padding", "activation"),
+    "MaxPooling2D": ("pool_size", "strides", "padding"),
+    "AveragePooling2D": ("pool_size", "strides", "padding"),
+    "Dense": ("activation",),
+    "Flatten": (),
+    "GlobalAveragePooling2D": (),
+    "Dropout": (),
+}
+
+# Keras 결과와 비교할 때의 허용 오차
+PARITY_ATOL = 1e-5
+
+
+# ===============================
+# 연산 (Keras 와 같은 channels_last, 'same' / 'valid' padding 규칙)
+# ===============================
+def sigmoid(x):
+    with np.errstate(over='ignore'):
+        return 1 / (1 + np.exp(-x))
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": sigmoid,
+    "tanh": np.tanh,
+}
+
+
+def same_padding(size, k, s):
+    """Keras 'same' padding: (앞, 뒤) 패딩 수 (남는 1픽셀은 뒤쪽)"""
+    out = -(-size // s)
+    total = max((out - 1) * s + k - size, 0)
+    return total // 2, total - total // 2
+
+
+def pad_input(x, kernel_size, strides, padding, value=0.0):
+    if padding != "same":
+        return x
+    ph = same_padding(x.shape[1], kernel_size[0], strides[0])
+    pw = same_padding(x.shape[2], kernel_size[1], strides[1])
+    if ph == (0, 0) and pw == (0, 0):
+        return x
+    return np.pad(x, ((0, 0), ph, pw, (0, 0)), constant_values=value)
+
+
+def windows(x, kernel_size, strides):
+    """(N, H, W, C) → (N, OH, OW, C, KH, KW) 슬라이딩 윈도우 뷰 (복사 없음)"""
+    view = np.lib.stride_tricks.sliding_window_view(x, kernel_size, axis=(1, 2))
+    return view[:, ::strides[0], ::strides[1]]
+
+
+def conv2d(x, kernel, bias, strides, padding):
+    """im2col + 행렬곱: kernel (KH, KW, C, F)"""
+    kh, kw, c, f = kernel.shape
+    x = pad_input(x, (kh, kw), strides, padding)
+    cols = windows(x, (kh, kw), strides)
+    n, oh, ow = cols.shape[:3]
+    # (N, OH, OW, C, KH, KW) → (N*OH*OW, KH*KW*C) : kernel 의 (KH, KW, C) 순서와 맞춤
+    cols = cols.transpose(0, 1, 2, 4, 5, 3).reshape(n * oh * ow, kh * kw * c)
+    out = cols @ kernel.reshape(kh * kw * c, f)
+    if bias is not None:
+        out += bias
+    return out.reshape(n, oh, ow, f)
+
+
+def pool2d(x, pool_size, strides, padding, mode):
+    if mode == "max":
+        x = pad_input(x, pool_size, strides, padding, value=-np.inf)
+        return windows(x, pool_size, strides).max(axis=(4, 5))
+
+    # 평균: 'same' 패딩 부분은 평균에서 제외 (Keras 와 동일)
+    padded = pad_input(x, pool_size, strides, padding)
+    total = windows(padded, pool_size, strides).sum(axis=(4, 5))
+    if padded is x:
+        return total / np.float32(pool_size[0] * pool_size[1])
+    ones = pad_input(np.ones((1,) + x.shape[1:3] + (1,), dtype=x.dtype), pool_size, strides, padding)
+    counts = windows(ones, pool_size, strides).sum(axis=(4, 5))
+    return total / counts
+
+
+def run_layer(layer, x, kernel=None, bias=None):
+    kind = layer["class_name"]
+    if kind == "Conv2D":
+        x = conv2d(x, kernel, bias, tuple(layer["strides"]), layer["padding"])
+        return ACTIVATIONS[layer["activation"]](x)
+    if kind in ("MaxPooling2D", "AveragePooling2D"):
+        mode = "max" if kind == "MaxPooling2D" else "avg"
+        return pool2d(x, tuple(layer["pool_size"]), tuple(layer["strides"]), layer["padding"], mode)
+    if kind == "Flatten":
+        return x.reshape(len(x), -1)
+    if kind == "GlobalAveragePooling2D":
+        return x.mean(axis=(1, 2))
+    if kind == "Dense":
+        x = x @ kernel
+        if bias is not None:
+            x += bias
+        return ACTIVATIONS[layer["activation"]](x)
+    if kind == "Dropout":
+        return x  # 추론 시에는 그대로 통과
+    raise ValueError(f"⚠ NumPy 엔진이 지원하지 않는 레이어: {kind}")
+
+
+# ===============================
+# 모델 로드
+# ===============================
+def layer_spec(class_name, config):
+    """Keras 레이어 설정 → 엔진 레이어 설정 (지원하지 않는 레이어면 ValueError)"""
+    if class_name not in LAYER_CONFIG_KEYS:
+        raise ValueError(f"⚠ NumPy 엔진이 지원하지 않는 레이어: {class_name}")
+    if config.get("data_format", "channels_last") != "channels_last":
+        raise ValueError(f"⚠ channels_last 만 지원: {config.get('name')}")
+
+    spec = {"class_name": class_name}
+    for key in LAYER_CONFIG_KEYS[class_name]:
+        value = config[key]
+        # 풀링의 strides 기본값(None)은 pool_size 와 같음
+        if key == "strides" and value is None:
+            value = config["pool_size"]
+        if key == "activation" and isinstance(value, dict):
+            value = value["config"]["name"] if "config" in value else value["class_name"]
+        if key in ("strides", "pool_size") and isinstance(value, int):
+            value = [value, value]
+        spec[key] = list(value) if isinstance(value, (list, tuple)) else value
+    return spec
+
+
+class NumpyModel:
+    """
+    layers : 엔진 레이어 설정 리스트 (첫 레이어에 input_shape)
+    weights: 레이어 순서 i 기준 {"i/kernel": 배열, "i/bias": 배열}
+    """
+
+    def __init__(self, layers, weights):
+        self.layers = layers
+        self.weights = {k: np.ascontiguousarray(v, dtype=np.float32) for k, v in weights.items()}
+        self.input_shape = tuple(layers[0]["input_shape"])
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path) as data:
+            layers = json.loads(str(data["layers"]))
+            weights = {k: data[k] for k in data.files if k != "layers"}
+        return cls(layers, weights)
+
+    @classmethod
+    def from_h5(cls, path):
+        """Keras .h5 체크포인트를 h5py 로 직접 읽음 (TensorFlow 불필요)"""
+        import h5py
+
+        with h5py.File(path, "r") as f:
+            model_config = f.attrs["model_config"]
+            if isinstance(model_config, bytes):
+                model_config = model_config.decode("utf-8")
+            keras_layers = json.loads(model_config)["config"]["layers"]
+            weight_root = f["model_weights"] if "model_weights" in f else f
+
+            layers, weights, input_shape = [], {}, None
+            for keras_layer in keras_layers:
+                class_name, config = keras_layer["class_name"], keras_layer["config"]
+                if class_name == "InputLayer":
+                    input_shape = config.get("batch_shape") or config.get("batch_input_shape")
+                    continue
+
+                spec = layer_spec(class_name, config)
+                input_shape = input_shape or config.get("batch_shape") or config.get("batch_input_shape")
+                if not layers:
+                    spec["input_shape"] = list(input_shape[1:])
+
+                # 레이어 그룹의 weight_names 순서 = get_weights() 순서 (kernel, bias)
+                i = len(layers)
+                group = weight_root.get(config["name"])
+                if group is not None:
+                    names = [n.decode("utf-8") if isinstance(n, bytes) else n for n in group.attrs["weight_names"]]
+                    arrays = [group[n][()] for n in names]
+                    if arrays:
+                        weights[f"{i}/kernel"] = arrays[0]
+                    if len(arrays) > 1:
+                        weights[f"{i}/bias"] = arrays[1]
+                layers.append(spec)
+        return cls(layers, weights)
+
+    def count_params(self):
+        return sum(w.size for w in self.weights.values())
+
+    def predict(self, x):
+        """(N, H, W, C) float32 → (N,) 헬멧 확률"""
+        x = np.asarray(x, dtype=np.float32)
+        for i, layer in enumerate(self.layers):
+            x = run_layer(layer, x, self.weights.get(f"{i}/kernel"), self.weights.get(f"{i}/bias"))
+        return x[:, 0]
+
+
+def load_model(path):
+    """.h5 또는 weights.npz → NumpyModel"""
+    if path.endswith(".npz"):
+        return NumpyModel.from_npz(path)
+    return NumpyModel.from_h5(path)
+
+
+def compare_with_keras(engine, keras_model, name, n=8, atol=PARITY_ATOL, seed=0):
+    """같은 무작위 입력에 대해 Keras 와 NumPy 엔진 결과 비교, 최대 오차 반환 (atol 초과면 AssertionError)"""
+    x = np.random.default_rng(seed).random((n,) + engine.input_shape, dtype=np.float32)
+    expected = np.asarray(keras_model.predict_on_batch(x))[:, 0]
+    actual = engine.predict(x)
+
+    max_diff = float(np.abs(expected - actual).max())
+    print(f"{name}: {n}장, 최대 오차 {max_diff:.2e}")
+    assert max_diff <= atol, f"[{name}] Keras / NumPy 엔진 결과 불일치 (최대 오차 {max_diff:.2e})"
+    return max_diff
+
+
+def check_parity(model_path, n=8, atol=PARITY_ATOL, seed=0):
+    """
+    학습된 체크포인트에 대해 Keras 와 NumPy 엔진 결과가 atol 이내인지 확인
+    반환: 최대 오차 / 오차가 크면 AssertionError
+    """
+    import tensorflow as tf
+
+    engine = load_model(model_path)
+    keras_model = tf.keras.models.load_model(model_path, compile=False)
+    return compare_with_keras(engine, keras_model, model_path, n, atol, seed)
+
+
+def build_pooling_test_model(color):
+    """
+    model_*.py 에 없는 경로 확인용 모델
+    stride 2 'same' Conv, 'same' padding 평균 / 최대 풀링(홀수 크기), Dropout, GlobalAveragePooling, 은닉 Dense
+    """
+    import tensorflow as tf
+    from tensorflow.keras import layers, models
+    from data_prep.utils import TARGET_SIZE
+
+    w, h = TARGET_SIZE
+    inputs = tf.keras.Input(shape=(h, w, 3 if color == 'color' else 1))
+    x = layers.Conv2D(6, 3, strides=2, padding="same", activation="relu")(inputs)
+    x = layers.AveragePooling2D(pool_size=3, strides=2, padding="same")(x)
+    x = layers.Conv2D(8, 3, activation="tanh")(x)
+    x = layers.MaxPooling2D(pool_size=3, strides=2, padding="same")(x)
+    x = layers.Dropout(0.3)(x)
+    x = layers.AveragePooling2D(pool_size=2, padding="same")(x)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dense(4, activation="relu")(x)
+    outputs = layers.Dense(1, activation="sigmoid")(x)
+    return models.Model(inputs, outputs)
+
+
+def list_model_ids():
+    """model/model_N.py 의 N 목록"""
+    model_dir = os.path.dirname(os.path.abspath(__file__))
+    return sorted(int(m.group(1)) for m in map(re.compile(r'model_(\d+)\.py$').match, os.listdir(model_dir)) if m)
+
+
+def check_parity_random(n=8, atol=PARITY_ATOL, seed=0):
+    """
+    학습된 체크포인트 없이 확인: model/model_*.py 의 main_cnn (color / gray) + build_pooling_test_model 을
+    무작위 가중치(bias 포함)로 만들어 임시 .h5 / weights.npz 로 저장한 뒤 from_h5 / from_npz 결과를 Keras 와 비교
+    반환: 최대 오차
+    """
+    import importlib
+    import tensorflow as tf
+    from model.export import export_numpy_weights
+
+    builders = [(f"model_{i}", importlib.import_module(f"model.model_{i}").main_cnn) for i in list_model_ids()]
+    builders.append(("pooling_test", build_pooling_test_model))
+
+    rng = np.random.default_rng(seed)
+    max_diff = 0.0
+    tmp_dir = tempfile.mkdtemp(prefix="numpy_engine_parity_")
+    try:
+        for name, build in builders:
+            for color in ('color', 'gray'):
+                tf.keras.utils.set_random_seed(seed)
+                keras_model = build(color)
+                # 초기 bias 는 0 이므로 bias 경로도 확인되도록 무작위 값으로 교체
+                for layer in keras_model.layers:
+                    weights = layer.get_weights()
+                    if len(weights) > 1:
+                        weights[1] = rng.normal(0, 0.1, weights[1].shape).astype(np.float32)
+                        layer.set_weights(weights)
+
+                out_dir = os.path.join(tmp_dir, f"{name}_{color}")
+                os.makedirs(out_dir)
+                h5_path = os.path.join(out_dir, "model.h5")
+                keras_model.save(h5_path)
+                npz_path = export_numpy_weights(keras_model, out_dir)
+
+                for kind, engine in (("h5", NumpyModel.from_h5(h5_path)), ("npz", NumpyModel.from_npz(npz_path))):
+                    diff = compare_with_keras(engine, keras_model, f"{name} {color} ({kind})", n, atol, seed)
+                    max_diff = max(max_diff, diff)
+                tf.keras.backend.clear_session()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return max_diff
+
+
+if __name__ == "__main__":
+    # python -m model.numpy_engine                           : 무작위 가중치로 모든 모델 구조 확인
+    # python -m model.numpy_engine <epoch_XX.h5> [...]       : 학습된 체크포인트 확인
+    if sys.argv[1:]:
+        for model_path in sys.argv[1:]:
+            check_parity(model_path)
+    else:
+        check_parity_random()
+    print("✅ NumPy 엔진 결과 일치")
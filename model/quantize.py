@@ -0,0 +1,173 @@
+# quantize.py
+"""
+학습 후 양자화 (post-training quantization) + 정확도 / 속도 / 메모리 비교
+- float16: 가중치만 float16 으로 저장 (크기 1/2)
+- int8   : train split 일부로 활성값 범위를 보정(calibration)한 int8 연산 모델 (입출력은 float32 그대로)
+- 비교 대상: .h5 (Keras), float32 TFLite, float16 TFLite, int8 TFLite
+- 테스트 세트로 test_model 과 같은 지표(Accuracy / Precision / Recall / F1) + 처리량 + 파일 크기 + 로드 메모리 측정
+출력: 체크포인트 폴더/export/epoch_XX/ 아래 model_float16.tflite, model_int8.tflite, quantization_report.txt/.csv
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import numpy as np
+
+from run_config import RunConfig
+from instrumentation import current_rss_mb
+from data_prep.model_input import load_batch
+from model.runtime import KerasRuntime, TFLiteRuntime, TFLITE_FILE
+from model.export import get_export_dir, export_saved_model, export_tflite
+
+CALIBRATION_SIZE = 200  # int8 보정에 사용할 train 이미지 수
+CALIBRATION_SEED = 42
+EVAL_BATCH_SIZE = 64
+THROUGHPUT_REPEATS = 5  # 처리량 측정 시 테스트 세트 전체 반복 횟수
+
+VARIANT_FILES = {
+    'float32': TFLITE_FILE,
+    'float16': "model_float16.tflite",
+    'int8': "model_int8.tflite",
+}
+
+
+def load_calibration_set(config, size=CALIBRATION_SIZE, seed=CALIBRATION_SEED):
+    """train split 에서 size 장을 고정 seed 로 골라 (N, H, W, C) float32 로 반환"""
+    img_paths, _ = config.label_index("train")
+    if not img_paths:
+        raise ValueError("⚠ 보정용 train 데이터셋이 비어 있습니다. 경로와 파일 확인 필요")
+    paths = random.Random(seed).sample(img_paths, min(size, len(img_paths)))
+    x, _ = load_batch(paths, config.color, target_size=config.img_size)
+    return x
+
+
+def convert_quantized(saved_model_dir, out_path, mode, calibration=None):
+    """mode: 'float16' / 'int8' (int8 은 calibration 배열 필요)"""
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'float16':
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == 'int8':
+        def representative_dataset():
+            for i in range(len(calibration)):
+                yield [calibration[i:i + 1]]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"⚠ 알 수 없는 양자화 방식: {mode}")
+
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    return out_path
+
+
+def quantize_checkpoint(model_path, config, export_dir=None):
+    """
+    model_path: 학습된 모델 경로 (epoch_XX.h5)
+    config    : RunConfig (보정용 train split 선택, 모델 학습에 사용한 데이터)
+    반환: {변형 이름: 파일 경로}
+    """
+    import tensorflow as tf
+
+    export_dir = export_dir or get_export_dir(model_path)
+    os.makedirs(export_dir, exist_ok=True)
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    saved_model_dir = export_saved_model(model, export_dir)
+    paths = {'float32': export_tflite(saved_model_dir, export_dir)}
+
+    paths['float16'] = convert_quantized(saved_model_dir, os.path.join(export_dir, VARIANT_FILES['float16']), 'float16')
+    print(f"✅ float16 저장: {paths['float16']}")
+
+    calibration = load_calibration_set(config)
+    print(f"보정용 train 이미지 {len(calibration)}장 로드")
+    paths['int8'] = convert_quantized(saved_model_dir, os.path.join(export_dir, VARIANT_FILES['int8']), 'int8', calibration)
+    print(f"✅ int8 저장: {paths['int8']}")
+    return paths
+
+
+def evaluate_runtime(name, runtime, x, y, model_bytes, load_mb, batch_size=EVAL_BATCH_SIZE):
+    """테스트 세트 지표 + 처리량(이미지/초) 측정"""
+    from test.test import compute_metrics
+
+    def predict_all():
+        return np.concatenate([runtime.predict(x[s:s + batch_size]) for s in range(0, len(x), batch_size)])
+
+    probs = predict_all()  # 첫 실행(준비 시간) 은 처리량에서 제외
+    start = time.perf_counter()
+    for _ in range(THROUGHPUT_REPEATS):
+        predict_all()
+    elapsed = time.perf_counter() - start
+
+    row = {"variant": name}
+    row.update(compute_metrics(y, (probs > 0.5).astype(int)))
+    row["throughput"] = len(x) * THROUGHPUT_REPEATS / elapsed
+    row["size_kb"] = model_bytes / 1024
+    row["load_mb"] = load_mb
+    return row
+
+
+def build_report(model_path, variant_paths, x, y, batch_size=EVAL_BATCH_SIZE):
+    """.h5 + TFLite 변형별 평가 → 행 목록 (첫 행 .h5 가 비교 기준)"""
+    rows = []
+
+    rss = current_rss_mb()
+    runtime = KerasRuntime(model_path)
+    rows.append(evaluate_runtime("h5", runtime, x, y, os.path.getsize(model_path), current_rss_mb() - rss, batch_size))
+    del runtime
+
+    for name, path in variant_paths.items():
+        rss = current_rss_mb()
+        runtime = TFLiteRuntime(path)
+        rows.append(evaluate_runtime(name, runtime, x, y, os.path.getsize(path), current_rss_mb() - rss, batch_size))
+        del runtime
+        print(f"  [{name}] Accuracy: {rows[-1]['accuracy']:.4f}, {rows[-1]['throughput']:.0f} img/s")
+    return rows
+
+
+def format_report(rows):
+    base = rows[0]
+    header = (f"{'variant':<8} {'size(KB)':>9} {'load(MB)':>9} {'img/s':>9} {'speedup':>8} "
+              f"{'Accuracy':>9} {'ΔAcc':>8} {'Precision':>9} {'Recall':>9} {'F1-score':>9}")
+    lines = [header, "-" * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['variant']:<8} {row['size_kb']:>9.1f} {row['load_mb']:>9.1f} {row['throughput']:>9.0f} "
+            f"{row['throughput'] / base['throughput']:>7.2f}x "
+            f"{row['accuracy']:>9.4f} {row['accuracy'] - base['accuracy']:>+8.4f} "
+            f"{row['precision']:>9.4f} {row['recall']:>9.4f} {row['f1']:>9.4f}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def run_quantization(model_path, config, batch_size=EVAL_BATCH_SIZE):
+    """양자화 + 테스트 세트 평가 + 보고서 저장 (config: RunConfig)"""
+    from test.test import load_test_set
+
+    export_dir = get_export_dir(model_path)
+    variant_paths = quantize_checkpoint(model_path, config, export_dir)
+
+    x, y = load_test_set(config.replace(test_batch_size=batch_size))
+    print(f"테스트 세트 로드 완료: {len(y)}장")
+    rows = build_report(model_path, variant_paths, x, y, batch_size)
+
+    report = format_report(rows)
+    print(report)
+    with open(os.path.join(export_dir, "quantization_report.txt"), "w", encoding="utf-8") as f:
+        f.write(f"{model_path} ({config.color}, 전략 {config.strategy}, 테스트 {len(y)}장)\n\n")
+        f.write(report)
+    with open(os.path.join(export_dir, "quantization_report.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"✅ 양자화 보고서 저장: {export_dir}")
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m model.quantize <epoch_XX.h5> <color> <전략 번호>
+    run_quantization(sys.argv[1], RunConfig(color=sys.argv[2], strategy=int(sys.argv[3])))
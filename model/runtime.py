@@ -0,0 +1,149 @@
+# runtime.py
+"""
+추론 전용 런타임 (학습된 모델 실행만 담당, 옵티마이저 / Keras 학습 기능 불필요)
+- KerasRuntime     : epoch_XX.h5 (기존 방식, 비교 기준)
+- SavedModelRuntime: export.py 로 만든 concrete function SavedModel
+- TFLiteRuntime    : export.py 로 만든 .tflite (tflite_runtime 이 설치되어 있으면 TensorFlow 없이 실행)
+- NumpyRuntime     : numpy_engine 으로 .h5 / weights.npz 를 직접 계산 (TensorFlow 불필요)
+모든 런타임은 predict(x) 하나로 사용: (N, H, W, C) float32 → (N,) 헬멧 확률
+"""
+
+import os
+import sys
+import json
+import time
+import numpy as np
+
+from model.numpy_engine import load_model as load_numpy_model
+
+SAVED_MODEL_DIR = "saved_model"
+TFLITE_FILE = "model.tflite"
+WEIGHTS_FILE = "weights.npz"
+
+RUNTIMES = ('keras', 'saved_model', 'tflite', 'numpy')
+
+# 'auto' 선택 시 파라미터 수가 이 값 이하인 모델은 NumPy 로 실행 (TensorFlow 로드 비용이 더 큼)
+NUMPY_MAX_PARAMS = 50000
+
+
+# ===============================
+# 런타임
+# ===============================
+class KerasRuntime:
+    def __init__(self, model_path):
+        import tensorflow as tf
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+        self.input_shape = tuple(self.model.input_shape[1:])
+
+    def predict(self, x):
+        return np.asarray(self.model.predict_on_batch(x))[:, 0]
+
+
+class SavedModelRuntime:
+    def __init__(self, saved_model_dir):
+        import tensorflow as tf
+        self.tf = tf
+        self.loaded = tf.saved_model.load(saved_model_dir)
+        self.fn = self.loaded.signatures["serving_default"]
+        spec = self.fn.structured_input_signature[1]["x"]
+        self.input_shape = tuple(spec.shape[1:])
+
+    def predict(self, x):
+        return self.fn(x=self.tf.constant(x, dtype=self.tf.float32))["probability"].numpy()[:, 0]
+
+
+class TFLiteRuntime:
+    def __init__(self, tflite_path, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter  # TensorFlow 없이 실행 가능한 경량 패키지
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.interpreter = Interpreter(model_path=tflite_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(d) for d in self.input_detail["shape"][1:])
+        self.batch_size = int(self.input_detail["shape"][0])
+
+    def predict(self, x):
+        # 배치 크기가 바뀔 때만 텐서 재할당
+        if len(x) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_detail["index"], (len(x),) + self.input_shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(x)
+        self.interpreter.set_tensor(self.input_detail["index"], np.ascontiguousarray(x, dtype=np.float32))
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_detail["index"])[:, 0].copy()
+
+
+class NumpyRuntime:
+    """numpy_engine 으로 .h5 또는 weights.npz 를 TensorFlow 없이 실행"""
+
+    def __init__(self, path):
+        self.model = load_numpy_model(path)
+        self.input_shape = self.model.input_shape
+
+    def predict(self, x):
+        return self.model.predict(x)
+
+
+# ===============================
+# 런타임 선택
+# ===============================
+def load_runtime(path, kind='auto'):
+    """
+    path: epoch_XX.h5 또는 export.py 의 출력 폴더
+    kind: 'keras' / 'saved_model' / 'tflite' / 'numpy' / 'auto'
+          'auto' 는 작은 모델(NUMPY_MAX_PARAMS 이하)은 NumPy, 그 외에는 .h5 는 Keras, 출력 폴더는 TFLite
+    """
+    is_h5 = path.endswith(".h5")
+    numpy_path = path if is_h5 else os.path.join(path, WEIGHTS_FILE)
+
+    if kind == 'auto':
+        if load_numpy_model(numpy_path).count_params() <= NUMPY_MAX_PARAMS:
+            kind = 'numpy'
+        else:
+            kind = 'keras' if is_h5 else 'tflite'
+
+    if kind == 'keras':
+        return KerasRuntime(path)
+    if kind == 'saved_model':
+        return SavedModelRuntime(os.path.join(path, SAVED_MODEL_DIR))
+    if kind == 'tflite':
+        return TFLiteRuntime(os.path.join(path, TFLITE_FILE))
+    if kind == 'numpy':
+        return NumpyRuntime(numpy_path)
+    raise ValueError(f"⚠ 알 수 없는 런타임: {kind}")
+
+
+# ===============================
+# 벤치마크 (런타임 하나를 새 프로세스에서 측정)
+# ===============================
+def measure_runtime(path, kind, batch_sizes=(1, 32), repeats=50):
+    """
+    시작 시간(모듈 import + 로드 + 첫 추론)과 배치 크기별 추론 지연시간(중앙값, ms) 측정
+    새 프로세스에서 호출해야 시작 시간에 TensorFlow import 비용이 포함됨
+    """
+    start = time.perf_counter()
+    runtime = load_runtime(path, kind)
+    runtime.predict(np.zeros((1,) + runtime.input_shape, dtype=np.float32))
+    startup = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    latency = {}
+    for batch_size in batch_sizes:
+        x = rng.random((batch_size,) + runtime.input_shape, dtype=np.float32)
+        runtime.predict(x)  # 배치 크기 변경에 따른 준비 시간 제외
+        times = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            runtime.predict(x)
+            times.append(time.perf_counter() - t)
+        latency[str(batch_size)] = float(np.median(times) * 1000)
+
+    return {"runtime": kind, "startup_s": startup, "latency_ms": latency}
+
+
+if __name__ == "__main__":
+    # python -m model.runtime <경로> <런타임> → 측정 결과 JSON 한 줄 출력 (export.py 벤치마크에서 사용)
+    print(json.dumps(measure_runtime(sys.argv[1], sys.argv[2])))
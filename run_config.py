@@ -0,0 +1,169 @@
+# run_config.py
+"""
+학습 / 테스트 실행 설정 (변경할 수 없는 객체)
+- 모듈 전역 변수(SELECTED_COLOR 등)를 바꾸는 대신 RunConfig 하나를 train_model / test_model / 데이터 로드 함수에 전달
+- 경로는 color / strategy / dataset_dir 에서 그때그때 계산 → import 시점에 계산된 경로가 남는 문제 없음
+- frozen dataclass 라 여러 설정을 한 프로세스의 스레드에서 동시에 실행해도 서로 영향 없음
+  다른 설정이 필요하면 config.replace(color='gray') 처럼 새 객체를 만들어 사용
+기본값은 train/utils.py, test/utils.py 의 상수
+"""
+
+import os
+import importlib
+from dataclasses import dataclass, replace, asdict
+from typing import Optional
+
+from data_prep.utils import DATASET_DIR, DATASET_TYPES, STRATEGY_KEYS
+from data_prep.label_index import get_split_dirs, get_label_index, label_index_stamp
+from data_prep.packing import load_pack
+from data_prep.split_manifest import get_source_dirs
+from train.utils import IMG_SIZE, BATCH_SIZE, EPOCHS, SEED, CACHE_MODE, CACHE_UINT8, BASE_MODEL_DIR, get_train_model_save_dir
+from test.utils import TEST_BATCH_SIZE, DECODE_WORKERS, PREFETCH_BATCHES
+
+MODEL_ID = 10  # model/model_N.py 의 N (학습에 사용할 CNN 구조)
+VAL_RATIO = 0.2  # train split 중 검증에 사용할 비율
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    color: str = 'color'  # 'color' 또는 'gray'
+    strategy: int = 3  # 1, 2, 또는 3 (crop 방식)
+    model_id: int = MODEL_ID
+    dataset_dir: str = DATASET_DIR
+    model_dir: str = BASE_MODEL_DIR  # 학습 결과 폴더의 기준 (model_dir/color/전략/YYYYMMDD_NN)
+    img_size: tuple = IMG_SIZE  # (width, height)
+    batch_size: int = BATCH_SIZE
+    epochs: int = EPOCHS
+    seed: int = SEED
+    val_ratio: float = VAL_RATIO
+    cache_mode: Optional[str] = CACHE_MODE  # None / 'memory' / 'disk'
+    cache_uint8: bool = CACHE_UINT8
+    use_pack: bool = False  # True 이면 data_prep/packing.py 의 패킹 데이터셋(memmap) 사용
+    split_manifest: Optional[str] = None  # 분할 매니페스트 경로 (주어지면 train/test 폴더 대신 분할 전 폴더 + 매니페스트 사용)
+    test_batch_size: int = TEST_BATCH_SIZE
+    decode_workers: int = DECODE_WORKERS
+    prefetch_batches: int = PREFETCH_BATCHES
+    profile_epochs: Optional[tuple] = None  # (시작, 끝) epoch (1부터, 끝 포함), 주어지면 그 구간을 tf.profiler 로 트레이스
+
+    def __post_init__(self):
+        if self.color not in ('color', 'gray'):
+            raise ValueError(f"⚠ color 는 'color' 또는 'gray': {self.color}")
+        if self.strategy not in STRATEGY_KEYS:
+            raise ValueError(f"⚠ 알 수 없는 전략 번호: {self.strategy}")
+        if self.cache_mode not in (None, 'memory', 'disk'):
+            raise ValueError(f"⚠ 알 수 없는 캐시 모드: {self.cache_mode}")
+        if self.use_pack and self.split_manifest is not None:
+            raise ValueError(
+                "⚠ 패킹 데이터셋은 만들 때 분할이 정해지므로 split_manifest 와 함께 사용할 수 없습니다 "
+                "(python -m data_prep.packing <매니페스트> 로 패킹한 뒤 use_pack 만 사용)"
+            )
+        if self.profile_epochs is not None:
+            start, end = self.profile_epochs
+            if not 1 <= start <= end <= self.epochs:
+                raise ValueError(f"⚠ profile_epochs 는 1 ~ epochs 범위의 (시작, 끝): {self.profile_epochs}")
+            object.__setattr__(self, "profile_epochs", (start, end))
+        object.__setattr__(self, "img_size", tuple(self.img_size))
+
+    # ===============================
+    # 파생 값
+    # ===============================
+    @property
+    def channels(self):
+        return 1 if self.color == 'gray' else 3
+
+    @property
+    def input_shape(self):
+        """모델 입력 (H, W, C)"""
+        return (self.img_size[1], self.img_size[0], self.channels)
+
+    @property
+    def dataset_type(self):
+        """예: '3. aspect_aware_crop'"""
+        return DATASET_TYPES[STRATEGY_KEYS[self.strategy]]
+
+    @property
+    def name(self):
+        """예: 'color_3' (캐시 / 로그 이름)"""
+        return f"{self.color}_{self.strategy}"
+
+    @property
+    def preprocessed_dir(self):
+        return os.path.join(self.dataset_dir, "preprocessed")
+
+    @property
+    def packed_dir(self):
+        return os.path.join(self.dataset_dir, "packed")
+
+    @property
+    def label_index_dir(self):
+        return os.path.join(self.dataset_dir, "index")
+
+    @property
+    def val_split_path(self):
+        """train / val 그룹 배정 저장 파일 (data_prep/grouped_split.py)"""
+        return os.path.join(self.label_index_dir, f"{self.name}_val_groups.json")
+
+    @property
+    def cache_dir(self):
+        return os.path.join(self.dataset_dir, "cache")
+
+    @property
+    def manifest_dir(self):
+        """데이터 준비 매니페스트 폴더 (라벨 인덱스 캐시 키에 사용)"""
+        return os.path.join(self.dataset_dir, "manifest")
+
+    @property
+    def dimension_index_path(self):
+        """이미지 크기 캐시 (data_prep/image_size.py), 데이터셋 폴더마다 따로 저장"""
+        return os.path.join(self.manifest_dir, "dimensions.json")
+
+    # ===============================
+    # 데이터 / 모델
+    # ===============================
+    def split_dirs(self, split):
+        """(images 폴더, labels 폴더) (split_manifest 를 쓰면 분할 전 폴더)"""
+        if self.split_manifest is not None:
+            return get_source_dirs(self.color, self.strategy, self.preprocessed_dir)
+        return get_split_dirs(self.color, self.strategy, split, self.preprocessed_dir)
+
+    def label_index(self, split, force=False, verify=False):
+        """(이미지 경로 리스트, helmet 여부 리스트) / verify: 라벨 파일 단위까지 캐시 유효성 확인"""
+        return get_label_index(
+            self.color, self.strategy, split, force, self.preprocessed_dir, self.label_index_dir, self.split_manifest,
+            self.manifest_dir, self.dimension_index_path, verify
+        )
+
+    def label_index_stamp(self, split):
+        """라벨 인덱스 캐시 키 해시 (이미지/라벨이 다시 만들어지면 바뀜, 파일 단위 stat 없음)"""
+        return label_index_stamp(
+            self.color, self.strategy, split, self.preprocessed_dir, self.split_manifest,
+            self.manifest_dir, self.dimension_index_path
+        )
+
+    def load_pack(self, split):
+        """(images memmap, labels, names)"""
+        return load_pack(self.color, self.strategy, split, self.packed_dir)
+
+    def build_model(self):
+        """
+        model/model_{model_id}.py 의 main_cnn 으로 모델 생성
+        모델 입력 크기가 img_size 와 다르면 ValueError (main_cnn 은 TARGET_SIZE 로 입력을 고정)
+        """
+        model = importlib.import_module(f"model.model_{self.model_id}").main_cnn(self.color)
+        model_shape = tuple(model.input_shape[1:])
+        if model_shape != self.input_shape:
+            raise ValueError(
+                f"⚠ model_{self.model_id} 입력 {model_shape} 이 설정 (H, W, C) {self.input_shape} 와 다릅니다 "
+                f"(img_size={self.img_size})"
+            )
+        return model
+
+    def new_model_save_dir(self):
+        """model_dir/color/전략/YYYYMMDD_NN 학습 결과 폴더를 새로 만들어 반환"""
+        return get_train_model_save_dir(self.color, self.strategy, self.model_dir)
+
+    def replace(self, **changes):
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return asdict(self)
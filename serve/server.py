@@ -0,0 +1,304 @@
+# server.py
+"""
+헬멧 착용 분류 추론 서버 (localhost HTTP)
+- 모델(epoch_XX.h5)은 시작할 때 한 번만 로드하고 워밍업 → 요청마다 로드 없음
+- POST /predict
+    원본 프레임 + YOLO bbox : {"image": base64 JPEG/PNG, "boxes": ["cls cx cy w h", ...] 또는 [[cls, cx, cy, w, h], ...]}
+    crop 된 이미지          : {"crops": [base64 JPEG/PNG, ...]}
+  응답: {"probabilities": [...], "helmet": [...]} (입력 순서, crop 할 수 없는 bbox 는 null)
+- GET /health, GET /stats (최근 요청 지연시간 p50 / p99, 평균 배치 크기)
+- 동시에 들어온 요청의 crop 은 MicroBatcher 가 하나의 배치로 묶어 추론
+  (MAX_BATCH_SIZE 가 차거나 첫 요청 후 MAX_WAIT_MS 가 지나면 실행)
+"""
+
+import json
+import time
+import base64
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import cv2
+
+from data_prep.utils import LABEL_DTYPE, STRATEGY_KEYS, get_bbox_pixel_coords_array
+from data_prep.pipeline import CROP_FUNCS
+from data_prep.model_input import get_channels, from_bgr, preprocess_batch_numpy
+from serve.utils import (
+    SERVE_MODEL_PATH, SERVE_COLOR, SERVE_STRATEGY,
+    SERVE_HOST, SERVE_PORT, IMG_SIZE,
+    MAX_BATCH_SIZE, MAX_WAIT_MS, REQUEST_TIMEOUT,
+    LATENCY_WINDOW, HELMET_THRESHOLD
+)
+
+
+# ===============================
+# 마이크로 배치
+# ===============================
+class MicroBatcher:
+    """
+    여러 스레드에서 submit 한 입력을 모아 predict_fn 한 번으로 추론
+    predict_fn: (N, H, W, C) float32 → (N,) 헬멧 확률
+    """
+
+    def __init__(self, predict_fn, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.n_batches = 0
+        self.n_samples = 0
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, x):
+        """x: (n, H, W, C) float32 → n 개 확률을 결과로 받는 Future"""
+        future = Future()
+        if len(x) == 0:
+            future.set_result(np.empty(0, dtype=np.float32))
+        else:
+            self.queue.put((x, future))
+        return future
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _collect(self, first):
+        """첫 요청 이후 max_wait 동안 max_batch_size 까지 요청을 모음, 종료 신호를 받으면 stop=True"""
+        items, n = [first], len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while n < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return items, True
+            items.append(item)
+            n += len(item[0])
+        return items, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self.queue.get()
+            if first is None:
+                break
+            items, stop = self._collect(first)
+
+            x = np.concatenate([x for x, _ in items]) if len(items) > 1 else items[0][0]
+            try:
+                # 요청 하나가 max_batch_size 보다 크면 나눠서 추론
+                probs = np.concatenate([
+                    self.predict_fn(x[start:start + self.max_batch_size])
+                    for start in range(0, len(x), self.max_batch_size)
+                ])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for item_x, future in items:
+                future.set_result(probs[start:start + len(item_x)])
+                start += len(item_x)
+
+            with self.lock:
+                self.n_batches += 1
+                self.n_samples += len(x)
+
+
+# ===============================
+# 모델 로드
+# ===============================
+def load_predict_fn(model_path, color, max_batch_size=MAX_BATCH_SIZE):
+    """
+    .h5 모델 로드 → 고정 입력 시그니처의 tf.function 으로 감싼 predict_fn 반환
+    (Keras predict 의 배치마다 드는 준비 비용 없음, 배치 크기가 달라도 다시 trace 하지 않음)
+    """
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(model_path, compile=False)
+    w, h = IMG_SIZE
+    signature = tf.TensorSpec((None, h, w, get_channels(color)), tf.float32)
+    infer = tf.function(lambda x: model(x, training=False), input_signature=[signature])
+
+    def predict_fn(x):
+        return infer(x).numpy()[:, 0]
+
+    # 워밍업: 첫 요청에서 그래프 생성 / 메모리 할당이 일어나지 않도록
+    for n in (1, max_batch_size):
+        predict_fn(np.zeros((n, h, w, get_channels(color)), dtype=np.float32))
+    return predict_fn
+
+
+# ===============================
+# 요청 처리
+# ===============================
+def decode_base64_image(data):
+    """base64 JPEG/PNG → BGR 이미지"""
+    buf = np.frombuffer(base64.b64decode(data), dtype=np.uint8)
+    img = cv2.imdecode(buf, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("이미지 디코딩 실패")
+    return img
+
+
+def parse_boxes(boxes):
+    """YOLO bbox 목록 (문자열 줄 또는 [cls, cx, cy, w, h]) → LABEL_DTYPE 배열"""
+    labels = np.zeros(len(boxes), dtype=LABEL_DTYPE)
+    for i, box in enumerate(boxes):
+        nums = box.split() if isinstance(box, str) else box
+        if len(nums) < 5:
+            raise ValueError(f"bbox 값 부족: {box}")
+        labels['cls'][i] = int(float(nums[0]))
+        labels['cx'][i], labels['cy'][i], labels['w'][i], labels['h'][i] = map(float, nums[1:5])
+    return labels
+
+
+def crop_boxes(img, labels, strategy):
+    """
+    원본 프레임(BGR)에서 bbox 마다 전처리 방식대로 crop (TARGET_SIZE, BGR)
+    반환: crop 리스트 (크기가 0 인 bbox 는 None)
+    """
+    crop_func = CROP_FUNCS[STRATEGY_KEYS[strategy]]
+    h, w = img.shape[:2]
+    crops = []
+    for x_min, y_min, x_max, y_max in get_bbox_pixel_coords_array(labels, w, h).tolist():
+        if x_max <= x_min or y_max <= y_min:
+            crops.append(None)
+            continue
+        crops.append(crop_func(img, x_min, y_min, x_max, y_max))
+    return crops
+
+
+class InferenceService:
+    """요청 JSON → crop → 마이크로 배치 추론 → 응답 JSON, 최근 지연시간 통계 유지"""
+
+    def __init__(self, batcher, color=SERVE_COLOR, strategy=SERVE_STRATEGY, timeout=REQUEST_TIMEOUT):
+        self.batcher = batcher
+        self.color = color
+        self.strategy = strategy
+        self.timeout = timeout
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.lock = threading.Lock()
+
+    def predict(self, payload):
+        start = time.perf_counter()
+
+        if "crops" in payload:
+            crops = [decode_base64_image(c) for c in payload["crops"]]
+        elif "image" in payload:
+            img = decode_base64_image(payload["image"])
+            crops = crop_boxes(img, parse_boxes(payload.get("boxes", [])), self.strategy)
+        else:
+            raise ValueError("'image' + 'boxes' 또는 'crops' 필요")
+
+        valid = [i for i, c in enumerate(crops) if c is not None]
+        probs = [None] * len(crops)
+        if valid:
+            x = preprocess_batch_numpy([from_bgr(crops[i], self.color) for i in valid], IMG_SIZE)
+            result = self.batcher.submit(x).result(timeout=self.timeout)
+            for i, p in zip(valid, result.tolist()):
+                probs[i] = p
+
+        with self.lock:
+            self.latencies.append(time.perf_counter() - start)
+
+        return {
+            "probabilities": probs,
+            "helmet": [None if p is None else p > HELMET_THRESHOLD for p in probs],
+        }
+
+    def stats(self):
+        with self.lock:
+            latencies = np.array(self.latencies) * 1000
+        with self.batcher.lock:
+            n_batches, n_samples = self.batcher.n_batches, self.batcher.n_samples
+        stats = {
+            "requests": len(latencies),
+            "batches": n_batches,
+            "mean_batch_size": n_samples / n_batches if n_batches else 0.0,
+        }
+        if len(latencies):
+            stats["latency_ms"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p99": float(np.percentile(latencies, 99)),
+                "max": float(latencies.max()),
+            }
+        return stats
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive (요청마다 연결을 새로 만들지 않음)
+
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self.send_json(200, self.server.service.stats())
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            self.send_json(200, self.server.service.predict(payload))
+        except (ValueError, KeyError, TypeError) as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        # 요청마다 stderr 로그를 남기지 않음 (지연시간 증가 방지)
+        pass
+
+
+def run_server(model_path=SERVE_MODEL_PATH, color=SERVE_COLOR, strategy=SERVE_STRATEGY,
+               host=SERVE_HOST, port=SERVE_PORT,
+               max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+    """
+    model_path    : 학습된 모델 경로 (epoch_XX.h5)
+    color         : 모델 학습에 사용한 'color' / 'gray'
+    strategy      : 원본 프레임 + bbox 요청에 적용할 crop 방식 (1, 2, 3)
+    max_batch_size: 한 번에 추론할 최대 crop 수
+    max_wait_ms   : 배치를 채우기 위해 기다리는 최대 시간 (ms)
+    """
+    print(f"모델 로드: {model_path}")
+    predict_fn = load_predict_fn(model_path, color, max_batch_size)
+    batcher = MicroBatcher(predict_fn, max_batch_size, max_wait_ms)
+
+    server = ThreadingHTTPServer((host, port), InferenceHandler)
+    server.service = InferenceService(batcher, color, strategy)
+    print(f"✅ 추론 서버 시작: http://{host}:{port} ({color}, 전략 {strategy}, 배치 {max_batch_size}, 대기 {max_wait_ms}ms)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        print("추론 서버 종료")
+
+
+if __name__ == "__main__":
+    run_server()
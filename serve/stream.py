@@ -0,0 +1,394 @@
+# stream.py
+"""
+동영상 파일 / 로컬 스트림(카메라 번호, rtsp:// 등 cv2.VideoCapture 가 여는 주소) 헬멧 착용 분류
+- 프레임별 YOLO bbox 는 사이드카(프레임별 라벨 폴더 또는 'frame cls cx cy w h' 텍스트 파일) 또는 콜백으로 받음
+- 단계마다 스레드 하나 + 크기 제한 큐 (뒤 단계가 밀리면 앞 단계가 기다림 → 메모리 사용량 일정)
+    디코딩(cv2.VideoCapture) → crop(preprocessing.py 전략 함수, server.crop_boxes) → 추론(server.MicroBatcher)
+  crop 단계는 추론 결과를 기다리지 않고 다음 프레임으로 넘어가므로 여러 프레임의 crop 이 한 배치로 묶임
+- 결과는 프레임 순서대로 {"frame", "boxes", "probabilities", "helmet"} (crop 할 수 없는 bbox 는 None)
+- 라이브 스트림은 drop_frames=True 로 추론이 밀릴 때 오래된 프레임을 버림 (지연 누적 방지)
+- 오프라인 확인: check_stream 이 같은 영상을 파이프라인 없이 프레임마다 처리한 결과와 비교
+실행: python -m serve.stream <동영상 경로 | 카메라 번호 | 스트림 주소> <사이드카 경로> [--check]
+      python -m serve.stream --self-check  (합성 동영상 + 사이드카로 확인, 모델 / 데이터셋 불필요)
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import shutil
+import tempfile
+import threading
+import numpy as np
+import cv2
+
+from data_prep.model_input import from_bgr, preprocess_batch_numpy
+from serve.server import MicroBatcher, load_predict_fn, parse_boxes, crop_boxes
+from serve.utils import (
+    SERVE_MODEL_PATH, SERVE_COLOR, SERVE_STRATEGY, IMG_SIZE,
+    REQUEST_TIMEOUT, HELMET_THRESHOLD,
+    STREAM_BATCH_SIZE, STREAM_MAX_WAIT_MS, FRAME_QUEUE_SIZE, MAX_PENDING_FRAMES, STREAM_RESULTS_DIR
+)
+
+SIDECAR_FRAME_PATTERN = re.compile(r'(\d+)\.txt$')  # 프레임별 라벨 파일 이름 끝 숫자 = 프레임 번호
+STREAM_ATOL = 1e-4  # check_stream: 배치 추론과 프레임별 추론의 확률 허용 오차
+
+# --self-check 합성 동영상
+SYNTH_FRAMES = 60
+SYNTH_SIZE = (320, 240)  # (width, height)
+SYNTH_FPS = 15
+
+END = object()  # 스트림 끝 표시 (큐 사이 전달)
+
+
+# ===============================
+# 입력: 영상 소스 / 프레임별 bbox
+# ===============================
+def open_capture(source):
+    """동영상 경로 / 카메라 번호('0') / 스트림 주소 → cv2.VideoCapture"""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"⚠ 영상 소스를 열 수 없습니다: {source}")
+    return capture
+
+
+def load_sidecar_boxes(path):
+    """
+    사이드카 bbox → {프레임 번호(0부터): [YOLO 줄 'cls cx cy w h', ...]}
+    폴더: 프레임별 YOLO 라벨 파일 (파일 이름 끝 숫자 = 프레임 번호, 예: video_12.txt, 000012.txt)
+    파일: 한 줄에 'frame cls cx cy w h'
+    """
+    boxes = {}
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            match = SIDECAR_FRAME_PATTERN.search(name)
+            if match is None:
+                continue
+            with open(os.path.join(path, name), "r", encoding="utf-8") as f:
+                boxes[int(match.group(1))] = [line.strip() for line in f if line.strip()]
+        return boxes
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 6:
+                continue
+            boxes.setdefault(int(parts[0]), []).append(" ".join(parts[1:6]))
+    return boxes
+
+
+def sidecar_box_source(path):
+    """사이드카 → box_source 콜백: (프레임 번호, 프레임) → YOLO bbox 목록"""
+    boxes = load_sidecar_boxes(path)
+    return lambda frame_idx, frame: boxes.get(frame_idx, [])
+
+
+def prepare_frame(frame, boxes, color, strategy):
+    """
+    프레임(BGR) + YOLO bbox 목록 → crop → 모델 입력
+    반환: (bbox 수, crop 한 bbox 인덱스, (n, H, W, C) float32)
+    """
+    crops = crop_boxes(frame, parse_boxes(boxes), strategy) if boxes else []
+    valid = [i for i, c in enumerate(crops) if c is not None]
+    if not valid:
+        return len(crops), valid, np.empty(0, dtype=np.float32)
+    return len(crops), valid, preprocess_batch_numpy([from_bgr(crops[i], color) for i in valid], IMG_SIZE)
+
+
+def frame_result(frame_idx, boxes, n_boxes, valid, probs):
+    """bbox 순서의 결과 (crop 할 수 없는 bbox 는 None)"""
+    box_probs = [None] * n_boxes
+    for i, p in zip(valid, probs):
+        box_probs[i] = p
+    return {
+        "frame": frame_idx,
+        "boxes": [box if isinstance(box, str) else list(box) for box in boxes],
+        "probabilities": box_probs,
+        "helmet": [None if p is None else p > HELMET_THRESHOLD for p in box_probs],
+    }
+
+
+# ===============================
+# 스트리밍 파이프라인
+# ===============================
+class StreamPipeline:
+    """
+    source    : 동영상 경로 / 카메라 번호 / 스트림 주소
+    box_source: (프레임 번호, 프레임) → 그 프레임의 YOLO bbox 목록 (문자열 줄 또는 [cls, cx, cy, w, h])
+    predict_fn: (N, H, W, C) float32 → (N,) 헬멧 확률 (server.load_predict_fn)
+    사용 예:
+        with StreamPipeline("cam.mp4", sidecar_box_source("cam_labels"), predict_fn) as stream:
+            for result in stream:
+                ...
+    """
+
+    def __init__(self, source, box_source, predict_fn, color=SERVE_COLOR, strategy=SERVE_STRATEGY,
+                 batch_size=STREAM_BATCH_SIZE, max_wait_ms=STREAM_MAX_WAIT_MS,
+                 frame_queue_size=FRAME_QUEUE_SIZE, max_pending_frames=MAX_PENDING_FRAMES, drop_frames=False):
+        self.capture = open_capture(source)
+        self.box_source = box_source
+        self.color = color
+        self.strategy = strategy
+        self.drop_frames = drop_frames
+        self.batcher = MicroBatcher(predict_fn, batch_size, max_wait_ms)
+        self.frames = queue.Queue(maxsize=max(1, frame_queue_size))
+        self.pending = queue.Queue(maxsize=max(1, max_pending_frames))
+        self.stop_event = threading.Event()
+        self.errors = []
+        self.lock = threading.Lock()
+        self.counts = {"frames": 0, "dropped": 0, "crops": 0}
+        self.threads = [
+            threading.Thread(target=self._decode, name="stream-decode", daemon=True),
+            threading.Thread(target=self._crop, name="stream-crop", daemon=True),
+        ]
+        self.start_time = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def close(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            if thread.ident is not None:  # start 전이면 join 하지 않음
+                thread.join()
+        self.batcher.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self):
+        """프레임 순서대로 결과 반환 (단계 스레드에서 난 오류는 여기서 다시 발생)"""
+        while True:
+            item = self._get(self.pending)
+            if item is END:
+                break
+            frame_idx, boxes, n_boxes, valid, future = item
+            probs = future.result(timeout=REQUEST_TIMEOUT).tolist()
+            yield frame_result(frame_idx, boxes, n_boxes, valid, probs)
+        if self.errors:
+            raise self.errors[0]
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        with self.lock:
+            counts = dict(self.counts)
+        with self.batcher.lock:
+            n_batches, n_samples = self.batcher.n_batches, self.batcher.n_samples
+        return {
+            **counts,
+            "batches": n_batches,
+            "mean_batch_size": n_samples / n_batches if n_batches else 0.0,
+            "elapsed_s": elapsed,
+            "fps": counts["frames"] / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _put(self, q, item):
+        """q 가 가득 차면 자리가 날 때까지 대기 (backpressure), 중단되면 False"""
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        """q 에서 꺼내기, 중단되면 END"""
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return END
+
+    def _put_latest(self, q, item):
+        """q 가 가득 차면 가장 오래된 프레임을 버리고 넣기 (라이브 스트림용)"""
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    with self.lock:
+                        self.counts["dropped"] += 1
+                except queue.Empty:
+                    pass
+
+    def _decode(self):
+        try:
+            frame_idx = 0
+            while not self.stop_event.is_set():
+                ok, frame = self.capture.read()
+                if not ok:
+                    break
+                with self.lock:
+                    self.counts["frames"] += 1
+                if self.drop_frames:
+                    self._put_latest(self.frames, (frame_idx, frame))
+                elif not self._put(self.frames, (frame_idx, frame)):
+                    break
+                frame_idx += 1
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self.capture.release()
+            self._put(self.frames, END)
+
+    def _crop(self):
+        try:
+            while True:
+                item = self._get(self.frames)
+                if item is END:
+                    break
+                frame_idx, frame = item
+                boxes = list(self.box_source(frame_idx, frame))
+                n_boxes, valid, x = prepare_frame(frame, boxes, self.color, self.strategy)
+                with self.lock:
+                    self.counts["crops"] += len(valid)
+                # 결과를 기다리지 않고 다음 프레임으로 → 여러 프레임의 crop 이 MicroBatcher 에서 한 배치로 묶임
+                future = self.batcher.submit(x)
+                if not self._put(self.pending, (frame_idx, boxes, n_boxes, valid, future)):
+                    break
+        except Exception as e:
+            self.errors.append(e)
+        finally:
+            self._put(self.pending, END)
+
+
+# ===============================
+# 실행 / 확인
+# ===============================
+def classify_frames_sequential(source, box_source, predict_fn, color=SERVE_COLOR, strategy=SERVE_STRATEGY):
+    """파이프라인 없이 프레임마다 순서대로 crop → 추론 (check_stream 기준값)"""
+    capture = open_capture(source)
+    results = []
+    try:
+        frame_idx = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            boxes = list(box_source(frame_idx, frame))
+            n_boxes, valid, x = prepare_frame(frame, boxes, color, strategy)
+            probs = predict_fn(x).tolist() if valid else []
+            results.append(frame_result(frame_idx, boxes, n_boxes, valid, probs))
+            frame_idx += 1
+    finally:
+        capture.release()
+    return results
+
+
+def check_stream(source, box_source, predict_fn, color=SERVE_COLOR, strategy=SERVE_STRATEGY, atol=STREAM_ATOL,
+                 **pipeline_kwargs):
+    """
+    StreamPipeline 결과가 프레임별 순차 처리 결과와 같은지 확인 (프레임 순서, bbox 수, 확률 atol 이내)
+    반환: (프레임 수, 최대 오차) / 다르면 AssertionError
+    """
+    expected = classify_frames_sequential(source, box_source, predict_fn, color, strategy)
+    with StreamPipeline(source, box_source, predict_fn, color, strategy, **pipeline_kwargs) as stream:
+        actual = list(stream)
+        stats = stream.stats()
+
+    assert len(actual) == len(expected), f"프레임 수 불일치: 스트림 {len(actual)}, 순차 {len(expected)}"
+    max_diff = 0.0
+    for a, e in zip(actual, expected):
+        assert a["frame"] == e["frame"], f"프레임 순서 불일치: {a['frame']} != {e['frame']}"
+        assert len(a["probabilities"]) == len(e["probabilities"]), f"[frame {a['frame']}] bbox 수 불일치"
+        for pa, pe in zip(a["probabilities"], e["probabilities"]):
+            assert (pa is None) == (pe is None), f"[frame {a['frame']}] crop 여부 불일치"
+            if pa is not None:
+                max_diff = max(max_diff, abs(pa - pe))
+    print(f"프레임 {len(actual)}개, crop {stats['crops']}개, 평균 배치 {stats['mean_batch_size']:.1f}, "
+          f"최대 오차 {max_diff:.2e}")
+    assert max_diff <= atol, f"스트림 / 순차 추론 결과 불일치 (최대 오차 {max_diff:.2e})"
+    return len(actual), max_diff
+
+
+def run_stream(source, sidecar_path, model_path=SERVE_MODEL_PATH, color=SERVE_COLOR, strategy=SERVE_STRATEGY,
+               output_path=None, drop_frames=False):
+    """
+    영상 소스 + 사이드카 bbox → 프레임별 결과 JSONL 저장
+    output_path: 결과 파일 (기본: STREAM_RESULTS_DIR/<영상 이름>.jsonl)
+    반환: 처리 통계 (프레임 수, 버린 프레임 수, crop 수, 평균 배치 크기, fps)
+    """
+    if output_path is None:
+        stem = os.path.splitext(os.path.basename(str(source).rstrip("/")))[0] or "stream"
+        output_path = os.path.join(STREAM_RESULTS_DIR, f"{stem}.jsonl")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    print(f"모델 로드: {model_path}")
+    predict_fn = load_predict_fn(model_path, color, STREAM_BATCH_SIZE)
+    box_source = sidecar_box_source(sidecar_path)
+
+    with StreamPipeline(source, box_source, predict_fn, color, strategy, drop_frames=drop_frames) as stream, \
+            open(output_path, "w", encoding="utf-8") as f:
+        for result in stream:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        stats = stream.stats()
+
+    print(f"✅ 스트림 처리 완료: 프레임 {stats['frames']}개 (버림 {stats['dropped']}), crop {stats['crops']}개, "
+          f"평균 배치 {stats['mean_batch_size']:.1f}, {stats['fps']:.1f} fps → {output_path}")
+    return stats
+
+
+def mean_intensity_predict_fn(x):
+    """모델 없이 파이프라인만 확인할 때 쓰는 결정적 predict_fn (crop 평균 밝기)"""
+    return x.reshape(len(x), -1).mean(axis=1)
+
+
+def write_synthetic_stream(out_dir, n_frames=SYNTH_FRAMES, size=SYNTH_SIZE, fps=SYNTH_FPS):
+    """
+    움직이는 사각형 동영상(MJPG .avi) + 'frame cls cx cy w h' 사이드카 생성 (오프라인 확인용)
+    반환: (동영상 경로, 사이드카 경로)
+    """
+    w, h = size
+    video_path = os.path.join(out_dir, "synthetic.avi")
+    sidecar_path = os.path.join(out_dir, "synthetic_boxes.txt")
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (w, h))
+    rng = np.random.default_rng(0)
+    with open(sidecar_path, "w", encoding="utf-8") as f:
+        for frame_idx in range(n_frames):
+            frame = np.full((h, w, 3), 40, dtype=np.uint8)
+            # 프레임마다 bbox 0~3개 (bbox 없는 프레임도 포함)
+            for k in range(frame_idx % 4):
+                bw, bh = int(rng.integers(20, 80)), int(rng.integers(30, 100))
+                x0 = (frame_idx * 5 + k * 90) % (w - bw)
+                y0 = int(rng.integers(0, h - bh))
+                color = tuple(int(c) for c in rng.integers(60, 255, size=3))
+                cv2.rectangle(frame, (x0, y0), (x0 + bw, y0 + bh), color, -1)
+                f.write(f"{frame_idx} {k % 2} {(x0 + bw / 2) / w:.6f} {(y0 + bh / 2) / h:.6f} {bw / w:.6f} {bh / h:.6f}\n")
+            writer.write(frame)
+    writer.release()
+    return video_path, sidecar_path
+
+
+if __name__ == "__main__":
+    # python -m serve.stream <source> <sidecar> [--check]
+    # python -m serve.stream --self-check
+    if sys.argv[1:2] == ["--self-check"]:
+        tmp_dir = tempfile.mkdtemp(prefix="stream_check_")
+        try:
+            video_path, sidecar_path = write_synthetic_stream(tmp_dir)
+            for strategy in (1, 2, 3):
+                check_stream(video_path, sidecar_box_source(sidecar_path), mean_intensity_predict_fn,
+                             strategy=strategy, frame_queue_size=2, max_pending_frames=4)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        print("✅ 스트림 파이프라인 결과 일치")
+    elif "--check" in sys.argv[3:]:
+        predict_fn = load_predict_fn(SERVE_MODEL_PATH, SERVE_COLOR, STREAM_BATCH_SIZE)
+        check_stream(sys.argv[1], sidecar_box_source(sys.argv[2]), predict_fn)
+        print("✅ 스트림 파이프라인 결과 일치")
+    else:
+        run_stream(sys.argv[1], sys.argv[2])
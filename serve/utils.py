@@ -0,0 +1,43 @@
+import os
+
+from data_prep.utils import TARGET_SIZE, DATASET_TYPES, STRATEGY_KEYS
+
+# ===============================
+# 서빙 모델 선택
+# ===============================
+SERVE_COLOR = 'color'  # 'color' 또는 'gray' 선택 (모델 학습에 사용한 데이터와 같아야 함)
+SERVE_STRATEGY = 3  # 1, 2, 또는 3 선택 (원본 프레임 + bbox 요청에 적용할 crop 방식)
+SERVE_MODEL_DATE = '20251204_08'
+SERVE_MODEL_NUM = 9
+
+BASE_MODEL_DIR = "./model"
+
+SERVE_MODEL_PATH = os.path.join(
+    BASE_MODEL_DIR,
+    SERVE_COLOR,
+    DATASET_TYPES[STRATEGY_KEYS[SERVE_STRATEGY]],
+    SERVE_MODEL_DATE,
+    f"epoch_{SERVE_MODEL_NUM:02d}.h5"
+)
+
+# ===============================
+# 서버 / 마이크로 배치 설정
+# ===============================
+SERVE_HOST = "127.0.0.1"
+SERVE_PORT = 8000
+
+IMG_SIZE = TARGET_SIZE
+MAX_BATCH_SIZE = 32     # 한 번에 추론할 최대 crop 수
+MAX_WAIT_MS = 5         # 첫 요청이 들어온 뒤 배치를 채우기 위해 기다리는 최대 시간 (ms)
+REQUEST_TIMEOUT = 5.0   # 요청 하나가 추론 결과를 기다리는 최대 시간 (초)
+LATENCY_WINDOW = 1000   # /stats 지연시간 통계에 사용할 최근 요청 수
+HELMET_THRESHOLD = 0.5  # 이 값보다 크면 헬멧 착용
+
+# ===============================
+# 스트리밍 (serve/stream.py) 설정
+# ===============================
+STREAM_BATCH_SIZE = 64    # 여러 프레임의 crop 을 묶어 한 번에 추론할 최대 crop 수
+STREAM_MAX_WAIT_MS = 20   # 첫 crop 이 들어온 뒤 배치를 채우기 위해 기다리는 최대 시간 (ms)
+FRAME_QUEUE_SIZE = 8      # 디코딩 → crop 사이 대기 프레임 수 (가득 차면 디코딩이 기다림)
+MAX_PENDING_FRAMES = 32   # crop 이후 추론 결과를 기다리는 프레임 수 상한 (가득 차면 crop 이 기다림)
+STREAM_RESULTS_DIR = "./results/stream"  # 프레임별 결과 JSONL 저장 폴더
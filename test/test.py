@@ -1,87 +1,113 @@
 import os
+import re
+import csv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-import cv2
-import tensorflow as tf
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, confusion_matrix
-import matplotlib.pyplot as plt
-from test.utils import SELECTED_COLOR, IMG_SIZE, TEST_IMAGE_DIR, TEST_LABEL_DIR
+from data_prep.packing import iter_pack_batches
+from data_prep.image_size import needs_resize_flags, report_resize_flags
+from data_prep.model_input import decode_numpy, from_bgr, preprocess_batch_numpy
+from instrumentation import Instrumentation
+from test.utils import (
+    IMG_SIZE,
+    TEST_BATCH_SIZE, PREFETCH_BATCHES
+)
+
+TEST_INSTRUMENTATION_FILE = "test_instrumentation_{epoch}.json"  # results_N.txt 옆에 저장하는 단계별 측정 결과
+EVALUATE_INSTRUMENTATION_FILE = "evaluate_instrumentation.json"
+
+# TensorFlow / scikit-learn / matplotlib 은 필요한 함수 안에서만 불러옴
+# (지표 계산만 하거나 모듈을 import 만 할 때 수 초씩 걸리지 않도록)
 
 def preprocess(img, selected_color):
-    img = cv2.resize(img, IMG_SIZE)
-    if selected_color == 'gray':
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        img = np.expand_dims(img, axis=-1)
-    img = img.astype(np.float32) / 255.0
-    img = np.expand_dims(img, axis=0)
-    return img
-
-def test_model(selected_color, selected_strategy, model_path, epoch,
-               results_txt_dir="./", confusion_matrix_dir="./"):
-    """
-    selected_color  : 'gray' or 'color'
-    selected_strategy: 전략 번호 (사용자 참고용)
-    model_path      : 학습된 모델 경로
-    epoch           : 테스트에 사용한 모델 epoch 번호
-    results_txt_dir : 결과 TXT 저장 폴더
-    confusion_matrix_dir : Confusion Matrix 이미지 저장 폴더
     """
-    # 전역변수 설정
-    global SELECTED_COLOR
-    SELECTED_COLOR = selected_color
+    cv2 로 읽은 BGR 이미지 1장 → (1, H, W, C) 입력 텐서
+    전처리는 data_prep/model_input.py 와 공통 (학습과 같은 RGB 순서, 이미 IMG_SIZE 인 crop 은 resize 생략)
+    """
+    return preprocess_batch_numpy([from_bgr(img, selected_color)], IMG_SIZE)
 
-    os.makedirs(results_txt_dir, exist_ok=True)
-    os.makedirs(confusion_matrix_dir, exist_ok=True)
+def load_test_sample(img_path, gt_label, selected_color, img_size=IMG_SIZE):
+    """
+    테스트 이미지 1장 디코딩 + 전처리
+    gt_label: 라벨 인덱스의 정답 라벨 (helmet 여부)
+    img_size: 모델 입력 크기 (width, height)
+    반환: (입력 텐서 (H, W, C), 정답 라벨) / 이미지를 읽을 수 없으면 None
+    """
+    img = decode_numpy(img_path, selected_color)
+    if img is None:
+        return None
 
-    # 파일 이름에 epoch 정보 추가
-    results_txt_path = os.path.join(results_txt_dir, f"results_{epoch}.txt")
-    confusion_matrix_path = os.path.join(confusion_matrix_dir, f"confusion_matrix_{epoch}.png")
+    return preprocess_batch_numpy([img], img_size)[0], gt_label
 
-    # 모델 로드
-    model = tf.keras.models.load_model(model_path)
+def stream_batches(items, load_fn, batch_size, num_workers, prefetch_batches=PREFETCH_BATCHES):
+    """
+    load_fn 을 워커 스레드에서 병렬 실행하고 결과를 입력 순서대로 batch_size 단위로 묶어 반환
+    - 진행 중인 디코딩 작업은 batch_size * prefetch_batches 개로 제한 (메모리 상한)
+    - load_fn 이 None 을 반환한 항목은 건너뜀
+    yield: (입력 배치 ndarray (N, H, W, C), 라벨 리스트)
+    """
+    max_pending = max(1, batch_size * prefetch_batches)
+    pending = deque()
+    items = iter(items)
+    xs, ys = [], []
 
-    # 테스트 이미지 리스트
-    img_ext = (".jpg", ".jpeg", ".png", ".bmp")
-    file_list = [f for f in os.listdir(TEST_IMAGE_DIR) if f.lower().endswith(img_ext)]
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        def fill():
+            while len(pending) < max_pending:
+                item = next(items, None)
+                if item is None:
+                    return
+                pending.append(executor.submit(load_fn, item))
 
-    y_true, y_pred = [], []
+        fill()
+        while pending:
+            sample = pending.popleft().result()
+            fill()
+            if sample is None:
+                continue
 
-    for file_name in file_list:
-        img_path = os.path.join(TEST_IMAGE_DIR, file_name)
-        img = cv2.imread(img_path)
-        if img is None:
-            continue
+            x, y = sample
+            xs.append(x)
+            ys.append(y)
+            if len(xs) == batch_size:
+                yield np.stack(xs), ys
+                xs, ys = [], []
 
-        label_path = os.path.join(TEST_LABEL_DIR, file_name.replace("image", "label").rsplit(".",1)[0]+".txt")
-        if not os.path.exists(label_path):
-            continue
-        with open(label_path,"r") as f:
-            gt_label = int(f.readline().strip().split()[0])
+        if xs:
+            yield np.stack(xs), ys
 
-        pred_prob = model.predict(preprocess(img, selected_color), verbose=0)[0][0]
-        pred_label = int(pred_prob > 0.5)
+def compute_metrics(y_true, y_pred):
+    """Accuracy / Precision / Recall / F1 계산"""
+    from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
 
-        y_true.append(gt_label)
-        y_pred.append(pred_label)
+    return {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred),
+        "recall": recall_score(y_true, y_pred),
+        "f1": f1_score(y_true, y_pred),
+    }
 
+def save_results(y_true, y_pred, epoch, results_txt_path, confusion_matrix_path):
+    """성능 지표 TXT + Confusion Matrix 이미지 저장"""
     # 성능 평가
-    accuracy  = accuracy_score(y_true, y_pred)
-    precision = precision_score(y_true, y_pred)
-    recall    = recall_score(y_true, y_pred)
-    f1        = f1_score(y_true, y_pred)
+    metrics = compute_metrics(y_true, y_pred)
 
     results_str = (
         f"=== 성능 평가 결과 (Epoch {epoch}) ===\n"
-        f"Accuracy : {accuracy:.4f}\n"
-        f"Precision: {precision:.4f}\n"
-        f"Recall   : {recall:.4f}\n"
-        f"F1-score : {f1:.4f}\n"
+        f"Accuracy : {metrics['accuracy']:.4f}\n"
+        f"Precision: {metrics['precision']:.4f}\n"
+        f"Recall   : {metrics['recall']:.4f}\n"
+        f"F1-score : {metrics['f1']:.4f}\n"
     )
 
     # TXT 저장
     with open(results_txt_path, "w", encoding="utf-8") as f:
         f.write(results_str)
 
-    # Confusion Matrix 이미지 저장
+    # Confusion Matrix 이미지 저장 (matplotlib 은 이때만 불러옴)
+    from sklearn.metrics import confusion_matrix
+    import matplotlib.pyplot as plt
+
     cm = confusion_matrix(y_true, y_pred)
     plt.figure(figsize=(5,4))
     plt.imshow(cm, cmap=plt.cm.Blues)
@@ -98,6 +124,188 @@ def test_model(selected_color, selected_strategy, model_path, epoch,
     plt.savefig(confusion_matrix_path)
     plt.close()
 
+    return results_str
+
+def iter_test_batches(config, inst=None):
+    """
+    config 의 테스트 세트를 (입력 배치, 라벨 리스트) 로 순서대로 반환
+    use_pack=True 이면 패킹 배열을 순차적으로 읽고, 아니면 워커 스레드에서 디코딩
+    inst: Instrumentation (주어지면 읽은 바이트 수를 'bytes_read' 에 기록)
+    """
+    if config.use_pack:
+        # 패킹 배열을 순차적으로 읽어 배치 구성 (디코딩 없음)
+        images, labels, _ = config.load_pack("test")
+        if inst is not None:
+            inst.count("bytes_read", images.nbytes)
+        return iter_pack_batches(images, labels, config.test_batch_size)
+
+    # 테스트 이미지/정답 리스트 (캐시된 라벨 인덱스 사용)
+    img_paths, labels = config.label_index("test")
+    report_resize_flags(needs_resize_flags(img_paths, config.img_size, config.dimension_index_path), "test")
+
+    def load(item):
+        if inst is not None:
+            inst.count("bytes_read", os.path.getsize(item[0]))
+        return load_test_sample(item[0], item[1], config.color, config.img_size)
+
+    # 디코딩은 워커 스레드에서 미리 진행, 추론은 배치 단위로 수행
+    return stream_batches(
+        zip(img_paths, labels),
+        load,
+        config.test_batch_size,
+        config.decode_workers,
+        config.prefetch_batches
+    )
+
+def test_model(config, model_path, epoch, results_txt_dir="./", confusion_matrix_dir="./"):
+    """
+    config          : RunConfig (color / 전략 / 데이터 경로)
+                      test_batch_size - 한 번에 추론할 이미지 수 (1 이면 기존 1장씩 추론과 동일)
+                      decode_workers  - 이미지 디코딩 스레드 수
+                      use_pack        - True 이면 data_prep/packing.py 로 만든 패킹 데이터셋(memmap)에서 읽기 (RGB 순서)
+    model_path      : 학습된 모델 경로
+    epoch           : 테스트에 사용한 모델 epoch 번호
+    results_txt_dir : 결과 TXT 저장 폴더
+    confusion_matrix_dir : Confusion Matrix 이미지 저장 폴더
+    단계별 시간 / 처리량은 results_txt_dir/test_instrumentation_{epoch}.json 에 저장
+    """
+    inst = Instrumentation(f"test {config.name} epoch {epoch}")
+    with inst.timer("import"):
+        import tensorflow as tf
+
+    os.makedirs(results_txt_dir, exist_ok=True)
+    os.makedirs(confusion_matrix_dir, exist_ok=True)
+
+    # 파일 이름에 epoch 정보 추가
+    results_txt_path = os.path.join(results_txt_dir, f"results_{epoch}.txt")
+    confusion_matrix_path = os.path.join(confusion_matrix_dir, f"confusion_matrix_{epoch}.png")
+
+    # 모델 로드
+    with inst.timer("load_model"):
+        model = tf.keras.models.load_model(model_path)
+
+    # input_wait: 다음 배치 디코딩을 기다린 시간 (추론이 입력을 기다리면 커짐)
+    y_true, y_pred = [], []
+    with inst.timer("loop"):
+        for x_batch, label_batch in inst.timed_iter(iter_test_batches(config, inst), "input_wait"):
+            with inst.timer("predict"):
+                pred_prob = model.predict_on_batch(x_batch)[:, 0]
+            inst.count("images", len(label_batch))
+            y_true.extend(label_batch)
+            y_pred.extend((pred_prob > 0.5).astype(int).tolist())
+
+    with inst.timer("save_results"):
+        results_str = save_results(y_true, y_pred, epoch, results_txt_path, confusion_matrix_path)
+
+    inst.set_value("images_per_s", inst.rate("images", "loop"))
+    inst.set_value("predict_images_per_s", inst.rate("images", "predict"))
+    inst.set_value("stall_ratio", inst.seconds("input_wait") / max(inst.seconds("loop"), 1e-9))
+    inst.save(os.path.join(results_txt_dir, TEST_INSTRUMENTATION_FILE.format(epoch=epoch)))
+
     print(results_str)
     print(f"✅ 결과 TXT 저장: {results_txt_path}")
     print(f"✅ Confusion Matrix 이미지 저장: {confusion_matrix_path}")
+
+def load_test_set(config, inst=None):
+    """
+    테스트 세트 전체를 한 번만 디코딩/전처리해 메모리 텐서로 반환
+    config.use_pack=True 이면 패킹 데이터셋에서 디코딩 없이 읽음
+    inst: Instrumentation (주어지면 읽은 바이트 수 기록)
+    반환: (x (N, H, W, C) float32, y (N,) int)
+    """
+    if config.use_pack:
+        images, labels, _ = config.load_pack("test")
+        if len(labels) == 0:
+            raise ValueError("⚠ 패킹 테스트 데이터셋이 비어 있습니다. data_prep/packing.py 실행 확인 필요")
+        if inst is not None:
+            inst.count("bytes_read", images.nbytes)
+        return preprocess_batch_numpy(images, config.img_size), labels.astype(np.int64)
+
+    xs, ys = [], []
+    for x_batch, label_batch in iter_test_batches(config, inst):
+        xs.append(x_batch)
+        ys.extend(label_batch)
+
+    if not xs:
+        raise ValueError("⚠ 테스트 데이터셋이 비어 있습니다. 경로와 파일 확인 필요")
+    return np.concatenate(xs), np.array(ys, dtype=np.int64)
+
+def find_checkpoints(model_dir):
+    """학습 폴더의 epoch_XX.h5 파일을 epoch 순으로 반환: [(epoch, path), ...]"""
+    checkpoints = []
+    for f in os.listdir(model_dir):
+        match = re.fullmatch(r"epoch_(\d+)\.h5", f)
+        if match:
+            checkpoints.append((int(match.group(1)), os.path.join(model_dir, f)))
+    return sorted(checkpoints)
+
+def evaluate_models(model_paths, x, y, batch_size=TEST_BATCH_SIZE, inst=None):
+    """
+    미리 디코딩한 테스트 텐서 (x, y) 하나로 여러 모델을 연속 평가
+    model_paths: {이름: 모델 경로} (epoch 체크포인트, model_N 별 학습 결과 등)
+    inst: Instrumentation (주어지면 모델 로드 / 추론 시간과 추론 이미지 수 기록)
+    반환: [{"name", "accuracy", "precision", "recall", "f1"}, ...]
+    """
+    import tensorflow as tf
+
+    inst = inst or Instrumentation()
+    rows = []
+    for name, model_path in model_paths.items():
+        with inst.timer("load_model"):
+            model = tf.keras.models.load_model(model_path)
+        with inst.timer("predict"):
+            pred_prob = model.predict(x, batch_size=batch_size, verbose=0)[:, 0]
+        inst.count("images", len(x))
+        y_pred = (pred_prob > 0.5).astype(int)
+
+        row = {"name": name}
+        row.update(compute_metrics(y, y_pred))
+        rows.append(row)
+        print(f"  [{name}] Accuracy: {row['accuracy']:.4f}, F1: {row['f1']:.4f}")
+
+        # 모델마다 그래프가 누적되지 않도록 세션 정리
+        del model
+        tf.keras.backend.clear_session()
+    return rows
+
+def format_metrics_table(rows):
+    """평가 결과 행 목록 → 텍스트 표"""
+    lines = [f"{'model':<12} {'Accuracy':>9} {'Precision':>9} {'Recall':>9} {'F1-score':>9}"]
+    lines.append("-" * len(lines[0]))
+    for row in rows:
+        lines.append(
+            f"{str(row['name']):<12} {row['accuracy']:>9.4f} {row['precision']:>9.4f} "
+            f"{row['recall']:>9.4f} {row['f1']:>9.4f}"
+        )
+    return "\n".join(lines) + "\n"
+
+def evaluate_checkpoints(config, model_dir):
+    """
+    학습 폴더의 모든 epoch_XX.h5 를 테스트 세트 한 번 디코딩으로 평가
+    결과는 model_dir/test_metrics.csv 에 epoch 별로 저장 (단계별 시간은 evaluate_instrumentation.json)
+    config: RunConfig (color / 전략 / 테스트 배치 설정)
+    """
+    checkpoints = find_checkpoints(model_dir)
+    if not checkpoints:
+        raise ValueError(f"⚠ 체크포인트가 없습니다: {model_dir}")
+
+    inst = Instrumentation(f"evaluate {config.name}")
+    with inst.timer("load_test_set"):
+        x, y = load_test_set(config, inst)
+    print(f"테스트 세트 로드 완료: {len(y)}장, 체크포인트 {len(checkpoints)}개 평가 시작")
+
+    rows = evaluate_models({epoch: path for epoch, path in checkpoints}, x, y, config.test_batch_size, inst)
+    inst.set_value("decode_images_per_s", len(y) / max(inst.seconds("load_test_set"), 1e-9))
+    inst.set_value("predict_images_per_s", inst.rate("images", "predict"))
+    inst.save(os.path.join(model_dir, EVALUATE_INSTRUMENTATION_FILE))
+
+    csv_path = os.path.join(model_dir, "test_metrics.csv")
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["epoch", "accuracy", "precision", "recall", "f1"])
+        for row in rows:
+            writer.writerow([row["name"], row["accuracy"], row["precision"], row["recall"], row["f1"]])
+
+    print(format_metrics_table(rows))
+    print(f"✅ epoch 별 테스트 결과 CSV 저장: {csv_path}")
+    return rows
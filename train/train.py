@@ -1,101 +1,229 @@
 import os
-import tensorflow as tf
+import hashlib
+import numpy as np
 import csv
-from sklearn.model_selection import train_test_split
-from train.utils import SELECTED_COLOR, SELECTED_STRATEGY, TRAIN_IMAGE_DIR, TRAIN_LABEL_DIR, IMG_SIZE, BATCH_SIZE, EPOCHS, HELMET_CLASS_ID, SEED
-from model.model_10 import main_cnn  # CNN 모델 불러오기
+from data_prep.utils import HELMET_CLASS_ID
+from data_prep.image_size import needs_resize_flags, report_resize_flags
+from data_prep.model_input import load_image_tf, load_image_uint8_tf, preprocess_batch_tf
+from data_prep.grouped_split import stable_split, report_split
+from instrumentation import (Instrumentation, file_bytes, measure_input_rate, measure_compute_rate,
+                             make_epoch_callback, make_timed_checkpoint)
+
+TRAIN_INSTRUMENTATION_FILE = "train_instrumentation.json"  # history.csv 옆에 저장하는 단계별 측정 결과
+INPUT_PROBE_BATCHES = 20  # 학습 전에 입력 파이프라인만 읽어 볼 배치 수 (입력 병목 추정용)
+
+# TensorFlow / 모델 정의는 학습할 때만 불러옴 (import 만으로 수 초가 걸리지 않도록)
 
 # ===============================
 # 이미지 로드 함수
 # ===============================
-def load_image(path, label):
-    channels = 1 if SELECTED_COLOR == 'gray' else 3
-    img = tf.io.read_file(path)
-    img = tf.image.decode_image(img, channels=channels, expand_animations=False)
-    img = tf.image.resize(img, (IMG_SIZE[1], IMG_SIZE[0]))
-    img = tf.cast(img, tf.float32) / 255.0
-    if channels == 1:
-        img = tf.expand_dims(img, axis=-1)  # (H, W, 1)
-    return img, label
+def load_image(path, label, needs_resize, config):
+    """
+    needs_resize: 이미지 크기가 config.img_size 와 다르면 True (needs_resize_flags 로 미리 확인)
+    config      : RunConfig (color, img_size 사용)
+    전처리는 data_prep/model_input.py 와 공통 (테스트 / 서빙과 같은 RGB, (H, W, C) 입력)
+    """
+    return load_image_tf(path, config.color, needs_resize, config.img_size), label
+
+def load_image_uint8(path, label, needs_resize, config):
+    """load_image 과 같되 0~255 uint8 로 반환 (TARGET_SIZE crop 은 resize 가 없으므로 손실 없음)"""
+    return load_image_uint8_tf(path, config.color, needs_resize, config.img_size), label
 
 # ===============================
 # Dataset 생성 함수
 # ===============================
-def make_dataset(paths, labels, shuffle=False):
-    ds = tf.data.Dataset.from_tensor_slices((paths, labels))
+def get_cache_path(paths, labels, cache_name, config, source_stamp=None):
+    """
+    디스크 캐시 파일 경로: color/전략/img_size/split + 샘플 목록 / 데이터 버전 해시
+    source_stamp: 라벨 인덱스 키 해시 (RunConfig.label_index_stamp), 데이터 준비 단계가 같은 이름의 이미지를
+                  다시 만들면 바뀜 → 샘플 목록이 같아도 다른 파일을 사용하므로 오래된 캐시를 읽지 않음
+    """
+    digest = hashlib.sha1(repr((list(paths), list(labels), source_stamp)).encode("utf-8")).hexdigest()[:12]
+    suffix = "_u8" if config.cache_uint8 else ""
+    img_w, img_h = config.img_size
+    os.makedirs(config.cache_dir, exist_ok=True)
+    return os.path.join(config.cache_dir, f"{cache_name}_{img_w}x{img_h}{suffix}_{digest}")
+
+def make_dataset(paths, labels, config, shuffle=False, cache_name=None, source_stamp=None):
+    """
+    config    : RunConfig (color, img_size, batch_size, cache_mode, cache_uint8 사용)
+                cache_mode  - None (매 epoch 디코딩) / 'memory' / 'disk'
+                cache_uint8 - True 이면 uint8 로 캐시하고 float 변환은 배치 단위로 수행
+    cache_name: 디스크 캐시 파일 이름 앞부분 (예: 'color_3_train')
+    source_stamp: 디스크 캐시 이름에 넣을 데이터 버전 (get_cache_path)
+    캐시를 사용하면 디코딩 결과를 캐시한 뒤에 셔플 → 2번째 epoch 부터 디코딩 없음
+    이미지 크기는 헤더로 한 번만 확인해 img_size 와 같은 crop 은 resize 생략
+    """
+    import tensorflow as tf
+
+    cache, uint8 = config.cache_mode, config.cache_uint8
+    flags = needs_resize_flags(paths, config.img_size, config.dimension_index_path)
+    report_resize_flags(flags, cache_name or "")
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, labels, flags))
+    if cache is None:
+        if shuffle:
+            ds = ds.shuffle(buffer_size=len(paths), reshuffle_each_iteration=True)
+        ds = ds.map(lambda p, l, f: load_image(p, l, f, config), num_parallel_calls=tf.data.AUTOTUNE)
+        ds = ds.batch(config.batch_size).prefetch(tf.data.AUTOTUNE)
+        return ds
+
+    load_fn = load_image_uint8 if uint8 else load_image
+    ds = ds.map(lambda p, l, f: load_fn(p, l, f, config), num_parallel_calls=tf.data.AUTOTUNE)
+    if cache == 'memory':
+        ds = ds.cache()
+    elif cache == 'disk':
+        ds = ds.cache(get_cache_path(paths, labels, cache_name, config, source_stamp))
+    else:
+        raise ValueError(f"⚠ 알 수 없는 캐시 모드: {cache}")
+
     if shuffle:
         ds = ds.shuffle(buffer_size=len(paths), reshuffle_each_iteration=True)
-    ds = ds.map(load_image, num_parallel_calls=tf.data.AUTOTUNE)
-    ds = ds.batch(BATCH_SIZE).prefetch(tf.data.AUTOTUNE)
-    return ds
+    ds = ds.batch(config.batch_size)
+    if uint8:
+        ds = ds.map(lambda x, y: (preprocess_batch_tf(x, config.img_size), y), num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+# ===============================
+# 패킹 데이터셋(memmap) 기반 Dataset 생성 함수
+# ===============================
+def make_pack_dataset(images, labels, indices, config, shuffle=False):
+    """
+    images: load_pack 이 반환한 (N, H, W, C) uint8 memmap
+    indices: 사용할 샘플 인덱스 (train / val 분할 결과)
+    config : RunConfig (batch_size, img_size 사용)
+    인덱스를 배치로 묶은 뒤 memmap 에서 한 번에 읽어와 디코딩 없이 float 변환
+    """
+    import tensorflow as tf
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if shuffle:
+        ds = ds.shuffle(buffer_size=len(indices), reshuffle_each_iteration=True)
+    ds = ds.batch(config.batch_size)
+
+    def gather(idx):
+        idx = np.sort(idx)  # 정렬된 인덱스로 읽어 디스크 접근을 순차에 가깝게
+        return images[idx], labels[idx].astype(np.int32)
+
+    def load_batch(idx):
+        x, y = tf.numpy_function(gather, [idx], (tf.uint8, tf.int32))
+        x.set_shape((None,) + images.shape[1:])
+        y.set_shape((None,))
+        return preprocess_batch_tf(x, config.img_size), y
+
+    ds = ds.map(load_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+# ===============================
+# train / val 분할
+# ===============================
+def split_train_val(sample_ids, labels, config):
+    """
+    원본 이미지 단위 + 헬멧 비율 층화 train / val 분할 (data_prep/grouped_split.py)
+    같은 원본 이미지의 crop 은 train / val 한쪽에만 → 검증 정확도가 부풀려지지 않음
+    배정은 config.val_split_path 에 저장해 두고 다음 학습에서 유지 (이미지가 추가돼도 기존 샘플은 그대로)
+    sample_ids: 이미지 경로 또는 패킹 데이터셋의 이름 ('12_3')
+    반환: (train 인덱스 리스트, val 인덱스 리스트)
+    """
+    splits = stable_split(
+        sample_ids, labels, 1 - config.val_ratio, config.seed, config.val_split_path, names=("train", "val")
+    )
+    report_split(splits, labels, ("train", "val"))
+    train_idx = [i for i, s in enumerate(splits) if s == "train"]
+    val_idx = [i for i, s in enumerate(splits) if s == "val"]
+    return train_idx, val_idx
 
 # ===============================
 # 학습 함수
 # ===============================
-def train_model(selected_color, selected_strategy, model_save_dir):
-    global SELECTED_COLOR, SELECTED_STRATEGY
-    SELECTED_COLOR = selected_color
-    SELECTED_STRATEGY = selected_strategy
+def train_model(config, model_save_dir):
+    """
+    config        : RunConfig (color / 전략 / 모델 구조 / 하이퍼파라미터 / 데이터 경로)
+                    use_pack    - True 이면 data_prep/packing.py 로 만든 패킹 데이터셋(memmap)에서 학습
+                    cache_mode  - 이미지 파일 학습 시 디코딩 결과 캐시 (None / 'memory' / 'disk')
+                    cache_uint8 - True 이면 uint8 로 캐시 (float 변환은 배치 단위)
+    model_save_dir: 체크포인트 / history.csv 저장 폴더
+    반환: 최고 검증 정확도 epoch
+    모듈 전역 상태를 쓰지 않으므로 여러 config 를 한 프로세스에서 차례로 / 동시에 실행 가능
+    단계별 시간 / 처리량은 model_save_dir/train_instrumentation.json 에 저장 (history.csv 옆)
+    """
+    inst = Instrumentation(f"train {config.name}")
+    with inst.timer("import"):
+        import tensorflow as tf
+
     TRAIN_MODEL_SAVE_DIR = model_save_dir
     os.makedirs(TRAIN_MODEL_SAVE_DIR, exist_ok=True)
 
-    # -------------------------------
-    # YOLO 라벨 기반 이미지/라벨 리스트 생성
-    # -------------------------------
-    label_files = sorted([f for f in os.listdir(TRAIN_LABEL_DIR) if f.startswith("label_") and f.endswith(".txt")])
-    img_paths, labels = [], []
-
-    for label_file in label_files:
-        base = label_file.replace("label_", "").replace(".txt", "")
-        img_path = None
-        for ext in [".jpg", ".png", ".jpeg"]:
-            fname = os.path.join(TRAIN_IMAGE_DIR, f"image_{base}{ext}")
-            if os.path.exists(fname):
-                img_path = fname
-                break
-        if img_path is None:
-            continue
-
-        has_helmet = 0
-        with open(os.path.join(TRAIN_LABEL_DIR, label_file), "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                class_id = int(line.split()[0])
-                if class_id == HELMET_CLASS_ID:
-                    has_helmet = 1
-                    break
-
-        img_paths.append(img_path)
-        labels.append(has_helmet)
-
-    if len(labels) == 0:
-        raise ValueError("⚠ 데이터셋이 비어 있습니다. 경로와 파일 확인 필요")
+    if config.use_pack:
+        # -------------------------------
+        # 패킹 데이터셋 (디코딩 없이 memmap 에서 읽기)
+        # -------------------------------
+        with inst.timer("label_index"):
+            images, pack_labels, pack_names = config.load_pack("train")
+        if len(pack_labels) == 0:
+            raise ValueError("⚠ 패킹 데이터셋이 비어 있습니다. data_prep/packing.py 실행 확인 필요")
 
-    # -------------------------------
-    # train / val split (8:2)
-    # -------------------------------
-    train_paths, val_paths, train_labels, val_labels = train_test_split(
-        img_paths, labels, test_size=0.2, random_state=SEED, stratify=labels
-    )
+        train_idx, val_idx = split_train_val(pack_names, pack_labels.tolist(), config)
+        train_ds = make_pack_dataset(images, pack_labels, train_idx, config, shuffle=True)
+        val_ds   = make_pack_dataset(images, pack_labels, val_idx, config, shuffle=False)
+        n_train = len(train_idx)
+        train_bytes = n_train * int(np.prod(images.shape[1:]))  # memmap 에서 읽는 uint8 바이트 수
+    else:
+        # -------------------------------
+        # 이미지/라벨 리스트 (캐시된 라벨 인덱스 사용)
+        # -------------------------------
+        with inst.timer("label_index"):
+            img_paths, labels = config.label_index("train")
+            source_stamp = config.label_index_stamp("train")
+
+        if len(labels) == 0:
+            raise ValueError("⚠ 데이터셋이 비어 있습니다. 경로와 파일 확인 필요")
 
-    train_ds = make_dataset(train_paths, train_labels, shuffle=True)
-    val_ds   = make_dataset(val_paths, val_labels, shuffle=False)
+        # -------------------------------
+        # train / val split (config.val_ratio, 원본 이미지 단위)
+        # -------------------------------
+        train_idx, val_idx = split_train_val(img_paths, labels, config)
+        train_paths, train_labels = [img_paths[i] for i in train_idx], [labels[i] for i in train_idx]
+        val_paths, val_labels = [img_paths[i] for i in val_idx], [labels[i] for i in val_idx]
+
+        with inst.timer("make_dataset"):
+            train_ds = make_dataset(train_paths, train_labels, config, shuffle=True,
+                                    cache_name=f"{config.name}_train", source_stamp=source_stamp)
+            val_ds   = make_dataset(val_paths, val_labels, config, shuffle=False,
+                                    cache_name=f"{config.name}_val", source_stamp=source_stamp)
+        n_train = len(train_paths)
+        # 캐시를 쓰면 이미지 파일은 첫 epoch 에만 읽음
+        train_bytes = file_bytes(train_paths)
+        if config.cache_mode is not None:
+            inst.count("bytes_read", train_bytes)
+            train_bytes = 0
+
+    # 입력 파이프라인만 읽을 때의 배치당 시간 (캐시를 쓰면 일부만 읽은 캐시가 남으므로 생략)
+    input_batch_s = None
+    if config.cache_mode is None or config.use_pack:
+        with inst.timer("input_probe"):
+            input_batch_s = measure_input_rate(train_ds, INPUT_PROBE_BATCHES)
 
     # -------------------------------
     # 모델 생성 & 학습
     # -------------------------------
-    model = main_cnn(selected_color)
-    model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
+    with inst.timer("build_model"):
+        model = config.build_model()
+        model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
 
-    # 체크포인트 콜백
-    checkpoint_cb = tf.keras.callbacks.ModelCheckpoint(
+    # 체크포인트 콜백 (저장 시간 측정)
+    checkpoint_cb = make_timed_checkpoint(
+        inst,
         filepath=os.path.join(TRAIN_MODEL_SAVE_DIR, "epoch_{epoch:02d}.h5"),
         save_weights_only=False,
         save_freq="epoch"
     )
 
+    # epoch 시간 / 처리량 / tf.profiler 트레이스 콜백
+    epoch_cb = make_epoch_callback(
+        inst, n_train, train_bytes, config.profile_epochs, os.path.join(TRAIN_MODEL_SAVE_DIR, "profile")
+    )
+
     # CSV 기록용 콜백
     class HistoryCSVCallback(tf.keras.callbacks.Callback):
         def on_train_end(self, logs=None):
@@ -116,31 +244,69 @@ def train_model(selected_color, selected_strategy, model_save_dir):
             print(f"✅ History CSV 저장 완료: {csv_path}")
 
     # 학습 상수 TXT 저장
+    train_image_dir, train_label_dir = config.split_dirs("train")
     constants_txt_path = os.path.join(TRAIN_MODEL_SAVE_DIR, "training_constants.txt")
     with open(constants_txt_path, "w", encoding="utf-8") as f:
         f.write("학습 관련 상수 및 하이퍼파라미터\n")
         f.write("==============================\n")
-        f.write(f"TRAIN_IMAGE_DIR: {TRAIN_IMAGE_DIR}\n")
-        f.write(f"TRAIN_LABEL_DIR: {TRAIN_LABEL_DIR}\n")
+        f.write(f"TRAIN_IMAGE_DIR: {train_image_dir}\n")
+        f.write(f"TRAIN_LABEL_DIR: {train_label_dir}\n")
         f.write(f"TRAIN_MODEL_SAVE_DIR: {TRAIN_MODEL_SAVE_DIR}\n")
-        f.write(f"IMG_SIZE: {IMG_SIZE}\n")
-        f.write(f"BATCH_SIZE: {BATCH_SIZE}\n")
-        f.write(f"EPOCHS: {EPOCHS}\n")
+        f.write(f"IMG_SIZE: {config.img_size}\n")
+        f.write(f"BATCH_SIZE: {config.batch_size}\n")
+        f.write(f"EPOCHS: {config.epochs}\n")
         f.write(f"HELMET_CLASS_ID: {HELMET_CLASS_ID}\n")
-        f.write(f"SEED: {SEED}\n")
-        f.write(f"SELECTED_COLOR: {SELECTED_COLOR}\n")
-        f.write(f"SELECTED_STRATEGY: {SELECTED_STRATEGY}\n")
-        f.write(f"Callbacks: ModelCheckpoint\n")
+        f.write(f"SEED: {config.seed}\n")
+        f.write(f"SELECTED_COLOR: {config.color}\n")
+        f.write(f"SELECTED_STRATEGY: {config.strategy}\n")
+        f.write(f"MODEL: model_{config.model_id}\n")
+        f.write(f"USE_PACK: {config.use_pack}\n")
+        f.write(f"SPLIT_MANIFEST: {config.split_manifest}\n")
+        f.write(f"CACHE_MODE: {config.cache_mode}{' (uint8)' if config.cache_mode and config.cache_uint8 else ''}\n")
+        f.write(f"PROFILE_EPOCHS: {config.profile_epochs}\n")
+        f.write(f"Callbacks: ModelCheckpoint, EpochInstrumentation\n")
     print(f"✅ 학습 상수 TXT 저장 완료: {constants_txt_path}")
 
     # 학습 실행
-    history = model.fit(
-        train_ds,
-        validation_data=val_ds,
-        epochs=EPOCHS,
-        callbacks=[checkpoint_cb, HistoryCSVCallback()]
-    )
+    with inst.timer("fit"):
+        history = model.fit(
+            train_ds,
+            validation_data=val_ds,
+            epochs=config.epochs,
+            callbacks=[checkpoint_cb, epoch_cb, HistoryCSVCallback()]
+        )
 
     best_epoch = history.history['val_accuracy'].index(max(history.history['val_accuracy'])) + 1
+
+    # 단계별 측정 결과 저장
+    steps_per_epoch = -(-n_train // config.batch_size)
+    # 학습 스텝만의 배치당 시간 (epoch 시간에서 검증 / 체크포인트 저장 시간 제외)
+    train_s = inst.seconds("epoch") - inst.seconds("validation") - inst.seconds("checkpoint_write")
+    train_step_s = max(train_s, 0.0) / max(1, config.epochs * steps_per_epoch)
+    inst.set_value("images_per_s", inst.rate("images", "epoch"))
+    inst.set_value("checkpoint_write_ratio", inst.seconds("checkpoint_write") / max(inst.seconds("fit"), 1e-9))
+    inst.set_value("input_batch_s", input_batch_s)
+    inst.set_value("train_step_s", train_step_s)
+
+    # 입력 대기 비율 추정: (입력만 읽는 시간 - 입력 없이 학습 연산만 하는 시간) / 학습 스텝 시간
+    # 0 이면 입력이 연산보다 빨라 prefetch 로 가려짐, 1 에 가까우면 학습 스텝 대부분을 입력 대기에 씀
+    compute_batch_s, input_stall_ratio = None, None
+    if input_batch_s is not None:
+        with inst.timer("compute_probe"):
+            compute_batch_s = measure_compute_rate(model, train_ds, INPUT_PROBE_BATCHES)
+    if input_batch_s is not None and compute_batch_s is not None and train_step_s > 0:
+        input_stall_ratio = min(1.0, max(0.0, input_batch_s - compute_batch_s) / train_step_s)
+    inst.set_value("compute_batch_s", compute_batch_s)
+    inst.set_value("input_stall_ratio", input_stall_ratio)
+    if input_batch_s is None:
+        reason = (f"cache_mode={config.cache_mode} 이면 입력 측정을 생략 (일부만 읽은 캐시가 남으므로)"
+                  if config.cache_mode is not None and not config.use_pack else "입력 측정 배치 부족")
+        inst.set_value("input_stall_note", f"input_stall_ratio 없음: {reason}")
+        print(f"ℹ️ input_stall_ratio 없음: {reason}")
+    elif input_stall_ratio is not None:
+        print(f"▶ 입력 대기 비율 추정: {input_stall_ratio:.2f} (입력 {input_batch_s * 1000:.1f}ms, "
+              f"연산 {compute_batch_s * 1000:.1f}ms, 학습 스텝 {train_step_s * 1000:.1f}ms)")
+    inst.save(os.path.join(TRAIN_MODEL_SAVE_DIR, TRAIN_INSTRUMENTATION_FILE))
+
     print(f"▶ 학습 완료 (최고 검증 정확도 epoch: {best_epoch})")
     return best_epoch
@@ -3,45 +3,23 @@ from datetime import datetime
 
 from data_prep.utils import TARGET_SIZE
 
-SELECTED_COLOR = 'color'  # 'color' 또는 'gray' 선택
-SELECTED_STRATEGY = 3  # 1, 2, 또는 3 선택
-
 # ===============================
 # 데이터셋 경로
 # ===============================
-DATASET_DIR = "./dataset"
-
-PREPROCESSED_DIR = DATASET_DIR + "/preprocessed"
-
 SUB_DIRS = {
     1: '1. forced_scale',
     2: '2. padded_scale',
     3: '3. aspect_aware_crop',
 }
 
-TRAIN_IMAGE_DIR = os.path.join(
-    PREPROCESSED_DIR,
-    SELECTED_COLOR,
-    "train",
-    SUB_DIRS[SELECTED_STRATEGY],
-    "images"
-)
-TRAIN_LABEL_DIR = os.path.join(
-    PREPROCESSED_DIR,
-    SELECTED_COLOR,
-    "train",
-    SUB_DIRS[SELECTED_STRATEGY],
-    "labels"
-)
-
 # ===============================
 # 모델 저장 경로
 # ===============================
 BASE_MODEL_DIR = "./model"
 
-def get_train_model_save_dir(color, strategy):
+def get_train_model_save_dir(color, strategy, model_dir=BASE_MODEL_DIR):
     today_str = datetime.today().strftime("%Y%m%d")
-    base_dir = os.path.join(BASE_MODEL_DIR, color, SUB_DIRS[strategy])
+    base_dir = os.path.join(model_dir, color, SUB_DIRS[strategy])
     
     for i in range(1, 100):
         save_dir = os.path.join(base_dir, today_str + f"_{i:02d}")
@@ -59,9 +37,15 @@ def get_train_model_save_dir(color, strategy):
 IMG_SIZE = TARGET_SIZE
 BATCH_SIZE = 32
 EPOCHS = 10
-HELMET_CLASS_ID = 1
 SEED = 42
 
+# ===============================
+# 입력 파이프라인 캐시
+# ===============================
+CACHE_MODE = None  # None (캐시 안 함) / 'memory' / 'disk'
+CACHE_UINT8 = False  # True 이면 uint8 로 캐시하고 float 변환은 배치 단위로 수행 (캐시 용량 1/4)
+# CACHE_MODE='disk' 일 때 캐시 파일 위치는 RunConfig.cache_dir (dataset_dir/cache)
+
 # # ===============================
 # # 특정 epoch 모델 별도 저장
 # # ===============================